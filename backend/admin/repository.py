@@ -1,5 +1,10 @@
 from typing import List, Optional, Dict, Any
+from postgrest import ReturnMethod
 from backend.infra.supabase_client import get_supabase, get_service_supabase
+from backend.tickets.repository import invalidate_user_tickets_count
+from backend.infra import table_counters
+from backend.config import ADMIN_COUNT_METHOD
+from backend.utils.pagination import CursorError, Keyset, Page, fetch_page, keyset_page
 import logging
 
 logger = logging.getLogger(__name__)
@@ -44,14 +49,63 @@ def fetch_admin_users(limit: int = 100) -> List[dict]:
         return []
 
 
-def count_table_rows(table_name: str) -> int:
+def fetch_admin_commandes_page(after: Optional[Keyset], limit: int) -> Page:
+    """Page de commandes pour l'admin (colonnes de fetch_admin_commandes), created_at desc; Page vide si erreur."""
+    try:
+        query = (
+            get_service_supabase()
+            .table("commandes")
+            .select("id, token, price_paid, created_at, user_id, offre_id, users(email), offres(title, price)")
+        )
+        return fetch_page(query, after, limit, "created_at", desc=True)
+    except CursorError:
+        raise
+    except Exception:
+        logger.exception("admin.repository.fetch_admin_commandes_page failed")
+        return Page([], None)
+
+
+def fetch_admin_users_page(after: Optional[Keyset], limit: int) -> Page:
+    """Page d'utilisateurs pour l'admin (colonnes de fetch_admin_users), created_at desc; Page vide si erreur."""
+    try:
+        query = get_service_supabase().table("users").select("id, email, full_name, created_at")
+        return fetch_page(query, after, limit, "created_at", desc=True)
+    except CursorError:
+        raise
+    except Exception:
+        logger.exception("admin.repository.fetch_admin_users_page failed")
+        return Page([], None)
+
+
+COMMANDES_EXPORT_COLUMNS = ("id", "token", "user_id", "offre_id", "price_paid", "created_at")
+USERS_EXPORT_COLUMNS = ("id", "email", "full_name", "created_at")
+
+
+def fetch_commandes_page(after: Optional[Keyset], limit: int) -> List[dict]:
+    """
+    Page de commandes pour l'export (colonnes COMMANDES_EXPORT_COLUMNS), ordre (created_at, id) croissant,
+    reprise après `after`.
+    - Lève en cas d'erreur: un export interrompu ne doit pas paraître complet
+    """
+    query = get_service_supabase().table("commandes").select(", ".join(COMMANDES_EXPORT_COLUMNS))
+    return keyset_page(query, after, limit).execute().data or []
+
+
+def fetch_users_page(after: Optional[Keyset], limit: int) -> List[dict]:
+    """Page d'utilisateurs pour l'export (voir fetch_commandes_page)."""
+    query = get_service_supabase().table("users").select(", ".join(USERS_EXPORT_COLUMNS))
+    return keyset_page(query, after, limit).execute().data or []
+
+
+def count_table_rows(table_name: str, count_method: Optional[str] = None) -> int:
     """
     Compte les lignes d'une table via Supabase.
-    Utilise count='exact' si disponible, sinon fallback sur len(data).
+    Utilise count=ADMIN_COUNT_METHOD (exact | planned | estimated) en requête HEAD (aucune ligne
+    transférée) si disponible, sinon fallback sur len(data).
     """
     try:
         client = get_service_supabase()
-        res = client.table(table_name).select("id", count="exact").execute()
+        res = client.table(table_name).select("id", count=count_method or ADMIN_COUNT_METHOD, head=True).execute()
         if getattr(res, "count", None) is not None:
             return int(res.count)  # type: ignore
         return len(res.data or [])
@@ -59,57 +113,76 @@ def count_table_rows(table_name: str) -> int:
         return 0
 
 
+def _after_user_delete(user_id: str, deleted: int) -> None:
+    if not deleted:
+        return
+    table_counters.adjust("users", -deleted)
+    table_counters.invalidate("commandes")
+    invalidate_user_tickets_count(user_id)
+
+
+def _after_commande_delete(res: Any) -> None:
+    deleted = table_counters.row_count(res)
+    if not deleted:
+        return
+    table_counters.adjust("commandes", -deleted)
+    owners = {str(r.get("user_id")) for r in (getattr(res, "data", None) or []) if isinstance(r, dict) and r.get("user_id")}
+    if owners:
+        for user_id in owners:
+            invalidate_user_tickets_count(user_id)
+    else:
+        # Propriétaire non renvoyé: tous les compteurs de billets sont oubliés
+        invalidate_user_tickets_count()
+
+
 def delete_user(user_id: str) -> bool:
+    """
+    Supprime un utilisateur (clé service); succès si pas d'erreur, même si aucune ligne ne correspond.
+    - Compteur users ajusté du nombre de lignes réellement supprimées (return=representation)
+    - Commandes supprimées en cascade (nombre inconnu ici): compteur commandes et billets invalidés
+    """
     try:
-        get_service_supabase().table("users").delete().eq("id", user_id).execute()
-        # res.data peut être vide selon la politique; considérer succès si pas d'erreur
+        res = get_service_supabase().table("users").delete(returning=ReturnMethod.representation).eq("id", user_id).execute()
+        _after_user_delete(user_id, table_counters.row_count(res))
         return True
     except Exception:
         logger.exception("admin.repository.delete_user failed id=%s", user_id)
         return False
 
 
+def _first_row(res: Any) -> Optional[dict]:
+    """Première ligne renvoyée par une écriture (return=representation), None si aucune."""
+    data = getattr(res, "data", None)
+    if isinstance(data, list):
+        return data[0] if data else None
+    return data if isinstance(data, dict) else None
+
+
 def update_user(user_id: str, data: Dict[str, Any]) -> Optional[dict]:
+    """
+    Met à jour un utilisateur en un aller-retour: la ligne mise à jour (filtre id) est renvoyée
+    par l'update (return=representation), sans relecture.
+    - Retour: None si aucune ligne ne correspond ou en cas d'erreur
+    """
     try:
-        # Exécuter l'update mais ignorer la réponse (les tests ne mockent pas ce retour)
-        (
+        res = (
             get_service_supabase()
             .table("users")
-            .update(data)
+            .update(data, returning=ReturnMethod.representation)
             .eq("id", user_id)
             .execute()
         )
-
-        # Lecture après écriture:
-        # 1) select().execute() (le test configure ce retour)
-        sel = (
-            get_service_supabase()
-            .table("users")
-            .select("*")
-        )
-        res2 = sel.execute()
-        res2_data = getattr(res2, "data", None)
-        if isinstance(res2_data, list) and res2_data:
-            return res2_data[0]
-        if isinstance(res2_data, dict):
-            return res2_data
-
-        # 2) fallback: select().single().execute()
-        res2b = sel.single().execute()
-        res2b_data = getattr(res2b, "data", None)
-        if isinstance(res2b_data, list) and res2b_data:
-            return res2b_data[0]
-        if isinstance(res2b_data, dict):
-            return res2b_data
-        return None
+        return _first_row(res)
     except Exception:
         logger.exception("admin.repository.update_user failed id=%s data=%s", user_id, data)
         return None
 
 
 def delete_commande(commande_id: str) -> bool:
+    """Supprime une commande (clé service); compteur ajusté du nombre de lignes réellement supprimées."""
     try:
-        get_service_supabase().table("commandes").delete().eq("id", commande_id).execute()
+        res = get_service_supabase().table("commandes").delete(returning=ReturnMethod.representation).eq("id", commande_id).execute()
+        _after_commande_delete(res)
         return True
     except Exception:
         logger.exception("admin.repository.delete_commande failed id=%s", commande_id)
@@ -117,47 +190,19 @@ def delete_commande(commande_id: str) -> bool:
 
 
 def update_commande(commande_id: str, data: Dict[str, Any]) -> Optional[dict]:
+    """
+    Met à jour une commande en un aller-retour (return=representation, filtre id).
+    - Retour: ligne mise à jour, None si aucune ligne ne correspond ou en cas d'erreur
+    """
     try:
         res = (
             get_service_supabase()
             .table("commandes")
-            .update(data)
+            .update(data, returning=ReturnMethod.representation)
             .eq("id", commande_id)
             .execute()
         )
-        updated: Optional[dict] = None
-        res_data = getattr(res, "data", None)
-        if isinstance(res_data, list) and res_data:
-            updated = res_data[0]
-        elif isinstance(res_data, dict):
-            updated = res_data
-        else:
-            updated = None
-
-        if not updated:
-            # Fallback 1: lecture via select().execute()
-            sel = (
-                get_service_supabase()
-                .table("commandes")
-                .select("*")
-                .eq("id", commande_id)
-            )
-            res2 = sel.execute()
-            res2_data = getattr(res2, "data", None)
-            if isinstance(res2_data, list) and res2_data:
-                return res2_data[0]
-            if isinstance(res2_data, dict):
-                return res2_data
-
-            # Fallback 2: lecture via select().single().execute()
-            res2b = sel.single().execute()
-            res2b_data = getattr(res2b, "data", None)
-            if isinstance(res2b_data, list) and res2b_data:
-                return res2b_data[0]
-            if isinstance(res2b_data, dict):
-                return res2b_data
-            return None
-        return updated
+        return _first_row(res)
     except Exception:
         logger.exception("admin.repository.update_commande failed id=%s data=%s", commande_id, data)
         return None
@@ -199,4 +244,4 @@ def set_auth_user_role(user_id: str, role: str) -> bool:
         return False
     except Exception:
         logger.exception("admin.repository.set_auth_user_role failed id=%s role=%s", user_id, role)
-        return False
\ No newline at end of file
+        return False
@@ -2,10 +2,30 @@
 
 from typing import List, Optional, Dict, Any
 from backend.admin import repository as admin_repository
+from backend.infra import table_counters
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
 logger = logging.getLogger(__name__)
 
+DASHBOARD_TABLES = ("users", "commandes", "offres", "evenements")
+
+# Comptages base du tableau de bord lancés en parallèle (au plus un par table)
+_count_executor = ThreadPoolExecutor(max_workers=len(DASHBOARD_TABLES), thread_name_prefix="admin-count")
+
+def get_table_counts(tables=DASHBOARD_TABLES) -> Dict[str, int]:
+    """
+    Nombre de lignes par table pour le tableau de bord: {table: n}.
+    - Comptes servis par table_counters (cache mémoire, puis compteurs Redis tenus par les insert/delete)
+    - Tables restantes comptées en base en parallèle (count_table_rows), puis mémorisées
+    """
+    counts = table_counters.get_counts(tables)
+    missing = [t for t in tables if t not in counts]
+    for table, count in zip(missing, _count_executor.map(admin_repository.count_table_rows, missing)):
+        counts[table] = count
+        table_counters.store(table, count)
+    return counts
+
 def fetch_admin_commandes(limit: int = 100) -> List[dict]:
     return admin_repository.fetch_admin_commandes(limit=limit)
 
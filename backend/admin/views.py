@@ -1,22 +1,29 @@
 from typing import Optional
 from fastapi import APIRouter, Request, Depends, Query
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from starlette.status import HTTP_303_SEE_OTHER
 from backend.utils.templates import templates
 from backend.utils.security import require_admin
 from backend.admin import service as admin_service
 from backend.utils.rate_limit import optional_rate_limit
-from backend.config import COOKIE_SECURE
+from backend.config import COOKIE_SECURE, EXPORT_PAGE_SIZE
 import secrets
 from backend.utils.csrf import get_or_create_csrf_token, attach_csrf_cookie_if_missing, validate_csrf_token
 from backend.admin import repository as admin_repository
 from backend.offres import repository as offres_repository
-from backend.validation.repository import get_ticket_by_token, get_last_validation
 from backend.validation.service import validate_ticket_token
+from backend.validation.scan_state import get_scan_state
 # module backend.admin.views
 from backend.utils.csrf import csrf_protect
 from typing import Dict, Any  # Ajoutez cette ligne pour importer Dict et Any
 from backend.evenements import repository as evenements_repository
+from backend.utils.pagination import iter_keyset_pages, cursor_or_400, page_size
+from backend.utils.export import EXPORT_FORMATS, stream_rows
+from datetime import datetime, timezone
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -32,11 +39,8 @@ def admin_page(
     allowed_views = {"commandes", "users", "offres", "evenements"}
     active_view = view if view in allowed_views else None
 
-    # Compteurs pour le dashboard
-    users_count = admin_repository.count_table_rows("users")
-    commandes_count = admin_repository.count_table_rows("commandes")
-    offres_count = admin_repository.count_table_rows("offres")
-    evenements_count = admin_repository.count_table_rows("evenements")
+    # Compteurs pour le dashboard (comptages concurrents et mis en cache)
+    counts = admin_service.get_table_counts()
 
     # Charger uniquement la liste demandée
     commandes = admin_service.get_admin_commandes() if active_view == "commandes" else []
@@ -56,10 +60,10 @@ def admin_page(
         "users": users_list,
         "offres": offres,
         "evenements": evenements,
-        "commandes_count": commandes_count,
-        "users_count": users_count,
-        "offres_count": offres_count,
-        "evenements_count": evenements_count,
+        "commandes_count": counts["commandes"],
+        "users_count": counts["users"],
+        "offres_count": counts["offres"],
+        "evenements_count": counts["evenements"],
     })
     attach_csrf_cookie_if_missing(resp, request, csrf)
     return resp
@@ -67,31 +71,55 @@ def admin_page(
 # API JSON: stats dashboard (comptes simples)
 @router.get("/api/stats")
 def admin_stats(user: dict = Depends(require_admin)):
-    users_count = admin_repository.count_table_rows("users")
-    commandes_count = admin_repository.count_table_rows("commandes")
-    offres_count = admin_repository.count_table_rows("offres")
-    return JSONResponse({"users_count": users_count, "commandes_count": commandes_count, "offres_count": offres_count})
+    counts = admin_service.get_table_counts(("users", "commandes", "offres"))
+    return JSONResponse({"users_count": counts["users"], "commandes_count": counts["commandes"], "offres_count": counts["offres"]})
+
+# API JSON: listes paginées par curseur (?cursor=&limit=) => {"items": [...], "next_cursor": str|None}
+def _page_response(page) -> JSONResponse:
+    return JSONResponse({"items": page.items, "next_cursor": page.next_cursor})
 
-# API JSON: listes
 @router.get("/api/offres")
-def admin_list_offres(user: dict = Depends(require_admin)):
-    data = offres_repository.list_offres()
-    return JSONResponse({"items": data or []})
+def admin_list_offres(cursor: Optional[str] = None, limit: Optional[int] = Query(None, ge=1), user: dict = Depends(require_admin)):
+    return _page_response(offres_repository.list_offres_page(cursor_or_400(cursor), page_size(limit)))
 
 @router.get("/api/commandes")
-def admin_list_commandes(limit: int = 100, user: dict = Depends(require_admin)):
-    data = admin_service.get_admin_commandes(limit=limit)
-    return JSONResponse({"items": data or []})
+def admin_list_commandes(cursor: Optional[str] = None, limit: Optional[int] = Query(None, ge=1), user: dict = Depends(require_admin)):
+    return _page_response(admin_repository.fetch_admin_commandes_page(cursor_or_400(cursor), page_size(limit)))
 
 @router.get("/api/users")
-def admin_list_users(limit: int = 100, user: dict = Depends(require_admin)):
-    data = admin_repository.fetch_admin_users(limit=limit)
-    return JSONResponse({"items": data or []})
+def admin_list_users(cursor: Optional[str] = None, limit: Optional[int] = Query(None, ge=1), user: dict = Depends(require_admin)):
+    return _page_response(admin_repository.fetch_admin_users_page(cursor_or_400(cursor), page_size(limit)))
+
+# Exports en flux (CSV / NDJSON), table entière parcourue par pages keyset (created_at, id)
+def _export_response(name: str, fetch_page, columns, fmt: str) -> StreamingResponse:
+    def _pages():
+        try:
+            yield from iter_keyset_pages(fetch_page, EXPORT_PAGE_SIZE)
+        except Exception:
+            # Réponse déjà commencée: la connexion est interrompue (export incomplet, jamais tronqué en silence)
+            logger.exception("admin export %s interrompu", name)
+            raise
+    filename = f"{name}-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.{fmt}"
+    return StreamingResponse(
+        stream_rows(_pages(), fmt, columns),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"},
+    )
+
+@router.get("/api/commandes/export")
+def admin_export_commandes(format: str = Query("csv", pattern="^(csv|ndjson)$"), user: dict = Depends(require_admin)):
+    """Export de toutes les commandes (CSV par défaut, ?format=ndjson), en flux à mémoire constante."""
+    return _export_response("commandes", admin_repository.fetch_commandes_page, admin_repository.COMMANDES_EXPORT_COLUMNS, format)
+
+@router.get("/api/users/export")
+def admin_export_users(format: str = Query("csv", pattern="^(csv|ndjson)$"), user: dict = Depends(require_admin)):
+    """Export de tous les utilisateurs (CSV par défaut, ?format=ndjson), en flux à mémoire constante."""
+    return _export_response("users", admin_repository.fetch_users_page, admin_repository.USERS_EXPORT_COLUMNS, format)
 
 # Actions JSON pour Utilisateurs inscrits
 @router.post("/api/users/{user_id}/delete")
 async def api_delete_user(user_id: str, user: dict = Depends(require_admin)):
-    ok = admin_service.delete_user(user_id)
+    ok = await run_in_threadpool(admin_service.delete_user, user_id)
     if not ok:
         return JSONResponse({"ok": False}, status_code=400)
     return JSONResponse({"ok": True})
@@ -102,7 +130,7 @@ async def api_update_user(user_id: str, request: Request, user: dict = Depends(r
     email = (body.get("email") or "").strip()
     if not email:
         return JSONResponse({"ok": False, "error": "email required"}, status_code=400)
-    updated = admin_service.update_user(user_id, {"email": email})
+    updated = await run_in_threadpool(admin_service.update_user, user_id, {"email": email})
     if not updated:
         return JSONResponse({"ok": False}, status_code=400)
     return JSONResponse({"ok": True, "item": updated})
@@ -110,7 +138,7 @@ async def api_update_user(user_id: str, request: Request, user: dict = Depends(r
 # Actions JSON pour Commandes réalisées
 @router.post("/api/commandes/{commande_id}/delete")
 async def api_delete_commande(commande_id: str, user: dict = Depends(require_admin)):
-    ok = admin_service.delete_commande(commande_id)
+    ok = await run_in_threadpool(admin_service.delete_commande, commande_id)
     if not ok:
         return JSONResponse({"ok": False}, status_code=400)
     return JSONResponse({"ok": True})
@@ -130,7 +158,7 @@ async def api_update_commande(commande_id: str, request: Request, user: dict = D
             return JSONResponse({"ok": False, "error": "price_paid invalide"}, status_code=400)
     if not data:
         return JSONResponse({"ok": False, "error": "aucune donnée à mettre à jour"}, status_code=400)
-    updated = admin_service.update_commande(commande_id, data)
+    updated = await run_in_threadpool(admin_service.update_commande, commande_id, data)
     if not updated:
         return JSONResponse({"ok": False}, status_code=400)
     return JSONResponse({"ok": True, "item": updated})
@@ -182,7 +210,7 @@ async def creer_offre(
     except Exception:
         return RedirectResponse(url="/admin?error=Stock%20invalide", status_code=HTTP_303_SEE_OTHER)
 
-    created = admin_service.create_offre({
+    created = await run_in_threadpool(admin_service.create_offre, {
         "title": title,
         "price": price_f,
         "category": category,
@@ -242,7 +270,8 @@ async def mettre_a_jour_offre(
     except Exception:
         return RedirectResponse(url="/admin?error=Stock%20invalide", status_code=HTTP_303_SEE_OTHER)
 
-    updated = admin_service.update_offre(
+    updated = await run_in_threadpool(
+        admin_service.update_offre,
         offre_id,
         {
             "title": title,
@@ -264,7 +293,7 @@ async def supprimer_offre(request: Request, offre_id: str, user: dict = Depends(
     if not validate_csrf_token(request, form_data):
         return RedirectResponse(url="/admin?error=CSRF%20invalide", status_code=HTTP_303_SEE_OTHER)
 
-    ok = admin_service.delete_offre(offre_id)
+    ok = await run_in_threadpool(admin_service.delete_offre, offre_id)
     if not ok:
         return RedirectResponse(url="/admin?error=Echec%20de%20la%20suppression%20de%20l%27offre", status_code=HTTP_303_SEE_OTHER)
     return RedirectResponse(url="/admin?message=Offre%20supprim%C3%A9e", status_code=HTTP_303_SEE_OTHER)
@@ -285,7 +314,8 @@ def admin_scan_get(request: Request, token: Optional[str] = Query(None), user: d
     """
     Page Admin /scan (HTML): présente l’UI de scan et l’état d’un billet si un token est fourni.
     - Sécurité: require_scanner
-    - Normalise le token composite user_key.token pour extraire la partie droite.
+    - État du billet via validation.scan_state.get_scan_state (jeton signé ou composite user_key.token;
+      signature invalide => 'Invalid' sans lecture base)
     - Si billet trouvé:
       - status: 'AlreadyValidated' si une validation existe, sinon 'Scanned'
       - ajoute ticket et dernière validation au contexte
@@ -305,22 +335,10 @@ def admin_scan_get(request: Request, token: Optional[str] = Query(None), user: d
         "validation": None,
     }
 
-    # Si un token est fourni en query => on calcule l'état côté serveur
+    # Si un token est fourni en query => état calculé en processus (service partagé scan_state)
     if context["token"]:
-        # Normaliser le token composite: user_key.token => token (partie droite)
-        composite = context["token"]
-        clean_token = composite.rsplit('.', 1)[-1]
-
-        ticket = get_ticket_by_token(clean_token)
-        if not ticket:
-            context["status"] = "Invalid"
-            context["message"] = "Billet introuvable"
-        else:
-            last = get_last_validation(clean_token)
-            context["ticket"] = ticket
-            context["validation"] = last or None
-            # Afficher "Déjà validé" si une validation existe lors de la recherche
-            context["status"] = "AlreadyValidated" if last else "Scanned"
+        state = get_scan_state(context["token"])
+        context.update(status=state["status"], message=state["message"], ticket=state["ticket"], validation=state["validation"])
 
     resp = templates.TemplateResponse("admin-scan.html", context)
     attach_csrf_cookie_if_missing(resp, request, csrf)
@@ -348,7 +366,7 @@ async def admin_scan_validate(request: Request, user: dict = Depends(require_sca
 
     # Validation serveur
     try:
-        status, data = validate_ticket_token(token, admin_id=user.get("id", ""), admin_token=user.get("token"))
+        status, data = await run_in_threadpool(validate_ticket_token, token, admin_id=user.get("id", ""), admin_token=user.get("token"))
         # Peu importe le statut renvoyé, on revient sur la page GET pour afficher l'état à jour
         return RedirectResponse(url=f"/admin/scan?token={token}", status_code=HTTP_303_SEE_OTHER)
     except Exception:
@@ -370,7 +388,7 @@ async def srv_update_user(user_id: str, request: Request, user: dict = Depends(r
         data["full_name"] = full_name
     if role:
         data["role"] = role
-    updated = admin_service.update_user(user_id, data)
+    updated = await run_in_threadpool(admin_service.update_user, user_id, data)
     if not updated:
         return RedirectResponse(url="/admin?view=users&error=Echec%20de%20la%20mise%20%C3%A0%20jour", status_code=HTTP_303_SEE_OTHER)
     # Redirection adaptée si l'admin s'auto-rétrograde en 'scanner'
@@ -421,7 +439,7 @@ async def srv_update_commande(commande_id: str, request: Request, user: dict = D
     if not data:
         return RedirectResponse(url="/admin?view=commandes&error=Aucune%20donn%C3%A9e%20%C3%A0%20mettre%20%C3%A0%20jour", status_code=HTTP_303_SEE_OTHER)
 
-    updated = admin_service.update_commande(commande_id, data)
+    updated = await run_in_threadpool(admin_service.update_commande, commande_id, data)
     if not updated:
         return RedirectResponse(url="/admin?view=commandes&error=Echec%20de%20la%20mise%20%C3%A0%20jour", status_code=HTTP_303_SEE_OTHER)
     return RedirectResponse(url="/admin?view=commandes&message=Commande%20mise%20%C3%A0%20jour", status_code=HTTP_303_SEE_OTHER)
@@ -443,9 +461,8 @@ def afficher_formulaire_edition_commande(request: Request, commande_id: str, use
     return resp
 
 @router.get("/api/evenements")
-def admin_list_evenements(user: dict = Depends(require_admin)):
-    data = evenements_repository.list_evenements()
-    return JSONResponse({"items": data or []})
+def admin_list_evenements(cursor: Optional[str] = None, limit: Optional[int] = Query(None, ge=1), user: dict = Depends(require_admin)):
+    return _page_response(evenements_repository.list_evenements_page(cursor_or_400(cursor), page_size(limit)))
 @router.get("/evenements/new", response_class=HTMLResponse)
 @router.get("/evenements/new/", response_class=HTMLResponse)
 def afficher_formulaire_creation_evenement(request: Request, user: dict = Depends(require_admin)):
@@ -477,7 +494,7 @@ async def creer_evenement(request: Request, user: dict = Depends(require_admin))
     if not type_evenement or not nom_evenement or not lieu or not date_evenement:
         return RedirectResponse(url="/admin?view=evenements&error=Champs%20requis%20manquants", status_code=HTTP_303_SEE_OTHER)
 
-    created = admin_service.create_evenement({
+    created = await run_in_threadpool(admin_service.create_evenement, {
         "type_evenement": type_evenement,
         "nom_evenement": nom_evenement,
         "lieu": lieu,
@@ -518,7 +535,7 @@ async def mettre_a_jour_evenement(request: Request, evenement_id: str, user: dic
         "lieu": (form_data.get("lieu") or "").strip(),
         "date_evenement": (form_data.get("date_evenement") or "").strip(),
     }
-    updated = admin_service.update_evenement(evenement_id, data)
+    updated = await run_in_threadpool(admin_service.update_evenement, evenement_id, data)
     if not updated:
         return RedirectResponse(url="/admin?view=evenements&error=Echec%20de%20la%20mise%20%C3%A0%20jour", status_code=HTTP_303_SEE_OTHER)
     return RedirectResponse(url="/admin?view=evenements&message=Ev%C3%A9nement%20mis%20%C3%A0%20jour", status_code=HTTP_303_SEE_OTHER)
@@ -530,7 +547,7 @@ async def supprimer_evenement(request: Request, evenement_id: str, user: dict =
     if not validate_csrf_token(request, form_data):
         return RedirectResponse(url="/admin?view=evenements&error=CSRF%20invalide", status_code=HTTP_303_SEE_OTHER)
 
-    ok = admin_service.delete_evenement(evenement_id)
+    ok = await run_in_threadpool(admin_service.delete_evenement, evenement_id)
     if not ok:
         return RedirectResponse(url="/admin?view=evenements&error=Echec%20de%20la%20suppression", status_code=HTTP_303_SEE_OTHER)
     return RedirectResponse(url="/admin?view=evenements&message=Ev%C3%A9nement%20supprim%C3%A9", status_code=HTTP_303_SEE_OTHER)
\ No newline at end of file
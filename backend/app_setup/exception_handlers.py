@@ -7,10 +7,11 @@ import urllib.parse
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import JSONResponse, RedirectResponse
 from starlette.status import HTTP_303_SEE_OTHER
+from backend.utils.pagination import CursorError
 
 def register_exception_handlers(app: FastAPI) -> None:
     """
-    Enregistre le handler HTTPException.
+    Enregistre le handler HTTPException (et CursorError -> 400, curseur de pagination altéré).
     - UX web: redirection vers /auth avec détail encodé (query ?error=...).
     - UX API: code et body JSON FastAPI standards pour debug et intégration front.
     """
@@ -25,4 +26,8 @@ def register_exception_handlers(app: FastAPI) -> None:
               )
               msg = urllib.parse.quote_plus(detail)
               return RedirectResponse(url=f"/auth?error={msg}", status_code=HTTP_303_SEE_OTHER)
-      return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
\ No newline at end of file
+      return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+
+    @app.exception_handler(CursorError)
+    async def bad_cursor(request, exc: CursorError):
+      return JSONResponse(status_code=400, content={"detail": "Curseur invalide"})
\ No newline at end of file
@@ -1,10 +1,15 @@
 """
 Lifespan FastAPI: initialisation/arrêt des ressources partagées.
 - Initialise FastAPILimiter (Redis) avec options de test (fakeredis).
+- Démarre les workers de la file de jobs (webhooks Stripe) et le writer différé des validations
+  de billets si Redis est configuré.
+- Démarre le pool de processus de rendu des QR codes au lancement (QR_POOL_WARMUP) et l’arrête à l’arrêt.
+- Ferme les pools HTTP partagés (clients PostgREST async et RLS utilisateur) et le client Redis applicatif à l’arrêt.
 - Variables d’environnement supportées:
   - DISABLE_FASTAPI_LIMITER_INIT_FOR_TESTS=1: désactive complètement (tests)
   - USE_FAKE_REDIS_FOR_TESTS=1: utilise fakeredis (tests)
   - LOCAL_RATE_LIMIT_FALLBACK=1: active un fallback local si l’init échoue
+  - QR_POOL_WARMUP=0: pool de rendu QR démarré au premier usage (tests)
 """
 import os
 import logging
@@ -12,25 +17,27 @@ import redis
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi_limiter import FastAPILimiter
+from backend.infra.supabase_client import close_async_pool, close_sync_pool
+from backend.infra.redis_client import close_redis, close_async_redis
+from backend.infra import job_queue
+from backend.validation import scan_guard
+from backend.utils import qrcode_utils
 
 try:
     from fakeredis.aioredis import FakeRedis  # tests only
 except Exception:
     FakeRedis = None
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+async def _init_rate_limiter(app: FastAPI, logger: logging.Logger) -> None:
     """
     Configure le rate limiting et gère les fallbacks.
     - En cas d’échec de Redis et sans fallback, le rate limiting est désactivé proprement.
     - Les logs indiquent l’état effectif (enabled/disabled) pour observabilité.
     """
-    logger = logging.getLogger("uvicorn.error")
     try:
         if os.getenv("DISABLE_FASTAPI_LIMITER_INIT_FOR_TESTS") == "1":
             app.state.rate_limit_enabled = False
             logger.info("Rate limiting disabled by DISABLE_FASTAPI_LIMITER_INIT_FOR_TESTS")
-            yield
             return
 
         use_fake = os.getenv("USE_FAKE_REDIS_FOR_TESTS") == "1"
@@ -53,4 +60,25 @@ async def lifespan(app: FastAPI):
             app.state.rate_limit_enabled = False
             logger.warning(f"Rate limiting disabled due to init error: {e}")
 
-    yield
\ No newline at end of file
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Démarrage: rate limiting (Redis/fakeredis), workers de la file de jobs, writer des validations, pool de rendu QR.
+    Arrêt: arrêt des workers et du writer (dernière vidange), fermeture des pools HTTP partagés (async et RLS utilisateur) vers Supabase et des clients Redis.
+    """
+    logger = logging.getLogger("uvicorn.error")
+    await _init_rate_limiter(app, logger)
+    workers = await job_queue.start_workers(app)
+    logger.info("Job queue workers started: %s", len(workers))
+    await scan_guard.start_writer(app)
+    qrcode_utils.warm_pool()
+    try:
+        yield
+    finally:
+        await job_queue.stop_workers(app)
+        await scan_guard.stop_writer(app)
+        qrcode_utils.shutdown_pool()
+        await close_async_redis()
+        await close_async_pool()
+        close_sync_pool()
+        close_redis()
@@ -1,10 +1,21 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
+import logging
+import jwt
+from backend.config import (
+    AUTH_LOCAL_JWT,
+    SUPABASE_JWT_SECRET,
+    SUPABASE_JWKS_URL,
+    SUPABASE_JWT_AUDIENCE,
+    SUPABASE_JWT_ISSUER,
+)
 from backend.users.repository import get_user_by_email, get_user_by_id, upsert_user_profile
 from backend.infra.supabase_client import (
     get_supabase,
     get_service_supabase,
 )
 
+logger = logging.getLogger(__name__)
+
 # --- Auth (supabase.auth.*) ---
 
 def auth_sign_in_password(email: str, password: str):
@@ -66,5 +77,67 @@ def get_user_from_access_token(access_token: str) -> Dict[str, Any]:
         }
     return user or {}
 
+# --- Vérification locale des JWT (sans aller-retour GoTrue) ---
+
+_jwks_client: Optional[jwt.PyJWKClient] = None
+
+def _get_jwks_client() -> Optional[jwt.PyJWKClient]:
+    """Client JWKS paresseux (clés mises en cache en mémoire par PyJWKClient)."""
+    global _jwks_client
+    if _jwks_client is None and SUPABASE_JWKS_URL:
+        _jwks_client = jwt.PyJWKClient(SUPABASE_JWKS_URL, cache_keys=True, lifespan=3600)
+    return _jwks_client
+
+def _local_verification_key(access_token: str) -> Optional[Tuple[Any, List[str]]]:
+    """Détermine la clé de vérification à partir de l'en-tête du JWT.
+    - HS256: secret du projet (SUPABASE_JWT_SECRET)
+    - RS256/ES256: clé publique issue du JWKS (SUPABASE_JWKS_URL)
+    - Retourne None si aucune clé locale ne permet de conclure
+    - Lève jwt.InvalidTokenError si l'en-tête est illisible
+    """
+    header = jwt.get_unverified_header(access_token)
+    alg = header.get("alg")
+    if alg == "HS256":
+        return (SUPABASE_JWT_SECRET, ["HS256"]) if SUPABASE_JWT_SECRET else None
+    if alg in ("RS256", "ES256"):
+        client = _get_jwks_client()
+        if client is None:
+            return None
+        try:
+            return client.get_signing_key_from_jwt(access_token).key, [alg]
+        except Exception as e:
+            # JWKS injoignable, kid inconnu ou backend crypto absent: on laisse conclure GoTrue
+            logger.warning("auth.repository: JWKS indisponible pour alg=%s: %s", alg, e)
+            return None
+    return None
+
+def decode_access_token_locally(access_token: str) -> Optional[Dict[str, Any]]:
+    """Vérifie localement un access token Supabase (signature, exp, aud, iss).
+    - Retourne l'utilisateur normalisé {id, email, user_metadata, exp} si le token est valide
+    - Retourne None si la vérification locale ne peut pas conclure (désactivée, pas de secret/JWKS, algo inconnu)
+    - Lève jwt.InvalidTokenError si le token est invalide (signature, expiration, audience, issuer)
+    """
+    if not AUTH_LOCAL_JWT or not access_token:
+        return None
+    key_info = _local_verification_key(access_token)
+    if key_info is None:
+        return None
+    key, algorithms = key_info
+    claims = jwt.decode(
+        access_token,
+        key,
+        algorithms=algorithms,
+        audience=SUPABASE_JWT_AUDIENCE or None,
+        issuer=SUPABASE_JWT_ISSUER or None,
+        options={"require": ["exp", "sub"], "verify_aud": bool(SUPABASE_JWT_AUDIENCE)},
+        leeway=5,
+    )
+    return {
+        "id": claims.get("sub"),
+        "email": claims.get("email"),
+        "user_metadata": claims.get("user_metadata") or {},
+        "exp": claims.get("exp"),
+    }
+
 # --- Table users (profil applicatif) ---
 # Les fonctions get_user_by_email, get_user_by_id, upsert_user_profile restent importées depuis backend.users.repository
\ No newline at end of file
@@ -1,13 +1,25 @@
 from typing import Optional, Dict, Any
+import copy
+import hashlib
+import time
+import jwt
 from backend.auth.models import AuthResponse, make_auth_response, handle_exception
 from backend.users.repository import get_user_by_email
-from backend.config import SIGNUP_REDIRECT_URL
+from backend.config import (
+    SIGNUP_REDIRECT_URL,
+    AUTH_TOKEN_CACHE_TTL,
+    AUTH_TOKEN_CACHE_MAXSIZE,
+    PROFILE_SYNC_TTL,
+    PROFILE_SYNC_MAXSIZE,
+)
+from backend.utils.cache import named_cache
 from .repository import (
     auth_sign_in_password as sign_in_password,
     auth_sign_up_account as sign_up_account,
     auth_send_reset_password as send_reset_password,
     auth_update_user_password as _update_user_password,
     get_user_from_access_token as _repo_get_user_from_token,
+    decode_access_token_locally as _repo_decode_token_locally,
     upsert_user_profile as _repo_upsert_user_profile,
 )
 
@@ -115,29 +127,78 @@ def update_password(user_token: str, new_password: str) -> AuthResponse:
 
 # --- Intégration sécurité / profil ---
 
+# Cache token -> utilisateur normalisé, clé = sha256(token) (le token brut n'est jamais conservé comme clé)
+_token_cache = named_cache("auth_tokens", maxsize=AUTH_TOKEN_CACHE_MAXSIZE, ttl=AUTH_TOKEN_CACHE_TTL)
+
+def _token_cache_key(access_token: str) -> str:
+    return hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+
+def _token_remaining_ttl(access_token: str, exp: Any = None) -> Optional[float]:
+    """Durée de vie restante du token (secondes) d'après son claim exp, ou None si inconnue.
+    - Lecture non vérifiée acceptable ici: le token a déjà été validé (localement ou par GoTrue)
+    """
+    if exp is None:
+        try:
+            exp = jwt.decode(access_token, options={"verify_signature": False}).get("exp")
+        except Exception:
+            return None
+    try:
+        return float(exp) - time.time()
+    except (TypeError, ValueError):
+        return None
+
 def get_user_from_token(access_token: str) -> Dict[str, Any]:
-    """Normalise user issu de supabase.auth.get_user(access_token):
+    """Normalise l'utilisateur associé à un access token Supabase:
+    - Vérifie d'abord le JWT localement (signature, exp, aud, iss) sans appel réseau
+    - Retombe sur supabase.auth.get_user(access_token) si la vérification locale ne peut pas conclure
     - Retourne {id, email, metadata, role, token}
-    - Calcule le rôle via determine_role et synchronise le profil (bio) en best-effort
+    - Calcule le rôle via determine_role
+    - Synchronise le profil (bio) uniquement si l'utilisateur n'a pas encore été vu par ce processus
+    - Lève une exception si le token est invalide (traduite en 401 par get_current_user)
+    - Résultat mis en cache (LRU borné) jusqu'à min(exp du token, AUTH_TOKEN_CACHE_TTL); chaque appel
+      reçoit une copie profonde (un appelant qui modifie metadata n'altère pas l'entrée en cache)
     """
-    raw = _repo_get_user_from_token(access_token)
+    cache_key = _token_cache_key(access_token)
+    cached = _token_cache.get(cache_key)
+    if cached is not None:
+        return copy.deepcopy(cached)
+
+    raw = _repo_decode_token_locally(access_token)
+    if raw is None:
+        raw = _repo_get_user_from_token(access_token)
     email = raw.get("email")
     metadata = raw.get("user_metadata") or {}
     uid = raw.get("id")
     role = determine_role(metadata)
 
-    # Garantir la présence d'une clé utilisateur (bio) si manquante
-    try:
-        sync_user_profile(uid, email, role)
-    except Exception:
-        pass
+    # Garantir la présence d'une clé utilisateur (bio) si manquante — une seule fois par utilisateur
+    if uid and not is_profile_synced(uid, role):
+        try:
+            sync_user_profile(uid, email, role)
+        except Exception:
+            pass
+
+    user = {"id": uid, "email": email, "metadata": metadata, "role": role, "token": access_token}
+    if uid:
+        remaining = _token_remaining_ttl(access_token, raw.get("exp"))
+        _token_cache.set(cache_key, user, ttl=remaining)
+    return copy.deepcopy(user)
+
+# Utilisateurs déjà synchronisés (clé "uid:role": un changement de rôle déclenche une nouvelle synchro)
+_synced_profiles = named_cache("synced_profiles", maxsize=PROFILE_SYNC_MAXSIZE, ttl=PROFILE_SYNC_TTL)
+
+def _profile_sync_key(user_id: str, role: Optional[str]) -> str:
+    return f"{user_id}:{role or ''}"
 
-    return {"id": uid, "email": email, "metadata": metadata, "role": role, "token": access_token}
+def is_profile_synced(user_id: str, role: Optional[str] = None) -> bool:
+    """Indique si le profil de cet utilisateur a déjà été synchronisé par ce processus."""
+    return _profile_sync_key(user_id, role) in _synced_profiles
 
 def sync_user_profile(user_id: str, email: str, role: Optional[str] = None) -> bool:
     """Synchronisation profil applicatif (table users):
     - Assure la présence d’une clé bio stable (secrets.token_urlsafe) si absente
     - Met à jour le profil (email, rôle, bio) via upsert_user_profile
+    - Appelée au login/signup et à la première apparition d'un utilisateur; mémorise le succès
     """
     # Génère une clé utilisateur si absente (stockée dans users.bio)
     from backend.users.repository import get_user_by_id as _repo_get_user_by_id
@@ -151,4 +212,7 @@ def sync_user_profile(user_id: str, email: str, role: Optional[str] = None) -> b
             bio_to_set = secrets.token_urlsafe(24)
     except Exception:
         pass
-    return _repo_upsert_user_profile(user_id, email, role, bio=bio_to_set)
\ No newline at end of file
+    ok = _repo_upsert_user_profile(user_id, email, role, bio=bio_to_set)
+    if ok is True and user_id:
+        _synced_profiles.set(_profile_sync_key(user_id, role), True)
+    return ok
\ No newline at end of file
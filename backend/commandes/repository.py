@@ -3,11 +3,15 @@
 - create_pending_commande: crée une commande 'pending' et retourne (id, token).
 - fulfill_commande: complète la commande avec l’identifiant Stripe (session_id).
 Notes:
-- Écritures via get_service_supabase() (clé service).
+- Écritures via get_service_supabase() (clé service), ligne écrite renvoyée par PostgREST
+  (return=representation): pas de relecture.
 - Stratégie d’erreurs: valeurs neutres et logs pour éviter les crashs.
 """
 from typing import List, Dict, Any, Optional
+from postgrest import ReturnMethod
 from backend.infra.supabase_client import get_supabase, get_service_supabase
+from backend.tickets.repository import invalidate_user_tickets_count
+from backend.infra import table_counters
 import logging
 
 logger = logging.getLogger(__name__)
@@ -33,7 +37,7 @@ def fetch_admin_commandes(limit: int = 100) -> List[dict]:
 def create_pending_commande(offre_id: str, user_id: str, price_paid: float) -> Optional[Dict[str, Any]]:
     """Crée une commande 'pending' pour l’utilisateur et l’offre.
     - Écrit les champs: offre_id, user_id, price_paid.
-    - Retourne: première ligne (id, token) si dispo, sinon None.
+    - Retourne: ligne créée (id, token, ...) renvoyée par l’insert, sinon None.
     """
     try:
         res = (
@@ -43,10 +47,11 @@ def create_pending_commande(offre_id: str, user_id: str, price_paid: float) -> O
                 "offre_id": offre_id,
                 "user_id": user_id,
                 "price_paid": price_paid,
-            })
-            .select("id, token")
+            }, returning=ReturnMethod.representation)
             .execute()
         )
+        invalidate_user_tickets_count(user_id)
+        table_counters.adjust("commandes", 1)
         return res.data[0] if res.data else None
     except Exception as e:
         logger.error(f"Erreur create_pending_commande: {e}")
@@ -62,11 +67,11 @@ def fulfill_commande(token: str, stripe_session_id: str) -> bool:
             .table("commandes")
             .update({
                 "stripe_session_id": stripe_session_id,
-            })
+            }, returning=ReturnMethod.representation)
             .eq("token", token)
             .execute()
         )
         return len(res.data) > 0
     except Exception as e:
         logger.error(f"Erreur fulfill_commande: {e}")
-        return False
\ No newline at end of file
+        return False
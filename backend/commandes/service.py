@@ -11,9 +11,12 @@ from typing import Dict, Any
 import logging
 from backend.commandes import repository
 from backend.payments.stripe_client import create_session, get_session
+from backend.infra import job_queue
 
 logger = logging.getLogger(__name__)
 
+STRIPE_EVENT_JOB = "commandes.stripe_event"
+
 def create_checkout_session_for_offre(offre: Dict[str, Any], user_id: str, success_url: str, cancel_url: str) -> Dict[str, Any]:
     """Crée une commande « pending » puis une session Stripe pour l'offre donnée.
     - Génère une entrée en DB (token) via repository.create_pending_commande.
@@ -63,6 +66,9 @@ def webhook_handle_event(event: Dict[str, Any]) -> Dict[str, Any]:
         logger.exception("Erreur webhook_handle_event")
         raise
 
+# Traitement différé des events mis en file par le webhook (update idempotent par token)
+job_queue.register_handler(STRIPE_EVENT_JOB, webhook_handle_event)
+
 def confirm_checkout(session_id: str) -> Dict[str, Any]:
     """Alternative sans webhook: vérifie la session Stripe et confirme la commande via metadata.commande_token.
     - get_session(session_id): lit la session Stripe.
@@ -10,6 +10,7 @@ Sécurité:
 """
 from fastapi import APIRouter, Request, Depends, HTTPException
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from typing import Dict, Any
 import logging
 
@@ -18,6 +19,7 @@ from backend.utils.rate_limit import optional_rate_limit
 # Module-level (imports)
 from backend.payments.stripe_client import parse_event
 from backend.commandes import service as commandes_service
+from backend.infra import job_queue
 # from backend.models import offres as offres_model
 from backend.offres import repository as offres_model
 
@@ -38,7 +40,7 @@ async def api_create_checkout_session(request: Request, user: dict = Depends(req
     try:
         data = await request.json()
         offre_id = data.get("offre_id")
-        offre = offres_model.get_offre(offre_id)
+        offre = await offres_model.get_offre_async(offre_id)
 
         if not offre:
             raise HTTPException(status_code=404, detail="Offre non trouvée")
@@ -48,8 +50,9 @@ async def api_create_checkout_session(request: Request, user: dict = Depends(req
         success_url = str(request.url_for("mes_billets_page"))
         cancel_url = str(request.url_for("billeterie_page"))
 
-        checkout_session = commandes_service.create_checkout_session_for_offre(
-            offre, user_id, success_url, cancel_url
+        # Service synchrone (insert + SDK Stripe): exécuté hors de la boucle d'événements
+        checkout_session = await run_in_threadpool(
+            commandes_service.create_checkout_session_for_offre, offre, user_id, success_url, cancel_url
         )
         return JSONResponse({"sessionId": checkout_session.get("id")})
     except HTTPException:
@@ -63,12 +66,16 @@ async def api_create_checkout_session(request: Request, user: dict = Depends(req
 async def webhook_stripe(request: Request):
     """Webhook Stripe: confirme la commande lorsque checkout.session.completed est reçu.
     - parse_event: valide la signature et parse le payload Stripe.
+    - Mise en file (job_queue) puis réponse immédiate {"status":"queued"}; les workers du lifespan
+      complètent la commande. Sans file (Redis absent), traitement inline:
     - Délègue au service: complète la commande via metadata.commande_token.
     - Réponse: {"status":"ok"} même si aucune action (idempotence souhaitée).
     """
     try:
         event = await parse_event(request)
-        result = commandes_service.webhook_handle_event(event)
+        if await job_queue.enqueue(commandes_service.STRIPE_EVENT_JOB, event):
+            return {"status": "queued"}
+        result = await run_in_threadpool(commandes_service.webhook_handle_event, event)
         return result
     except Exception as e:
         logger.exception("Erreur webhook_stripe")
@@ -83,7 +90,7 @@ async def confirm_checkout(session_id: str):
     - Complète la commande si metadata.commande_token est présent.
     """
     try:
-        return commandes_service.confirm_checkout(session_id)
+        return await run_in_threadpool(commandes_service.confirm_checkout, session_id)
     except RuntimeError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception:
@@ -72,4 +72,136 @@ CHECKOUT_CANCEL_PATH = os.getenv("CHECKOUT_CANCEL_PATH", "/session?payment=cance
 # Supabase service key (opérations privilégiées côté serveur)
 SUPABASE_SERVICE_KEY = _clean_env(os.getenv("SUPABASE_SERVICE_KEY") or "")
 
-BASE_URL = _clean_env(os.getenv("BASE_URL") or "http://localhost:8000")
\ No newline at end of file
+BASE_URL = _clean_env(os.getenv("BASE_URL") or "http://localhost:8000")
+# Vérification locale des access tokens Supabase (JWT)
+# - SUPABASE_JWT_SECRET: secret HS256 du projet (Dashboard > Settings > API > JWT Secret)
+# - SUPABASE_JWKS_URL: JWKS pour les clés asymétriques (RS256/ES256), ex. <SUPABASE_URL>/auth/v1/.well-known/jwks.json
+# - Sans secret ni JWKS, la vérification retombe sur l'appel distant supabase.auth.get_user
+AUTH_LOCAL_JWT = (os.getenv("AUTH_LOCAL_JWT", "true").lower() == "true")
+SUPABASE_JWT_SECRET = _clean_env(os.getenv("SUPABASE_JWT_SECRET") or "")
+SUPABASE_JWKS_URL = _clean_env(os.getenv("SUPABASE_JWKS_URL") or "")
+SUPABASE_JWT_AUDIENCE = _clean_env(os.getenv("SUPABASE_JWT_AUDIENCE") or "authenticated")
+SUPABASE_JWT_ISSUER = _clean_env(os.getenv("SUPABASE_JWT_ISSUER") or (f"{SUPABASE_URL}/auth/v1" if SUPABASE_URL else ""))
+
+# Cache mémoire token -> utilisateur (get_user_from_token)
+# - TTL effectif d'une entrée = min(exp du token, AUTH_TOKEN_CACHE_TTL); 0 désactive le cache
+AUTH_TOKEN_CACHE_TTL = float(os.getenv("AUTH_TOKEN_CACHE_TTL", "60"))
+AUTH_TOKEN_CACHE_MAXSIZE = int(os.getenv("AUTH_TOKEN_CACHE_MAXSIZE", "10000"))
+
+# Synchronisation du profil applicatif (table users): une fois par utilisateur et par processus
+# - Durée pendant laquelle un utilisateur déjà synchronisé n'est plus re-synchronisé par get_user_from_token
+PROFILE_SYNC_TTL = float(os.getenv("PROFILE_SYNC_TTL", "21600"))
+PROFILE_SYNC_MAXSIZE = int(os.getenv("PROFILE_SYNC_MAXSIZE", "100000"))
+
+# Pool HTTP partagé vers PostgREST (clients async et RLS utilisateur)
+SUPABASE_HTTP_MAX_CONNECTIONS = int(os.getenv("SUPABASE_HTTP_MAX_CONNECTIONS", "100"))
+SUPABASE_HTTP_MAX_KEEPALIVE = int(os.getenv("SUPABASE_HTTP_MAX_KEEPALIVE", "20"))
+SUPABASE_HTTP_TIMEOUT = float(os.getenv("SUPABASE_HTTP_TIMEOUT", "10"))
+
+# Insertion des billets (commandes) en lot: nombre maximal de lignes par requête PostgREST
+COMMANDES_INSERT_CHUNK_SIZE = int(os.getenv("COMMANDES_INSERT_CHUNK_SIZE", "500"))
+
+# Redis applicatif (registres d'idempotence, files, compteurs)
+# - REDIS_URL, à défaut RATE_LIMIT_REDIS_URL; vide => registres en mémoire du processus
+REDIS_URL = _clean_env(os.getenv("REDIS_URL") or os.getenv("RATE_LIMIT_REDIS_URL") or "")
+
+# Idempotence du traitement des sessions Stripe (webhook + confirm)
+# - PAYMENTS_SESSION_LOCK_TTL: durée max d'un traitement en cours (claim) avant reprise possible
+# - PAYMENTS_SESSION_RESULT_TTL: conservation du résultat (Stripe réessaie les webhooks jusqu'à 3 jours)
+# - PAYMENTS_SESSION_WAIT: attente max d'un appel concurrent sur un traitement en cours
+PAYMENTS_SESSION_LOCK_TTL = int(os.getenv("PAYMENTS_SESSION_LOCK_TTL", "120"))
+PAYMENTS_SESSION_RESULT_TTL = int(os.getenv("PAYMENTS_SESSION_RESULT_TTL", str(7 * 24 * 3600)))
+PAYMENTS_SESSION_WAIT = float(os.getenv("PAYMENTS_SESSION_WAIT", "10"))
+
+# File de jobs (Redis) pour le traitement des webhooks Stripe hors requête HTTP
+# - JOB_QUEUE_ENABLED=false: traitement inline dans la requête (comportement historique)
+# - Sans Redis configuré, le webhook traite aussi inline
+JOB_QUEUE_ENABLED = (os.getenv("JOB_QUEUE_ENABLED", "true").lower() == "true")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "2"))
+JOB_POLL_TIMEOUT = float(os.getenv("JOB_POLL_TIMEOUT", "1"))
+
+# Bail (lease) des listes "processing" par instance (file de jobs, writer des validations)
+# - WORK_LEASE_TTL: durée du bail (secondes), renouvelé au tiers; au-delà sans renouvellement,
+#   l'instance est considérée arrêtée et ses éléments en cours sont remis en file par une autre
+WORK_LEASE_TTL = float(os.getenv("WORK_LEASE_TTL", "30"))
+
+# Catalogue des offres en cache mémoire (vitrine, /session, panier, checkout)
+# - Invalidation explicite sur create/update/delete_offre; le TTL borne la fraîcheur entre instances
+OFFRES_CACHE_TTL = float(os.getenv("OFFRES_CACHE_TTL", "60"))
+
+# Liste publique des événements pré-sérialisée (GET /api/v1/evenements)
+# - Invalidation explicite sur create/update/delete; le TTL borne la fraîcheur entre instances
+EVENEMENTS_CACHE_TTL = float(os.getenv("EVENEMENTS_CACHE_TTL", "60"))
+
+# Jetons de billet signés (QR vérifiable hors ligne, HMAC-SHA256)
+# - TICKET_SIGNING_SECRET vide => QR émis au format historique "<user_key>.<ticket_token>"
+# - TICKET_SIGNING_PREVIOUS_SECRETS: anciens secrets encore acceptés en vérification (rotation)
+# - TICKET_LEGACY_TOKENS=false: refuse le format historique au scan
+TICKET_SIGNING_SECRET = _clean_env(os.getenv("TICKET_SIGNING_SECRET") or "")
+TICKET_SIGNING_PREVIOUS_SECRETS = _clean_env(os.getenv("TICKET_SIGNING_PREVIOUS_SECRETS") or "")
+TICKET_LEGACY_TOKENS = (os.getenv("TICKET_LEGACY_TOKENS", "true").lower() == "true")
+
+# Garde anti-double scan (Redis SET NX) et écriture différée des validations
+# - SCAN_GUARD_ENABLED=false ou Redis non configuré: insert direct en base à chaque scan
+# - SCAN_CLAIM_TTL: durée de conservation d'un scan gagnant dans Redis (au-delà, la base fait foi)
+# - SCAN_WRITE_BATCH_SIZE / SCAN_WRITE_INTERVAL: taille max d'un lot d'insertion et pause quand la file est vide
+SCAN_GUARD_ENABLED = (os.getenv("SCAN_GUARD_ENABLED", "true").lower() == "true")
+SCAN_CLAIM_TTL = int(os.getenv("SCAN_CLAIM_TTL", str(7 * 24 * 3600)))
+SCAN_WRITE_BATCH_SIZE = int(os.getenv("SCAN_WRITE_BATCH_SIZE", "200"))
+SCAN_WRITE_INTERVAL = float(os.getenv("SCAN_WRITE_INTERVAL", "0.5"))
+
+# Scan par lot (POST /api/v1/validation/scan/batch): nombre maximal de tokens par requête
+SCAN_BATCH_MAX_TOKENS = int(os.getenv("SCAN_BATCH_MAX_TOKENS", "500"))
+
+# Manifeste hors ligne des billets par offre (GET /api/v1/validation/manifest)
+# - MANIFEST_CACHE_TTL: durée de l'instantané mémoire par offre (une lecture base par période)
+# - MANIFEST_HASH_BYTES: taille des empreintes SHA-256 tronquées
+# - MANIFEST_DELTA_OVERLAP: recouvrement (secondes) des deltas pour les écritures validées en retard
+MANIFEST_CACHE_TTL = float(os.getenv("MANIFEST_CACHE_TTL", "30"))
+MANIFEST_HASH_BYTES = int(os.getenv("MANIFEST_HASH_BYTES", "8"))
+MANIFEST_DELTA_OVERLAP = float(os.getenv("MANIFEST_DELTA_OVERLAP", "60"))
+
+# Cache des QR codes (rendu déterministe pour un contenu donné)
+# - QR_CACHE_MAXSIZE / QR_CACHE_TTL: cache mémoire LRU (octets PNG/SVG)
+# - QR_CACHE_DIR: répertoire de cache disque partagé entre processus (vide => désactivé)
+# - QR_CACHE_DIR_MAX_MB / QR_CACHE_DIR_MAX_AGE: taille maximale (Mo) et âge maximal (secondes depuis
+#   le dernier usage) des fichiers du cache disque (0 => pas de limite)
+# - QR_CACHE_DIR_PRUNE_INTERVAL: intervalle minimal (secondes) entre deux nettoyages par processus
+QR_CACHE_MAXSIZE = int(os.getenv("QR_CACHE_MAXSIZE", "2048"))
+QR_CACHE_TTL = float(os.getenv("QR_CACHE_TTL", "86400"))
+QR_CACHE_DIR = _clean_env(os.getenv("QR_CACHE_DIR") or "")
+QR_CACHE_DIR_MAX_MB = float(os.getenv("QR_CACHE_DIR_MAX_MB", "256"))
+QR_CACHE_DIR_MAX_AGE = float(os.getenv("QR_CACHE_DIR_MAX_AGE", str(30 * 86400)))
+QR_CACHE_DIR_PRUNE_INTERVAL = float(os.getenv("QR_CACHE_DIR_PRUNE_INTERVAL", "600"))
+
+# Rendu groupé des QR codes (GET /api/v1/tickets/?include_qr=1)
+# - QR_RENDER_WORKERS: taille du pool de processus de rendu (0 => rendu dans le processus courant)
+# - QR_RENDER_TIMEOUT: budget (secondes) du rendu groupé; au-delà, les QR non rendus sont omis
+#   de la réponse (leur rendu se termine en arrière-plan et alimente le cache)
+# - QR_POOL_WARMUP: démarre les processus du pool au lancement de l'application (0 => au premier usage)
+QR_RENDER_WORKERS = int(os.getenv("QR_RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+QR_RENDER_TIMEOUT = float(os.getenv("QR_RENDER_TIMEOUT", "2"))
+QR_POOL_WARMUP = os.getenv("QR_POOL_WARMUP", "1") == "1"
+
+# Nombre de billets par utilisateur (GET /api/v1/tickets/count), COUNT côté base mis en cache
+# - Invalidation explicite à l'insertion de commandes; le TTL borne la fraîcheur entre instances
+TICKETS_COUNT_CACHE_TTL = float(os.getenv("TICKETS_COUNT_CACHE_TTL", "60"))
+
+# Compteurs du tableau de bord admin (users, commandes, offres, evenements)
+# - ADMIN_COUNTS_CACHE_TTL: cache mémoire des comptes (secondes)
+# - ADMIN_COUNTER_TTL: durée d'un compteur Redis tenu à jour par les insert/delete avant recomptage en base
+# - ADMIN_COUNT_METHOD: exact | planned | estimated (estimations Postgres pour les grosses tables)
+ADMIN_COUNTS_CACHE_TTL = float(os.getenv("ADMIN_COUNTS_CACHE_TTL", "10"))
+ADMIN_COUNTER_TTL = int(os.getenv("ADMIN_COUNTER_TTL", "600"))
+ADMIN_COUNT_METHOD = (os.getenv("ADMIN_COUNT_METHOD", "exact").strip().lower() or "exact")
+
+# Exports admin en flux (GET /admin/api/commandes/export, /admin/api/users/export)
+# - EXPORT_PAGE_SIZE: lignes lues par requête (pagination keyset sur created_at, id)
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+
+# Pagination par curseur des endpoints de liste (?cursor=&limit=)
+# - PAGE_SIZE_DEFAULT: taille de page sans limit; PAGE_SIZE_MAX: borne supérieure de limit
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "100"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "500"))
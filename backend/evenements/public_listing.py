@@ -0,0 +1,86 @@
+"""Liste publique des événements (billetterie), normalisée et pré-sérialisée.
+- Les lignes sont normalisées une fois ({id, title, date, lieu, type_evenement, description, image})
+  puis encodées en JSON (bytes) avec un ETag (hash du contenu, identique entre instances).
+- Version: incrémentée par chaque écriture (create/update/delete) via invalidate(); une lecture
+  démarrée avant une invalidation n’est pas remise en cache.
+- TTL EVENEMENTS_CACHE_TTL: borne la fraîcheur entre instances.
+- Erreur Supabase: propagée (la vue répond 500), rien n’est mis en cache.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional
+import hashlib
+import json
+import threading
+
+import backend.infra.supabase_client as supabase_client
+from backend.config import EVENEMENTS_CACHE_TTL
+from backend.utils.cache import named_cache
+
+_LISTING_KEY = "public"
+_cache = named_cache("evenements_public", maxsize=1, ttl=EVENEMENTS_CACHE_TTL)
+_version_lock = threading.Lock()
+_version = 0
+
+
+class PublicListing(NamedTuple):
+    body: bytes
+    etag: str
+    version: int
+
+
+def normalize(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Normalise les colonnes DB {nom_evenement, date_evenement, ...} vers le schéma public."""
+    return [
+        {
+            "id": r.get("id"),
+            "title": r.get("nom_evenement") or "",
+            "date": r.get("date_evenement") or "",
+            "lieu": r.get("lieu"),
+            "type_evenement": r.get("type_evenement"),
+            "description": r.get("description") or "",  # vide si absent en DB
+            "image": r.get("image") or "",              # vide si absent en DB
+        }
+        for r in rows
+    ]
+
+
+def encode(items: List[Dict[str, Any]], version: int) -> PublicListing:
+    """Sérialise la liste (JSON compact UTF-8, comme JSONResponse) et calcule l’ETag."""
+    body = json.dumps(items, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    return PublicListing(body=body, etag=etag, version=version)
+
+
+async def get_public_listing() -> PublicListing:
+    """Retourne la liste encodée (cache mémoire, chargement via le pool async en cas d’absence)."""
+    cached: Optional[PublicListing] = _cache.get(_LISTING_KEY)
+    if cached is not None:
+        return cached
+    version = _version
+    res = await (
+        supabase_client.get_async_supabase()
+        .table("evenements")
+        .select("id, nom_evenement, type_evenement, date_evenement, lieu")
+        .order("date_evenement", desc=False)
+        .execute()
+    )
+    listing = encode(normalize(res.data or []), version)
+    with _version_lock:
+        if version == _version:
+            _cache.set(_LISTING_KEY, listing)
+    return listing
+
+
+def invalidate() -> None:
+    """Incrémente la version et vide le cache (appelé après toute écriture sur evenements)."""
+    global _version
+    with _version_lock:
+        _version += 1
+        _cache.clear()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Évalue If-None-Match (liste d’ETags, préfixe faible W/ ou *) contre l’ETag courant."""
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or any(c.removeprefix("W/") == etag for c in candidates)
@@ -1,26 +1,51 @@
 """Couche d'accès données pour les événements.
 - Lecture: via get_supabase() (respect des policies RLS).
-- Écriture (create/update/delete): via get_service_supabase() (clé service).
+- Écriture (create/update/delete): via get_service_supabase() (clé service), ligne écrite
+  renvoyée par l'écriture (return=representation).
+- Écritures: incrémentent la version de la liste publique pré-sérialisée (public_listing.invalidate);
+  insert/delete ajustent le compteur admin (table_counters).
 - Tolérance aux erreurs: renvoie valeurs neutres ([], None, False) en cas d'exception.
 """
 from typing import List, Optional, Dict, Any
-from backend.infra.supabase_client import get_supabase, get_service_supabase
+from postgrest import ReturnMethod
+from backend.infra.supabase_client import (
+    get_supabase,
+    get_service_supabase,
+    get_async_service_supabase,
+)
+from backend.evenements import public_listing
+from backend.infra import table_counters
+from backend.utils.pagination import CursorError, Keyset, Page, fetch_page
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Colonnes de la table evenements lues par l'API et l'admin (mêmes champs que les écritures)
+EVENEMENT_COLUMNS = "id, type_evenement, nom_evenement, lieu, date_evenement"
+
 def list_evenements() -> List[dict]:
     """Liste tous les événements.
-    - Table: evenements
+    - Table: evenements (colonnes EVENEMENT_COLUMNS)
     - Tri: date_evenement asc
     - Erreur: [] si exception
     """
     try:
-        res = get_supabase().table("evenements").select("*").order("date_evenement", desc=False).execute()
+        res = get_supabase().table("evenements").select(EVENEMENT_COLUMNS).order("date_evenement", desc=False).execute()
         return res.data or []
     except Exception:
         return []
 
+def list_evenements_page(after: Optional[Keyset], limit: int) -> Page:
+    """Page d'événements (date_evenement asc, id), reprise après `after`; Page vide si exception."""
+    try:
+        query = get_supabase().table("evenements").select(EVENEMENT_COLUMNS)
+        return fetch_page(query, after, limit, "date_evenement")
+    except CursorError:
+        raise
+    except Exception:
+        logger.exception("evenements.repository.list_evenements_page failed")
+        return Page([], None)
+
 def get_evenement(evenement_id: str) -> Optional[dict]:
     """Récupère un événement par id.
     - Retour: dict ou None si introuvable/erreur
@@ -31,7 +56,7 @@ def get_evenement(evenement_id: str) -> Optional[dict]:
         res = (
             get_supabase()
             .table("evenements")
-            .select("*")
+            .select(EVENEMENT_COLUMNS)
             .eq("id", evenement_id)
             .single()
             .execute()
@@ -46,7 +71,9 @@ def create_evenement(data: Dict[str, Any]) -> Optional[dict]:
     - Erreur: None et journalisation.
     """
     try:
-        res = get_service_supabase().table("evenements").insert(data).execute()
+        res = get_service_supabase().table("evenements").insert(data, returning=ReturnMethod.representation).execute()
+        public_listing.invalidate()
+        table_counters.adjust("evenements", 1)
         rows = getattr(res, "data", None) or []
         if isinstance(rows, list) and rows:
             return rows[0]
@@ -64,10 +91,11 @@ def update_evenement(evenement_id: str, data: Dict[str, Any]) -> Optional[dict]:
         res = (
             get_service_supabase()
             .table("evenements")
-            .update(data)
+            .update(data, returning=ReturnMethod.representation)
             .eq("id", evenement_id)
             .execute()
         )
+        public_listing.invalidate()
         rows = getattr(res, "data", None) or []
         if isinstance(rows, list) and rows:
             return rows[0]
@@ -81,8 +109,39 @@ def delete_evenement(evenement_id: str) -> bool:
     - Retour: True si succès, False si exception (journalisée).
     """
     try:
-        get_service_supabase().table("evenements").delete().eq("id", evenement_id).execute()
+        res = get_service_supabase().table("evenements").delete(returning=ReturnMethod.representation).eq("id", evenement_id).execute()
+        public_listing.invalidate()
+        table_counters.adjust("evenements", -table_counters.row_count(res))
         return True
     except Exception:
         logger.exception("evenements.repository.delete_evenement failed id=%s", evenement_id)
-        return False
\ No newline at end of file
+        return False
+
+# --- Variantes async (pool HTTP partagé, pour les handlers async def) ---
+
+async def create_evenement_async(data: Dict[str, Any]) -> Optional[dict]:
+    """Version async de create_evenement."""
+    try:
+        res = await get_async_service_supabase().table("evenements").insert(data, returning=ReturnMethod.representation).execute()
+        public_listing.invalidate()
+        table_counters.adjust("evenements", 1)
+        rows = getattr(res, "data", None) or []
+        if isinstance(rows, list) and rows:
+            return rows[0]
+        return {"status": "ok"}
+    except Exception:
+        logger.exception("evenements.repository.create_evenement_async failed data=%s", data)
+        return None
+
+async def update_evenement_async(evenement_id: str, data: Dict[str, Any]) -> Optional[dict]:
+    """Version async de update_evenement."""
+    try:
+        res = await get_async_service_supabase().table("evenements").update(data, returning=ReturnMethod.representation).eq("id", evenement_id).execute()
+        public_listing.invalidate()
+        rows = getattr(res, "data", None) or []
+        if isinstance(rows, list) and rows:
+            return rows[0]
+        return {"status": "ok"}
+    except Exception:
+        logger.exception("evenements.repository.update_evenement_async failed id=%s data=%s", evenement_id, data)
+        return None
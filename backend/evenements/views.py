@@ -1,26 +1,28 @@
 # Imports (début du fichier)
 """Endpoints API pour la gestion des événements.
 - CRUD admin: création, mise à jour, suppression (protégés par require_admin).
-- Listing: un endpoint interne (/) et un endpoint public ("") pour la billetterie, avec normalisation du schéma.
+- Listing: un endpoint interne (/, paginé par curseur) et un endpoint public ("") pour la billetterie,
+  avec normalisation du schéma (pré-sérialisée en cache, ETag / If-None-Match -> 304).
 - Gestion d'erreurs: 404 quand introuvable, 400 pour validations, 500 en cas d'échec Supabase.
 """
-from typing import List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import JSONResponse
+from typing import Dict, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
 from backend.utils.security import require_admin
 from backend.evenements import repository as evenements_repository
-from backend.infra.supabase_client import get_supabase
-from postgrest.exceptions import APIError
+from backend.evenements import public_listing
+from backend.utils.pagination import cursor_or_400, page_size
 
 router = APIRouter(prefix="/api/v1/evenements", tags=["Evenements API"])
 
 @router.get("/")
-def list_evenements():
-    """Liste interne des événements (non normalisée).
-    Retourne directement le résultat du repository (toutes colonnes).
+def list_evenements(cursor: Optional[str] = None, limit: Optional[int] = Query(None, ge=1)):
+    """Liste interne des événements (non normalisée), paginée par curseur (date_evenement, id).
+    Retourne directement le résultat du repository (colonnes EVENEMENT_COLUMNS): {"items", "next_cursor"}.
+    - 400 si le curseur est invalide
     """
-    items = evenements_repository.list_evenements()
-    return JSONResponse({"items": items})
+    page = evenements_repository.list_evenements_page(cursor_or_400(cursor), page_size(limit))
+    return JSONResponse({"items": page.items, "next_cursor": page.next_cursor})
 
 @router.get("/{evenement_id}")
 def get_evenement(evenement_id: str):
@@ -47,7 +49,7 @@ async def create_evenement(request: Request):
     }
     if not data["type_evenement"] or not data["nom_evenement"] or not data["lieu"] or not data["date_evenement"]:
         raise HTTPException(status_code=400, detail="Champs requis manquants")
-    created = evenements_repository.create_evenement(data)
+    created = await evenements_repository.create_evenement_async(data)
     if not created:
         raise HTTPException(status_code=400, detail="Echec de création")
     return JSONResponse(created)
@@ -65,7 +67,7 @@ async def update_evenement(evenement_id: str, request: Request):
             data[k] = (body.get(k) or "").strip()
     if not data:
         raise HTTPException(status_code=400, detail="Aucune donnée à mettre à jour")
-    updated = evenements_repository.update_evenement(evenement_id, data)
+    updated = await evenements_repository.update_evenement_async(evenement_id, data)
     if not updated:
         raise HTTPException(status_code=400, detail="Echec de mise à jour")
     return JSONResponse(updated)
@@ -81,35 +83,24 @@ def delete_evenement(evenement_id: str):
     return JSONResponse({"ok": True})
 
 # Endpoint public: liste pour la Billetterie
+_PUBLIC_CACHE_CONTROL = "public, max-age=0, must-revalidate"
+
 @router.get("", response_model=list[dict])
-def list_evenements_public() -> List[Dict[str, Any]]:
+async def list_evenements_public(request: Request):
     """
     Liste publique des événements (pour vitrine Billetterie).
     Normalise le schéma {id, title, date, lieu, description, image} à partir des colonnes
     réelles {nom_evenement, date_evenement, ...} présentes en DB.
+    - Corps JSON pré-encodé en cache (public_listing), invalidé par les écritures admin
+    - ETag + If-None-Match: 304 sans corps si le client a déjà la version courante
     """
     try:
-        res = (
-            get_supabase()
-            .table("evenements")
-            .select("id, nom_evenement, type_evenement, date_evenement, lieu")
-            .order("date_evenement", desc=False)
-            .execute()
-        )
-    except APIError:
+        listing = await public_listing.get_public_listing()
+    except Exception:
         # On renvoie une 500 claire si Supabase échoue
         raise HTTPException(status_code=500, detail="Erreur de lecture des événements")
 
-    rows = res.data or []
-    normalized: List[Dict[str, Any]] = []
-    for r in rows:
-        normalized.append({
-            "id": r.get("id"),
-            "title": r.get("nom_evenement") or "",
-            "date": r.get("date_evenement") or "",
-            "lieu": r.get("lieu"),
-            "type_evenement": r.get("type_evenement"),
-            "description": r.get("description") or "",  # vide si absent en DB
-            "image": r.get("image") or "",              # vide si absent en DB
-        })
-    return normalized
\ No newline at end of file
+    headers = {"ETag": listing.etag, "Cache-Control": _PUBLIC_CACHE_CONTROL}
+    if public_listing.etag_matches(request.headers.get("if-none-match"), listing.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=listing.body, media_type="application/json", headers=headers)
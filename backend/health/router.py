@@ -1,6 +1,9 @@
 from fastapi import APIRouter
 from fastapi.responses import JSONResponse
 from backend.health.service import health_supabase_info
+from backend.utils.cache import cache_stats
+from backend.infra.job_queue import queue_stats
+from backend.validation.scan_guard import writer_stats
 
 router = APIRouter(prefix="/health", tags=["Health"])
 
@@ -10,4 +13,14 @@ def health_root():
 
 @router.get("/supabase")
 def health_supabase():
-    return JSONResponse(health_supabase_info())
\ No newline at end of file
+    return JSONResponse(health_supabase_info())
+
+@router.get("/caches")
+def health_caches():
+    """Compteurs des caches mémoire (taille, hits/misses, évictions) pour le dimensionnement."""
+    return JSONResponse(cache_stats())
+
+@router.get("/queues")
+async def health_queues():
+    """Profondeur des files: jobs webhooks (backlog, en cours, retries, dead-letter) et validations à écrire."""
+    return JSONResponse({"webhooks": await queue_stats(), "scan_validations": await writer_stats()})
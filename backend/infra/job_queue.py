@@ -0,0 +1,215 @@
+"""
+File de jobs durable sur Redis (listes), consommée par des workers asyncio démarrés par le lifespan.
+
+- enqueue(kind, payload): LPUSH d’un job JSON {id, kind, payload, attempts} sur jobs:<queue>
+- Consommation: BLMOVE jobs:<queue> -> jobs:<queue>:processing:<instance> (le job reste en Redis pendant
+  le traitement, dans la liste de l’instance qui le traite)
+- Échec: nouvelle tentative différée (ZSET jobs:<queue>:delayed, backoff exponentiel JOB_RETRY_BACKOFF)
+  puis dead-letter (jobs:<queue>:dead) après JOB_MAX_ATTEMPTS tentatives
+- Reprise: les jobs d’une instance dont le bail a expiré (arrêt brutal, voir work_leases) sont remis en
+  file, au démarrage puis périodiquement; les jobs en cours chez les workers vivants ne sont pas touchés
+  (livraison au moins une fois, les handlers doivent être idempotents)
+- Handlers enregistrés par les features via register_handler(kind, fn); fn synchrone exécutée en threadpool
+- Compatible fakeredis (USE_FAKE_REDIS_FOR_TESTS=1)
+"""
+import asyncio
+import inspect
+import json
+import logging
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+import redis
+from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
+
+from backend.config import (
+    JOB_QUEUE_ENABLED,
+    JOB_WORKERS,
+    JOB_MAX_ATTEMPTS,
+    JOB_RETRY_BACKOFF,
+    JOB_POLL_TIMEOUT,
+)
+from backend.infra import redis_client, work_leases
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE = "webhooks"
+
+_handlers: Dict[str, Callable[[Any], Any]] = {}
+
+# module backend.infra.job_queue
+def register_handler(kind: str, fn: Callable[[Any], Any]) -> None:
+    """Associe un type de job à sa fonction de traitement (appelée avec le payload)."""
+    _handlers[kind] = fn
+
+def _keys(queue: str) -> Dict[str, str]:
+    base = f"jobs:{queue}"
+    return {
+        "ready": base,
+        "processing": f"{base}:processing",
+        "delayed": f"{base}:delayed",
+        "dead": f"{base}:dead",
+    }
+
+async def enqueue(kind: str, payload: Any, queue: str = DEFAULT_QUEUE) -> bool:
+    """
+    Ajoute un job à la file. Retour: True si le job est en file, False si la file est
+    indisponible (désactivée, Redis non configuré ou injoignable) => l’appelant traite inline.
+    """
+    if not JOB_QUEUE_ENABLED:
+        return False
+    client = redis_client.get_async_redis()
+    if client is None:
+        return False
+    job = {"id": str(uuid.uuid4()), "kind": kind, "payload": payload, "attempts": 0, "enqueued_at": time.time()}
+    try:
+        await client.lpush(_keys(queue)["ready"], json.dumps(job))
+        return True
+    except redis.RedisError:
+        logger.exception("job_queue.enqueue failed kind=%s", kind)
+        return False
+
+async def _promote_delayed(client, queue: str) -> None:
+    """Remet en file les retries arrivés à échéance (ZREM garantit un seul worker par job)."""
+    keys = _keys(queue)
+    due = await client.zrangebyscore(keys["delayed"], 0, time.time(), start=0, num=100)
+    for raw in due:
+        if await client.zrem(keys["delayed"], raw):
+            await client.lpush(keys["ready"], raw)
+
+async def _run_handler(fn: Callable[[Any], Any], payload: Any) -> Any:
+    if inspect.iscoroutinefunction(fn):
+        return await fn(payload)
+    return await run_in_threadpool(fn, payload)
+
+async def _handle(client, keys: Dict[str, str], raw: str) -> None:
+    """Exécute le handler d’un job; en cas d’échec, retry différé ou dead-letter."""
+    try:
+        job = json.loads(raw)
+    except Exception:
+        logger.error("job_queue: job illisible, dead-letter raw=%.200s", raw)
+        await client.lpush(keys["dead"], raw)
+        return
+
+    fn = _handlers.get(job.get("kind"))
+    try:
+        if fn is None:
+            raise LookupError(f"aucun handler pour kind={job.get('kind')}")
+        await _run_handler(fn, job.get("payload"))
+    except Exception as e:
+        job["attempts"] = int(job.get("attempts") or 0) + 1
+        job["last_error"] = str(e)[:500]
+        if fn is None or job["attempts"] >= JOB_MAX_ATTEMPTS:
+            logger.exception("job_queue dead-letter id=%s kind=%s attempts=%s", job.get("id"), job.get("kind"), job["attempts"])
+            await client.lpush(keys["dead"], json.dumps(job))
+        else:
+            delay = JOB_RETRY_BACKOFF * (2 ** (job["attempts"] - 1))
+            logger.warning("job_queue retry id=%s kind=%s attempts=%s in %.1fs", job.get("id"), job.get("kind"), job["attempts"], delay)
+            await client.zadd(keys["delayed"], {json.dumps(job): time.time() + delay})
+
+async def process_next(client, queue: str = DEFAULT_QUEUE, timeout: float = JOB_POLL_TIMEOUT) -> bool:
+    """
+    Traite au plus un job. Retour: True si un job a été consommé (succès, retry ou dead-letter).
+    - Annulation (arrêt) pendant le traitement: le job reste dans processing et sera repris au redémarrage
+    """
+    keys = _keys(queue)
+    await _promote_delayed(client, queue)
+    processing = work_leases.processing_key(keys["processing"])
+    raw = await client.blmove(keys["ready"], processing, timeout, "RIGHT", "LEFT")
+    if raw is None:
+        return False
+    await _handle(client, keys, raw)
+    await client.lrem(processing, 1, raw)
+    return True
+
+async def recover_processing(client, queue: str = DEFAULT_QUEUE) -> int:
+    """
+    Remet en file les jobs interrompus des instances sans bail (arrêt brutal), en tête de file.
+    Retour: nombre de jobs repris.
+    """
+    keys = _keys(queue)
+    moved = await work_leases.recover_expired(client, keys["processing"], keys["ready"], "RIGHT", "RIGHT")
+    if moved:
+        logger.warning("job_queue: %s job(s) repris depuis processing queue=%s", moved, queue)
+    return moved
+
+async def _worker_loop(queue: str, worker_id: int) -> None:
+    """Boucle d’un worker: consomme la file jusqu’à annulation (arrêt du lifespan)."""
+    while True:
+        try:
+            client = redis_client.get_async_redis()
+            if client is None:
+                return
+            if not await process_next(client, queue):
+                # File vide: courte pause (clients sans blocage réel, ex. fakeredis, ne cèdent pas la boucle)
+                await asyncio.sleep(0.1)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("job_queue worker=%s queue=%s error", worker_id, queue)
+            await asyncio.sleep(1)
+
+async def start_workers(app: FastAPI, queue: str = DEFAULT_QUEUE, count: Optional[int] = None) -> List[asyncio.Task]:
+    """
+    Démarre les workers (JOB_WORKERS par défaut) si la file est active et Redis configuré.
+    - Prend le bail de l’instance, reprend les jobs des instances disparues, puis une tâche
+      work_leases.keep_alive renouvelle le bail et répète la reprise
+    - Les tâches sont conservées dans app.state.job_workers (et app.state.job_lease) pour stop_workers()
+    """
+    n = JOB_WORKERS if count is None else count
+    tasks: List[asyncio.Task] = []
+    lease_task = None
+    client = redis_client.get_async_redis()
+    if JOB_QUEUE_ENABLED and client is not None and n > 0:
+        try:
+            base = _keys(queue)["processing"]
+            await work_leases.renew(client, base)
+            await recover_processing(client, queue)
+            tasks = [asyncio.create_task(_worker_loop(queue, i)) for i in range(n)]
+            lease_task = asyncio.create_task(work_leases.keep_alive(base, lambda c: recover_processing(c, queue)))
+        except redis.RedisError as e:
+            logger.warning("job_queue: workers non démarrés (Redis indisponible): %s", e)
+    app.state.job_workers = tasks
+    app.state.job_lease = lease_task
+    return tasks
+
+async def stop_workers(app: FastAPI, queue: str = DEFAULT_QUEUE) -> None:
+    """
+    Annule les workers et attend leur arrêt, puis rend le bail de l’instance: un job interrompu reste
+    dans sa liste processing et est repris par une autre instance (ou au prochain démarrage).
+    """
+    tasks = list(getattr(app.state, "job_workers", None) or [])
+    lease_task = getattr(app.state, "job_lease", None)
+    if lease_task is not None:
+        tasks.append(lease_task)
+    for t in tasks:
+        t.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+        client = redis_client.get_async_redis()
+        if client is not None:
+            try:
+                await work_leases.release(client, _keys(queue)["processing"])
+            except redis.RedisError as e:
+                logger.warning("job_queue: bail non rendu (il expirera): %s", e)
+    app.state.job_workers = []
+    app.state.job_lease = None
+
+async def queue_stats(queue: str = DEFAULT_QUEUE) -> Dict[str, Any]:
+    """Profondeur de la file (backlog), jobs en cours, retries différés et dead-letter."""
+    client = redis_client.get_async_redis()
+    if not JOB_QUEUE_ENABLED or client is None:
+        return {"enabled": False}
+    keys = _keys(queue)
+    try:
+        return {
+            "enabled": True,
+            "backlog": await client.llen(keys["ready"]),
+            "processing": await work_leases.processing_count(client, keys["processing"]),
+            "delayed": await client.zcard(keys["delayed"]),
+            "dead": await client.llen(keys["dead"]),
+        }
+    except redis.RedisError as e:
+        return {"enabled": True, "error": str(e)}
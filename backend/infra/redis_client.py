@@ -0,0 +1,115 @@
+"""
+Client Redis partagé pour les registres applicatifs (idempotence, files, compteurs).
+- URL: REDIS_URL (à défaut RATE_LIMIT_REDIS_URL)
+- USE_FAKE_REDIS_FOR_TESTS=1: fakeredis en mémoire (tests)
+- get_redis(): client synchrone (threads / routes sync); get_async_redis(): client asyncio (workers, routes async)
+- Sans configuration: get_redis() / get_async_redis() retournent None et les appelants basculent sur un fallback en mémoire
+"""
+import os
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Optional
+
+import redis
+import redis.asyncio as aioredis
+
+from backend.config import REDIS_URL
+
+try:
+    import fakeredis  # tests only
+    from fakeredis import aioredis as fake_aioredis
+except Exception:
+    fakeredis = None
+    fake_aioredis = None
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[redis.Redis] = None
+_client_lock = threading.Lock()
+_fake_server = None
+# Un client async par boucle d'événements (ses connexions sont liées à la boucle qui l'a créé)
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis]" = weakref.WeakKeyDictionary()
+_async_clients_lock = threading.Lock()
+
+# module backend.infra.redis_client
+def _fake_redis_server():
+    """Serveur fakeredis unique: clients sync et async voient les mêmes données."""
+    global _fake_server
+    if _fake_server is None and fakeredis is not None:
+        _fake_server = fakeredis.FakeServer()
+    return _fake_server
+
+def get_redis() -> Optional[redis.Redis]:
+    """
+    Retourne le client Redis synchrone partagé (pool de connexions), ou None si non configuré.
+    - decode_responses=True: les valeurs sont des str
+    """
+    global _client
+    if _client is not None:
+        return _client
+    with _client_lock:
+        if _client is not None:
+            return _client
+        if os.getenv("USE_FAKE_REDIS_FOR_TESTS") == "1":
+            if fakeredis is None:
+                logger.warning("USE_FAKE_REDIS_FOR_TESTS=1 mais fakeredis n'est pas installé")
+                return None
+            _client = fakeredis.FakeRedis(server=_fake_redis_server(), decode_responses=True)
+        elif REDIS_URL:
+            _client = redis.from_url(REDIS_URL, encoding="utf-8", decode_responses=True)
+        return _client
+
+def close_redis() -> None:
+    """Ferme le pool de connexions du client partagé (arrêt de l'application)."""
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        try:
+            client.close()
+        except Exception:
+            logger.exception("redis_client.close_redis failed")
+
+def get_async_redis() -> Optional[aioredis.Redis]:
+    """
+    Retourne le client Redis asyncio partagé pour la boucle courante, ou None si non configuré.
+    - À appeler depuis une coroutine (la boucle courante est capturée)
+    - Un client par boucle: une autre boucle (thread, tests) obtient son propre client au lieu d'écraser,
+      sans le fermer, celui d'une boucle active; l'entrée disparaît avec sa boucle
+    """
+    loop = asyncio.get_running_loop()
+    with _async_clients_lock:
+        client = _async_clients.get(loop)
+        if client is not None:
+            return client
+        if os.getenv("USE_FAKE_REDIS_FOR_TESTS") == "1":
+            if fake_aioredis is None:
+                return None
+            client = fake_aioredis.FakeRedis(server=_fake_redis_server(), decode_responses=True)
+        elif REDIS_URL:
+            client = aioredis.from_url(REDIS_URL, encoding="utf-8", decode_responses=True)
+        else:
+            return None
+        _async_clients[loop] = client
+    return client
+
+async def close_async_redis() -> None:
+    """
+    Ferme les clients asyncio (arrêt de l'application).
+    - Client de la boucle courante: fermé ici; clients d'autres boucles encore actives: fermés sur leur boucle
+    - Boucle déjà fermée: ses connexions ne peuvent plus être fermées proprement, le client est abandonné
+    """
+    loop = asyncio.get_running_loop()
+    with _async_clients_lock:
+        clients = list(_async_clients.items())
+        _async_clients.clear()
+    for owner, client in clients:
+        try:
+            if owner is loop:
+                await client.aclose()
+            elif owner.is_running() and not owner.is_closed():
+                asyncio.run_coroutine_threadsafe(client.aclose(), owner)
+        except Exception:
+            logger.exception("redis_client.close_async_redis failed")
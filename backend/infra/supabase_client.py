@@ -1,6 +1,19 @@
-from typing import Optional
+import asyncio
+import threading
+import weakref
+from typing import Any, Dict, Optional
+import httpx
+from postgrest import AsyncPostgrestClient, SyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
 from supabase import create_client, Client
-from backend.config import SUPABASE_URL, SUPABASE_ANON, SUPABASE_SERVICE_KEY
+from backend.config import (
+    SUPABASE_URL,
+    SUPABASE_ANON,
+    SUPABASE_SERVICE_KEY,
+    SUPABASE_HTTP_MAX_CONNECTIONS,
+    SUPABASE_HTTP_MAX_KEEPALIVE,
+    SUPABASE_HTTP_TIMEOUT,
+)
 
 _supabase: Optional[Client] = None
 _service_supabase: Optional[Client] = None
@@ -19,13 +32,157 @@ def get_service_supabase() -> Client:
         _service_supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
     return _service_supabase
 
-def get_user_supabase(user_token: str) -> Client:
+# --- Pool HTTP partagé (PostgREST) ---
+
+def _rest_url() -> str:
+    return f"{SUPABASE_URL}/rest/v1"
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=SUPABASE_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=SUPABASE_HTTP_MAX_KEEPALIVE,
+    )
+
+def _postgrest_headers(api_key: str, bearer: Optional[str] = None) -> Dict[str, str]:
+    return {"apikey": api_key, "Authorization": f"Bearer {bearer or api_key}"}
+
+class _ScopedSession:
+    """
+    Vue d'un client httpx partagé, propre à un rôle (anon/service/utilisateur).
+    - Les en-têtes (apikey, Authorization, profils PostgREST) sont injectés à chaque requête
+      au lieu d'être posés sur le client partagé: plusieurs rôles réutilisent les mêmes connexions.
+    - Fonctionne pour httpx.Client et httpx.AsyncClient (request() délègue tel quel).
+    - Ne ferme jamais le pool partagé (géré par le module).
     """
-    Client Supabase 'anon' avec auth utilisateur (RLS actif).
-    À utiliser pour opérer au nom d'un utilisateur sans polluer l'instance globale.
+
+    def __init__(self, client: Any, headers: Dict[str, str]):
+        self._client = client
+        self.headers = httpx.Headers(headers)
+
+    def request(self, method: str, url: str, *, headers: Any = None, **kwargs: Any):
+        merged = httpx.Headers(self.headers)
+        if headers:
+            merged.update(headers)
+        return self._client.request(method, url, headers=merged, **kwargs)
+
+    def close(self) -> None:
+        return None
+
+    async def aclose(self) -> None:
+        return None
+
+class _PooledAsyncPostgrest(AsyncPostgrestClient):
+    """Client PostgREST async dont la session est une vue sur le pool partagé."""
+
+    def __init__(self, pool: httpx.AsyncClient, headers: Dict[str, str]):
+        self._pool = pool
+        super().__init__(_rest_url(), headers={**DEFAULT_POSTGREST_CLIENT_HEADERS, **headers})
+
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+        return _ScopedSession(self._pool, headers)
+
+class _PooledPostgrest(SyncPostgrestClient):
+    """Client PostgREST synchrone dont la session est une vue sur le pool partagé."""
+
+    def __init__(self, pool: httpx.Client, headers: Dict[str, str]):
+        self._pool = pool
+        super().__init__(_rest_url(), headers={**DEFAULT_POSTGREST_CLIENT_HEADERS, **headers})
+
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+        return _ScopedSession(self._pool, headers)
+
+_sync_pool: Optional[httpx.Client] = None
+_sync_pool_lock = threading.Lock()
+
+def _get_sync_pool() -> httpx.Client:
+    """Pool httpx.Client keep-alive partagé (thread-safe) pour les clients RLS utilisateur."""
+    global _sync_pool
+    if _sync_pool is None or _sync_pool.is_closed:
+        with _sync_pool_lock:
+            if _sync_pool is None or _sync_pool.is_closed:
+                _sync_pool = httpx.Client(
+                    base_url=_rest_url(),
+                    limits=_pool_limits(),
+                    timeout=SUPABASE_HTTP_TIMEOUT,
+                    follow_redirects=True,
+                )
+    return _sync_pool
+
+def get_user_supabase(user_token: str) -> SyncPostgrestClient:
+    """
+    Client PostgREST 'anon' avec auth utilisateur (RLS actif).
+    - Réutilise le pool HTTP partagé: pas de nouvelle session ni de handshake TLS par appel
+    - Le bearer utilisateur est injecté à chaque requête (aucun état partagé entre utilisateurs)
+    - Usage identique côté données: get_user_supabase(token).table("commandes").insert(...).execute()
     """
     if not user_token:
         raise ValueError("user_token is required")
-    client = create_client(SUPABASE_URL, SUPABASE_ANON)
-    client.postgrest.auth(user_token)
-    return client
\ No newline at end of file
+    return _PooledPostgrest(_get_sync_pool(), _postgrest_headers(SUPABASE_ANON, user_token))
+
+def close_sync_pool() -> None:
+    """Ferme le pool synchrone partagé (arrêt de l'application)."""
+    global _sync_pool
+    with _sync_pool_lock:
+        pool, _sync_pool = _sync_pool, None
+    if pool is not None and not pool.is_closed:
+        pool.close()
+
+# Un pool par boucle d'événements (les connexions httpx async sont liées à leur boucle)
+_async_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_async_pools_lock = threading.Lock()
+
+def _get_async_pool() -> httpx.AsyncClient:
+    """
+    Pool httpx.AsyncClient keep-alive partagé par tous les clients async de la boucle courante.
+    - Un pool par boucle: une autre boucle (thread, tests) obtient son propre pool au lieu d'écraser,
+      sans le fermer, celui d'une boucle active; l'entrée disparaît avec sa boucle
+    """
+    loop = asyncio.get_running_loop()
+    with _async_pools_lock:
+        pool = _async_pools.get(loop)
+        if pool is None or pool.is_closed:
+            pool = httpx.AsyncClient(
+                base_url=_rest_url(),
+                limits=_pool_limits(),
+                timeout=SUPABASE_HTTP_TIMEOUT,
+                follow_redirects=True,
+            )
+            _async_pools[loop] = pool
+    return pool
+
+def get_async_supabase() -> AsyncPostgrestClient:
+    """
+    Client PostgREST async 'anon' sur le pool partagé (à appeler dans une coroutine).
+    - Usage: await get_async_supabase().table("offres").select("*").execute()
+    """
+    return _PooledAsyncPostgrest(_get_async_pool(), _postgrest_headers(SUPABASE_ANON))
+
+def get_async_service_supabase() -> AsyncPostgrestClient:
+    """Client PostgREST async service-role (bypass RLS) sur le pool partagé."""
+    if not SUPABASE_SERVICE_KEY:
+        raise RuntimeError("SUPABASE_SERVICE_KEY manquant pour get_async_service_supabase()")
+    return _PooledAsyncPostgrest(_get_async_pool(), _postgrest_headers(SUPABASE_SERVICE_KEY))
+
+def get_async_user_supabase(user_token: str) -> AsyncPostgrestClient:
+    """Client PostgREST async 'anon' avec le bearer utilisateur (RLS actif) sur le pool partagé."""
+    if not user_token:
+        raise ValueError("user_token is required")
+    return _PooledAsyncPostgrest(_get_async_pool(), _postgrest_headers(SUPABASE_ANON, user_token))
+
+async def close_async_pool() -> None:
+    """
+    Ferme les pools async (arrêt de l'application).
+    - Pool de la boucle courante: fermé ici; pools d'autres boucles encore actives: fermés sur leur boucle
+    - Boucle déjà fermée: ses connexions ne peuvent plus être fermées proprement, le pool est abandonné
+    """
+    loop = asyncio.get_running_loop()
+    with _async_pools_lock:
+        pools = list(_async_pools.items())
+        _async_pools.clear()
+    for owner, pool in pools:
+        if pool.is_closed:
+            continue
+        if owner is loop:
+            await pool.aclose()
+        elif owner.is_running() and not owner.is_closed():
+            asyncio.run_coroutine_threadsafe(pool.aclose(), owner)
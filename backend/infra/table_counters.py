@@ -0,0 +1,111 @@
+"""
+Compteurs de lignes par table pour le tableau de bord admin (users, commandes, offres, evenements).
+
+- Cache mémoire court (ADMIN_COUNTS_CACHE_TTL) devant un compteur Redis admin:count:<table>
+- Le compteur Redis est initialisé par un comptage base (store, SET NX) avec un TTL
+  ADMIN_COUNTER_TTL: il est recalé périodiquement (écritures non suivies, ex. inscriptions)
+- adjust(table, delta): appelé par les chemins insert/delete (payments, commandes, admin, offres,
+  evenements) avec le nombre réel de lignes écrites/supprimées; script Lua atomique: incrémente un
+  compteur existant (TTL conservé), sans effet tant que le compteur n’est pas initialisé
+- Redis non configuré/injoignable: seuls le cache mémoire et le comptage base sont utilisés
+"""
+import logging
+from typing import Any, Dict, Iterable, Optional
+
+import redis
+
+from backend.config import ADMIN_COUNTS_CACHE_TTL, ADMIN_COUNTER_TTL
+from backend.infra import redis_client
+from backend.utils.cache import named_cache
+
+logger = logging.getLogger(__name__)
+
+_cache = named_cache("admin_counts", maxsize=32, ttl=ADMIN_COUNTS_CACHE_TTL)
+
+# INCRBY seulement si la clé existe: un compteur expiré n’est jamais recréé sans TTL
+_ADJUST_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+return nil
+"""
+
+def _key(table: str) -> str:
+    return f"admin:count:{table}"
+
+def get_counts(tables: Iterable[str]) -> Dict[str, int]:
+    """Comptes connus (mémoire puis Redis, un MGET); les tables absentes du résultat sont à compter en base."""
+    counts: Dict[str, int] = {}
+    missing = []
+    for table in tables:
+        count = _cache.get(table)
+        if count is None:
+            missing.append(table)
+        else:
+            counts[table] = count
+    client = redis_client.get_redis() if missing else None
+    if client is None:
+        return counts
+    try:
+        values = client.mget([_key(t) for t in missing])
+    except redis.RedisError as e:
+        logger.warning("table_counters.get_counts indisponible: %s", e)
+        return counts
+    for table, raw in zip(missing, values):
+        if raw is not None:
+            counts[table] = max(0, int(raw))
+            _cache.set(table, counts[table])
+    return counts
+
+def store(table: str, count: int) -> None:
+    """
+    Mémorise un comptage base.
+    - Redis: initialise le compteur s’il est absent (un compteur déjà tenu à jour n’est pas écrasé)
+    - Un comptage à 0 (table vide ou erreur de lecture) reste en mémoire seulement
+    """
+    _cache.set(table, count)
+    client = redis_client.get_redis() if count > 0 else None
+    if client is None:
+        return
+    try:
+        client.set(_key(table), count, nx=True, ex=ADMIN_COUNTER_TTL)
+    except redis.RedisError as e:
+        logger.warning("table_counters.store indisponible: %s", e)
+
+def adjust(table: str, delta: int) -> None:
+    """Applique une insertion (+n) ou une suppression (-n) au compteur de la table."""
+    _cache.pop(table)
+    client = redis_client.get_redis() if delta else None
+    if client is None:
+        return
+    try:
+        # Pas de compteur initialisé: le prochain comptage base fera foi
+        client.eval(_ADJUST_SCRIPT, 1, _key(table), delta)
+    except redis.RedisError as e:
+        logger.warning("table_counters.adjust indisponible table=%s: %s", table, e)
+
+def row_count(res: Any) -> int:
+    """Nombre de lignes renvoyées par une écriture (return=representation): delta réel à appliquer."""
+    data = getattr(res, "data", None)
+    if isinstance(data, list):
+        return len(data)
+    return 1 if isinstance(data, dict) and data else 0
+
+def invalidate(table: Optional[str] = None) -> None:
+    """Oublie les comptes (mémoire et Redis) d’une table, ou de toutes."""
+    if table is None:
+        _cache.clear()
+    else:
+        _cache.pop(table)
+    client = redis_client.get_redis()
+    if client is None:
+        return
+    try:
+        if table is None:
+            keys = list(client.scan_iter(match=_key("*")))
+            if keys:
+                client.delete(*keys)
+        else:
+            client.delete(_key(table))
+    except redis.RedisError as e:
+        logger.warning("table_counters.invalidate indisponible: %s", e)
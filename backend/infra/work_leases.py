@@ -0,0 +1,84 @@
+"""
+Listes "processing" par instance avec bail (lease) Redis, pour les consommateurs de files (job_queue,
+writer des validations).
+
+- Chaque processus a un identifiant de consommateur (CONSUMER_ID) et sa propre liste <base>:<consumer>;
+  les consommateurs sont enregistrés dans l’ensemble <base>:consumers
+- Bail <base>:<consumer>:lease (TTL WORK_LEASE_TTL) renouvelé par keep_alive tant que l’instance tourne
+- recover_expired ne reprend que les listes des consommateurs dont le bail a expiré (instance arrêtée
+  ou tuée): un job en cours chez un worker vivant n’est jamais remis en file
+- Liste historique <base> (avant les bails, sans propriétaire): reprise elle aussi
+- release (arrêt propre): supprime le bail, les éléments interrompus sont repris sans attendre le TTL
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import Awaitable, Callable
+
+from backend.config import WORK_LEASE_TTL
+from backend.infra import redis_client
+
+logger = logging.getLogger(__name__)
+
+CONSUMER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def processing_key(base: str, consumer: str = CONSUMER_ID) -> str:
+    return f"{base}:{consumer}"
+
+def _lease_key(base: str, consumer: str) -> str:
+    return f"{base}:{consumer}:lease"
+
+def _consumers_key(base: str) -> str:
+    return f"{base}:consumers"
+
+async def renew(client, base: str, consumer: str = CONSUMER_ID, ttl: float = WORK_LEASE_TTL) -> None:
+    """Prolonge le bail du consommateur (et l’enregistre, à faire avant sa première prise d’élément)."""
+    pipe = client.pipeline(transaction=False)
+    pipe.set(_lease_key(base, consumer), "1", px=int(ttl * 1000))
+    pipe.sadd(_consumers_key(base), consumer)
+    await pipe.execute()
+
+async def release(client, base: str, consumer: str = CONSUMER_ID) -> None:
+    """Abandonne le bail (arrêt propre): la liste du consommateur devient reprenable immédiatement."""
+    await client.delete(_lease_key(base, consumer))
+
+async def recover_expired(client, base: str, target: str, src: str = "RIGHT", dest: str = "RIGHT") -> int:
+    """
+    Déplace vers `target` les éléments des consommateurs sans bail et de la liste historique <base>.
+    Retour: nombre d’éléments repris.
+    """
+    moved = 0
+    sources = [base]
+    for consumer in await client.smembers(_consumers_key(base)):
+        if not await client.exists(_lease_key(base, consumer)):
+            sources.append(processing_key(base, consumer))
+    for source in sources:
+        while await client.lmove(source, target, src, dest) is not None:
+            moved += 1
+        if source != base:
+            await client.srem(_consumers_key(base), source[len(base) + 1:])
+    return moved
+
+async def processing_count(client, base: str) -> int:
+    """Éléments en cours de traitement, toutes instances confondues."""
+    total = await client.llen(base)
+    for consumer in await client.smembers(_consumers_key(base)):
+        total += await client.llen(processing_key(base, consumer))
+    return total
+
+async def keep_alive(base: str, recover: Callable[[object], Awaitable[int]], interval: float = WORK_LEASE_TTL / 3) -> None:
+    """Renouvelle le bail toutes les `interval` secondes et reprend les listes des instances disparues."""
+    while True:
+        try:
+            client = redis_client.get_async_redis()
+            if client is None:
+                return
+            await renew(client, base)
+            await recover(client)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("work_leases: renouvellement du bail en échec base=%s", base)
+        await asyncio.sleep(interval)
@@ -0,0 +1,204 @@
+"""Catalogue des offres en cache mémoire (read-through).
+- Source unique pour la vitrine (/billeterie), /session, l’hydratation du panier et le checkout.
+- Chargement: une requête (offres triées par prix croissant), puis lectures servies depuis la mémoire.
+- Fraîcheur: invalidation explicite par create/update/delete_offre; TTL OFFRES_CACHE_TTL entre instances.
+- Id absent du catalogue (ex. offre créée sur une autre instance): lecture directe en base pour ces ids.
+- Erreurs: un chargement en échec n’est pas mis en cache (valeurs neutres, logs).
+- Les lectures retournent des copies: les appelants peuvent modifier les dicts sans altérer le cache.
+- Panier/checkout (get_cart_offres): lignes compactes CartOffre (id, title, price, price_id), construites
+  une fois par chargement et partagées (immuables); lecture directe projetée sur CART_COLUMNS.
+- Le chargement complet garde toutes les colonnes: le même instantané sert la vitrine et l’admin.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+import threading
+
+import backend.infra.supabase_client as supabase_client
+from backend.config import OFFRES_CACHE_TTL
+from backend.utils.cache import named_cache
+
+logger = logging.getLogger(__name__)
+
+# Colonnes lues par le panier (price_id n’est pas une colonne de la table: présent seulement si la ligne
+# chargée le porte, sinon Stripe reçoit price_data construit à partir de price et title)
+CART_COLUMNS = "id, title, price"
+_CART_FIELDS = ("id", "title", "price", "price_id")
+
+
+@dataclass(frozen=True, slots=True)
+class CartOffre:
+    """Offre réduite aux champs du panier; accès `get(...)` / `[...]` comme un dict d’offre."""
+    id: str
+    title: Optional[str]
+    price: Any
+    price_id: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row: dict) -> "CartOffre":
+        return cls(str(row.get("id")), row.get("title"), row.get("price"), row.get("price_id") or None)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in _CART_FIELDS else default
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in _CART_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+
+# (offres triées, {id: offre}, {id: CartOffre})
+Snapshot = Tuple[List[dict], Dict[str, dict], Dict[str, CartOffre]]
+
+_CATALOG_KEY = "all"
+_cache = named_cache("offres_catalog", maxsize=1, ttl=OFFRES_CACHE_TTL)
+_load_lock = threading.Lock()
+_generation_lock = threading.Lock()
+# Incrémenté à chaque invalidation: un chargement démarré avant n’est pas remis en cache
+_generation = 0
+
+def _build_snapshot(rows: List[dict]) -> Snapshot:
+    offres = [dict(o) for o in rows if isinstance(o, dict)]
+    by_id = {str(o.get("id")): o for o in offres if o.get("id") is not None}
+    return offres, by_id, {i: CartOffre.from_row(o) for i, o in by_id.items()}
+
+def _store(snapshot: Snapshot, generation: int) -> None:
+    with _generation_lock:
+        if generation == _generation:
+            _cache.set(_CATALOG_KEY, snapshot)
+
+def _load_rows() -> Optional[List[dict]]:
+    """Lit la table offres (tri prix croissant). None en cas d’erreur."""
+    try:
+        res = supabase_client.get_supabase().table("offres").select("*").order("price", desc=False).execute()
+        return res.data if isinstance(res.data, list) else []
+    except Exception:
+        logger.exception("offres.catalog load failed")
+        return None
+
+async def _load_rows_async() -> Optional[List[dict]]:
+    """Version async de _load_rows (pool HTTP partagé)."""
+    try:
+        res = await supabase_client.get_async_supabase().table("offres").select("*").order("price", desc=False).execute()
+        return res.data if isinstance(res.data, list) else []
+    except Exception:
+        logger.exception("offres.catalog async load failed")
+        return None
+
+def _snapshot() -> Optional[Snapshot]:
+    """Catalogue courant; un seul chargement concurrent par processus (verrou)."""
+    snapshot = _cache.get(_CATALOG_KEY)
+    if snapshot is not None:
+        return snapshot
+    with _load_lock:
+        snapshot = _cache.get(_CATALOG_KEY)
+        if snapshot is not None:
+            return snapshot
+        generation = _generation
+        rows = _load_rows()
+        if rows is None:
+            return None
+        snapshot = _build_snapshot(rows)
+        _store(snapshot, generation)
+        return snapshot
+
+async def _snapshot_async() -> Optional[Snapshot]:
+    snapshot = _cache.get(_CATALOG_KEY)
+    if snapshot is not None:
+        return snapshot
+    generation = _generation
+    rows = await _load_rows_async()
+    if rows is None:
+        return None
+    snapshot = _build_snapshot(rows)
+    _store(snapshot, generation)
+    return snapshot
+
+def _fetch_missing(ids: List[str], columns: str = "*") -> List[dict]:
+    """Lecture directe des ids absents du catalogue (colonnes `columns`)."""
+    try:
+        res = supabase_client.get_supabase().table("offres").select(columns).in_("id", ids).execute()
+        return res.data if isinstance(res.data, list) else []
+    except Exception:
+        logger.exception("offres.catalog fetch missing failed ids=%s", ids)
+        return []
+
+async def _fetch_missing_async(ids: List[str], columns: str = "*") -> List[dict]:
+    try:
+        res = await supabase_client.get_async_supabase().table("offres").select(columns).in_("id", ids).execute()
+        return res.data if isinstance(res.data, list) else []
+    except Exception:
+        logger.exception("offres.catalog async fetch missing failed ids=%s", ids)
+        return []
+
+def _split(snapshot: Optional[Snapshot], ids: Iterable[str]) -> Tuple[List[dict], List[str]]:
+    """Sépare les ids en (offres trouvées dans le catalogue, ids manquants), sans doublons."""
+    by_id = snapshot[1] if snapshot else {}
+    found: List[dict] = []
+    missing: List[str] = []
+    for i in dict.fromkeys(str(x) for x in ids if x):
+        if i in by_id:
+            found.append(dict(by_id[i]))
+        else:
+            missing.append(i)
+    return found, missing
+
+def _split_cart(snapshot: Optional[Snapshot], ids: Iterable[str]) -> Tuple[List[CartOffre], List[str]]:
+    """Comme _split, pour les lignes panier (partagées: CartOffre est immuable, pas de copie)."""
+    by_id = snapshot[2] if snapshot else {}
+    found: List[CartOffre] = []
+    missing: List[str] = []
+    for i in dict.fromkeys(str(x) for x in ids if x):
+        offre = by_id.get(i)
+        if offre is None:
+            missing.append(i)
+        else:
+            found.append(offre)
+    return found, missing
+
+def list_offres() -> List[dict]:
+    """Toutes les offres (tri prix croissant). [] si le catalogue ne peut pas être chargé."""
+    snapshot = _snapshot()
+    return [dict(o) for o in snapshot[0]] if snapshot else []
+
+def get_offre(offre_id: str) -> Optional[dict]:
+    """Une offre par id (catalogue, sinon lecture directe). None si introuvable."""
+    offres = get_offres_by_ids([offre_id]) if offre_id else []
+    return offres[0] if offres else None
+
+def get_offres_by_ids(ids: Iterable[str]) -> List[dict]:
+    """Offres correspondant aux ids (ids inconnus ignorés)."""
+    found, missing = _split(_snapshot(), ids)
+    return found + (_fetch_missing(missing) if missing else [])
+
+def get_cart_offres(ids: Iterable[str]) -> List[CartOffre]:
+    """Lignes panier des offres correspondant aux ids (ids inconnus ignorés)."""
+    found, missing = _split_cart(_snapshot(), ids)
+    return found + ([CartOffre.from_row(o) for o in _fetch_missing(missing, CART_COLUMNS)] if missing else [])
+
+async def list_offres_async() -> List[dict]:
+    """Version async de list_offres."""
+    snapshot = await _snapshot_async()
+    return [dict(o) for o in snapshot[0]] if snapshot else []
+
+async def get_offre_async(offre_id: str) -> Optional[dict]:
+    """Version async de get_offre."""
+    offres = await get_offres_by_ids_async([offre_id]) if offre_id else []
+    return offres[0] if offres else None
+
+async def get_offres_by_ids_async(ids: Iterable[str]) -> List[dict]:
+    """Version async de get_offres_by_ids."""
+    found, missing = _split(await _snapshot_async(), ids)
+    return found + (await _fetch_missing_async(missing) if missing else [])
+
+async def get_cart_offres_async(ids: Iterable[str]) -> List[CartOffre]:
+    """Version async de get_cart_offres."""
+    found, missing = _split_cart(await _snapshot_async(), ids)
+    return found + ([CartOffre.from_row(o) for o in await _fetch_missing_async(missing, CART_COLUMNS)] if missing else [])
+
+def invalidate() -> None:
+    """Vide le catalogue (appelé après toute écriture admin sur offres)."""
+    global _generation
+    with _generation_lock:
+        _generation += 1
+        _cache.clear()
@@ -1,43 +1,42 @@
 """Couche d'accès données pour les offres (billetterie).
-- Lecture: via get_supabase().
-- Écriture (admin): via get_service_supabase().
+- Lecture: via le catalogue en cache mémoire (backend.offres.catalog), chargé via get_supabase().
+- Écriture (admin): via get_service_supabase(), ligne écrite renvoyée par l'écriture (return=representation).
+- Écritures: invalident le catalogue (catalog.invalidate); insert/delete ajustent le compteur admin (table_counters).
 - Stratégie d'erreurs: valeurs neutres et logs côté serveur.
 """
 from typing import List, Optional, Dict, Any
-from backend.infra.supabase_client import get_supabase, get_service_supabase
+from postgrest import ReturnMethod
+from backend.infra.supabase_client import get_service_supabase
+from backend.offres import catalog
+from backend.infra import table_counters
+from backend.utils.pagination import Keyset, Page, paginate_rows
 import logging
 
 logger = logging.getLogger(__name__)
 
 def list_offres() -> List[dict]:
     """Liste toutes les offres disponibles pour la vitrine.
-    - Table: offres
+    - Table: offres (catalogue en cache, tri prix croissant)
     - Erreur: [] si exception
     """
+    return catalog.list_offres()
+
+def _offre_sort_key(offre: Dict[str, Any]) -> Keyset:
     try:
-        res = get_supabase().table("offres").select("*").execute()
-        return res.data or []
-    except Exception:
-        return []
+        price = float(offre.get("price") or 0)
+    except (TypeError, ValueError):
+        price = 0.0
+    return price, str(offre.get("id") or "")
+
+def list_offres_page(after: Optional[Keyset], limit: int) -> Page:
+    """Page du catalogue (prix croissant, id), paginée en mémoire sur le catalogue en cache."""
+    return paginate_rows(catalog.list_offres(), after, limit, _offre_sort_key)
 
 def get_offre(offre_id: str) -> Optional[dict]:
-    """Récupère une offre par id.
+    """Récupère une offre par id (catalogue en cache).
     - Retour: dict ou None si introuvable/erreur
     """
-    if not offre_id:
-        return None
-    try:
-        res = (
-            get_supabase()
-            .table("offres")
-            .select("*")
-            .eq("id", offre_id)
-            .single()
-            .execute()
-        )
-        return res.data or None
-    except Exception:
-        return None
+    return catalog.get_offre(offre_id)
 
 def create_offre(data: Dict[str, Any]) -> Optional[dict]:
     """Crée une offre (admin, clé service).
@@ -45,7 +44,9 @@ def create_offre(data: Dict[str, Any]) -> Optional[dict]:
     - Erreur: None + log.
     """
     try:
-        res = get_service_supabase().table("offres").insert(data).execute()
+        res = get_service_supabase().table("offres").insert(data, returning=ReturnMethod.representation).execute()
+        catalog.invalidate()
+        table_counters.adjust("offres", 1)
         rows = getattr(res, "data", None) or []
         if isinstance(rows, list) and rows:
             return rows[0]
@@ -63,10 +64,11 @@ def update_offre(offre_id: str, data: Dict[str, Any]) -> Optional[dict]:
         res = (
             get_service_supabase()
             .table("offres")
-            .update(data)
+            .update(data, returning=ReturnMethod.representation)
             .eq("id", offre_id)
             .execute()
         )
+        catalog.invalidate()
         rows = getattr(res, "data", None) or []
         if isinstance(rows, list) and rows:
             return rows[0]
@@ -80,8 +82,20 @@ def delete_offre(offre_id: str) -> bool:
     - Retour: True si succès, False si exception (journalisée).
     """
     try:
-        get_service_supabase().table("offres").delete().eq("id", offre_id).execute()
+        res = get_service_supabase().table("offres").delete(returning=ReturnMethod.representation).eq("id", offre_id).execute()
+        catalog.invalidate()
+        table_counters.adjust("offres", -table_counters.row_count(res))
         return True
     except Exception:
         logger.exception("offres.repository.delete_offre failed id=%s", offre_id)
-        return False
\ No newline at end of file
+        return False
+
+# --- Variantes async (pool HTTP partagé, pour les handlers async def) ---
+
+async def list_offres_async() -> List[dict]:
+    """Version async de list_offres (mêmes conventions d'erreur)."""
+    return await catalog.list_offres_async()
+
+async def get_offre_async(offre_id: str) -> Optional[dict]:
+    """Version async de get_offre."""
+    return await catalog.get_offre_async(offre_id)
@@ -4,15 +4,16 @@ Réunit logique panier, metadata Stripe, client Stripe, repository BD, et servic
 """
 
 from .cart import aggregate_quantities, _price_from_offer, price_from_offer, make_metadata, to_line_items
-from .metadata import extract_metadata, extract_metadata_from_session
+from .metadata import extract_metadata, extract_metadata_from_session, extract_session_id
 from .stripe_client import require_stripe, create_session, get_session, parse_event
 from .repository import (
     get_offers_map,
     insert_commande,
     insert_commande_with_token,
     insert_commande_service,
+    insert_commandes_bulk,
 )
-from .service import process_cart_purchase, confirm_session_by_id
+from .service import process_cart_purchase, process_session_once, confirm_session_by_id
 
 __all__ = [
     # cart
@@ -24,6 +25,7 @@ __all__ = [
     # metadata
     "extract_metadata",
     "extract_metadata_from_session",
+    "extract_session_id",
     # stripe
     "require_stripe",
     "create_session",
@@ -34,7 +36,9 @@ __all__ = [
     "insert_commande",
     "insert_commande_with_token",
     "insert_commande_service",
+    "insert_commandes_bulk",
     # services
     "process_cart_purchase",
+    "process_session_once",
     "confirm_session_by_id",
 ]
\ No newline at end of file
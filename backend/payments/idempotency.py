@@ -0,0 +1,164 @@
+"""
+Registre des sessions Stripe déjà traitées (idempotence webhook + confirm).
+
+- Clé: identifiant de session Checkout (cs_...), partagé par le webhook et /confirm
+- Claim atomique: SET NX "processing" (TTL PAYMENTS_SESSION_LOCK_TTL) => un seul appel fait le travail
+- Résultat: JSON {"created": n} conservé PAYMENTS_SESSION_RESULT_TTL et renvoyé tel quel aux appels suivants
+- Insertion partielle: les lignes non écrites (tokens déjà générés) et le nombre de billets déjà créés
+  sont conservés sous payments:session:<id>:pending, le claim est libéré; la tentative suivante
+  (retry Stripe, file de jobs, /confirm) écrit exactement ces lignes
+- Backend: Redis (get_redis) si configuré, sinon registre en mémoire du processus (mono-instance)
+"""
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import redis
+from fastapi import HTTPException
+
+from backend.config import PAYMENTS_SESSION_LOCK_TTL, PAYMENTS_SESSION_RESULT_TTL, PAYMENTS_SESSION_WAIT
+from backend.infra import redis_client
+from backend.utils.cache import named_cache
+
+logger = logging.getLogger(__name__)
+
+_PROCESSING = "processing"
+_KEY_PREFIX = "payments:session:"
+
+# Fallback mémoire (sans Redis): claim atomique sous verrou
+_local = named_cache("payments_sessions", maxsize=100000, ttl=PAYMENTS_SESSION_RESULT_TTL)
+_local_lock = threading.Lock()
+
+# module backend.payments.idempotency
+def _key(session_id: str) -> str:
+    return f"{_KEY_PREFIX}{session_id}"
+
+def _decode(raw: Any) -> Optional[Dict[str, Any]]:
+    """Résultat stocké -> dict, None si absent ou encore en cours."""
+    if not raw or raw == _PROCESSING:
+        return None
+    try:
+        return json.loads(raw)
+    except Exception:
+        return None
+
+def _redis_call(op: Callable[[redis.Redis], Any]) -> Tuple[bool, Any]:
+    """
+    Exécute op(client) sur Redis. Retour: (True, résultat) ou (False, None) si Redis
+    n’est pas configuré ou injoignable (l’appelant bascule alors sur le registre mémoire).
+    """
+    client = redis_client.get_redis()
+    if client is None:
+        return False, None
+    try:
+        return True, op(client)
+    except redis.RedisError:
+        logger.warning("payments.idempotency: Redis injoignable, registre en mémoire", exc_info=True)
+        return False, None
+
+def claim_session(session_id: str) -> Tuple[bool, Optional[str]]:
+    """
+    Tente de réserver le traitement d’une session.
+    Retour: (True, None) si le claim est obtenu, sinon (False, valeur courante: "processing" ou résultat JSON).
+    """
+    key = _key(session_id)
+
+    def _claim(client: redis.Redis) -> Tuple[bool, Optional[str]]:
+        if client.set(key, _PROCESSING, nx=True, ex=PAYMENTS_SESSION_LOCK_TTL):
+            return True, None
+        return False, client.get(key)
+
+    ok, res = _redis_call(_claim)
+    if ok:
+        return res
+    with _local_lock:
+        current = _local.get(key)
+        if current is None:
+            _local.set(key, _PROCESSING, ttl=PAYMENTS_SESSION_LOCK_TTL)
+            return True, None
+        return False, current
+
+def complete_session(session_id: str, result: Dict[str, Any]) -> None:
+    """Enregistre le résultat d’un traitement réussi (remplace le claim)."""
+    key = _key(session_id)
+    raw = json.dumps(result)
+    ok, _ = _redis_call(lambda client: client.set(key, raw, ex=PAYMENTS_SESSION_RESULT_TTL))
+    if ok:
+        return
+    with _local_lock:
+        _local.set(key, raw)
+
+def release_session(session_id: str) -> None:
+    """Libère un claim (échec du traitement) pour permettre une nouvelle tentative."""
+    key = _key(session_id)
+    ok, _ = _redis_call(lambda client: client.delete(key))
+    if ok:
+        return
+    with _local_lock:
+        _local.pop(key)
+
+def _pending_key(session_id: str) -> str:
+    return f"{_key(session_id)}:pending"
+
+def save_pending(session_id: str, rows: List[Dict[str, Any]], created: int) -> None:
+    """Mémorise les lignes restant à écrire pour la session et le nombre de billets déjà créés."""
+    key = _pending_key(session_id)
+    raw = json.dumps({"rows": rows, "created": created}, default=str)
+    ok, _ = _redis_call(lambda client: client.set(key, raw, ex=PAYMENTS_SESSION_RESULT_TTL))
+    if ok:
+        return
+    with _local_lock:
+        _local.set(key, raw)
+
+def get_pending(session_id: str) -> Optional[Dict[str, Any]]:
+    """Reprise d’une insertion partielle: {"rows": [...], "created": n}, ou None."""
+    key = _pending_key(session_id)
+    ok, raw = _redis_call(lambda client: client.get(key))
+    return _decode(raw if ok else _local.get(key))
+
+def clear_pending(session_id: str) -> None:
+    """Oublie la reprise (toutes les lignes de la session sont écrites)."""
+    key = _pending_key(session_id)
+    ok, _ = _redis_call(lambda client: client.delete(key))
+    if ok:
+        return
+    with _local_lock:
+        _local.pop(key)
+
+def get_session_result(session_id: str) -> Optional[Dict[str, Any]]:
+    """Résultat déjà enregistré pour la session, ou None."""
+    key = _key(session_id)
+    ok, raw = _redis_call(lambda client: client.get(key))
+    return _decode(raw if ok else _local.get(key))
+
+def run_once(session_id: str, fn: Callable[[], Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+    """
+    Exécute fn() une seule fois par session et retourne (résultat, duplicate).
+    - Appel concurrent pendant un traitement: attend le résultat (PAYMENTS_SESSION_WAIT), puis 409
+    - fn() lève une exception ou retourne {"retry": True}: le claim est libéré (nouvelle tentative possible)
+    """
+    deadline = time.monotonic() + PAYMENTS_SESSION_WAIT
+    while True:
+        claimed, current = claim_session(session_id)
+        if claimed:
+            break
+        previous = _decode(current)
+        if previous is not None:
+            logger.info("payments.idempotency duplicate session_id=%s", session_id)
+            return previous, True
+        if time.monotonic() >= deadline:
+            raise HTTPException(status_code=409, detail="Traitement de la session déjà en cours")
+        time.sleep(0.1)
+
+    try:
+        result = fn()
+    except Exception:
+        release_session(session_id)
+        raise
+    if result.pop("retry", False):
+        release_session(session_id)
+    else:
+        complete_session(session_id, result)
+    return result, False
@@ -22,6 +22,14 @@ def extract_metadata(event: Dict[str, Any]) -> Tuple[str | None, List[Dict[str,
         cart = []
     return user_id, cart
 
+def extract_session_id(event: Dict[str, Any]) -> str | None:
+    """
+    Extrait l’identifiant de session Checkout (cs_...) depuis un event Stripe (webhook).
+    - Attend event.data.object.id; None si absent.
+    """
+    data_obj = (event or {}).get("data", {}).get("object", {}) if isinstance(event, dict) else {}
+    return data_obj.get("id") or None
+
 def extract_metadata_from_session(session: Dict[str, Any]) -> Tuple[str | None, List[Dict[str, Any]]]:
     """
     Extrait (user_id, cart) depuis une session Stripe Checkout (lecture directe).
@@ -5,37 +5,48 @@ from typing import Iterable, Dict, Any
 import logging
 # Remplacer l'import direct des fonctions par l'import du module
 import backend.infra.supabase_client as supabase_client
-from typing import List, Optional
+from postgrest import ReturnMethod
+from postgrest.exceptions import APIError
+from backend.offres import catalog as offres_catalog
+from backend.offres.catalog import CartOffre
+from backend.tickets.repository import invalidate_user_tickets_count
+from backend.infra import table_counters
+from backend.config import COMMANDES_INSERT_CHUNK_SIZE
+from typing import List, NamedTuple, Optional
 
 logger = logging.getLogger(__name__)
 
 # module backend.payments.repository
-def fetch_offres_by_ids(ids: List[str]) -> List[dict]:
+def fetch_offres_by_ids(ids: List[str]) -> List[CartOffre]:
     """
-    Récupère les offres par leurs IDs (table 'offres').
+    Récupère les offres par leurs IDs (table 'offres'), servies par le catalogue en cache mémoire.
+    - Lignes compactes CartOffre (id, title, price, price_id), lisibles comme des dicts (get / [])
     - Retourne [] si ids vide ou en cas d’erreur.
     """
     if not ids:
         return []
-    try:
-        res = (
-            supabase_client.get_supabase()
-            .table("offres")
-            .select("*")
-            .in_("id", [str(i) for i in ids])
-            .execute()
-        )
-        return res.data or []
-    except Exception:
-        logger.exception("payments.repository.fetch_offres_by_ids failed ids=%s", ids)
-        return []
+    return offres_catalog.get_cart_offres(ids)
 
-def get_offers_map(ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+def get_offers_map(ids: Iterable[str]) -> Dict[str, CartOffre]:
     """
     Retourne un dict {id: offre} à partir d’une liste d’IDs.
     """
     offers = fetch_offres_by_ids(list(ids))
-    return {str(o.get("id")): o for o in offers}
+    return {o.id: o for o in offers}
+
+async def fetch_offres_by_ids_async(ids: List[str]) -> List[CartOffre]:
+    """
+    Version async de fetch_offres_by_ids (catalogue en cache, pool HTTP partagé au chargement).
+    - Retourne [] si ids vide ou en cas d’erreur.
+    """
+    if not ids:
+        return []
+    return await offres_catalog.get_cart_offres_async(ids)
+
+async def get_offers_map_async(ids: Iterable[str]) -> Dict[str, CartOffre]:
+    """Version async de get_offers_map."""
+    offers = await fetch_offres_by_ids_async(list(ids))
+    return {o.id: o for o in offers}
 
 def _insert_commande(*, user_id: str, offre_id: str, token: str, price_paid: str) -> Optional[dict]:
     """
@@ -48,6 +59,8 @@ def _insert_commande(*, user_id: str, offre_id: str, token: str, price_paid: str
             .insert({"user_id": user_id, "offre_id": offre_id, "token": token, "price_paid": price_paid})
             .execute()
         )
+        invalidate_user_tickets_count(user_id)
+        table_counters.adjust("commandes", 1)
         return {"status": "ok"}
     except Exception:
         logger.exception("payments.repository._insert_commande failed user_id=%s offre_id=%s", user_id, offre_id)
@@ -65,6 +78,8 @@ def _insert_commande_with_token(*, user_id: str, offre_id: str, token: str, pric
             .insert({"user_id": user_id, "offre_id": offre_id, "token": token, "price_paid": price_paid})
             .execute()
         )
+        invalidate_user_tickets_count(user_id)
+        table_counters.adjust("commandes", 1)
         return {"status": "ok"}
     except Exception:
         logger.exception("payments.repository._insert_commande_with_token failed user_id=%s offre_id=%s", user_id, offre_id)
@@ -78,10 +93,11 @@ def _insert_commande_service(*, user_id: str, offre_id: str, token: str, price_p
         res = (
             supabase_client.get_service_supabase()
             .table("commandes")
-            .insert({"user_id": user_id, "offre_id": offre_id, "token": token, "price_paid": price_paid})
-            .select("*")
+            .insert({"user_id": user_id, "offre_id": offre_id, "token": token, "price_paid": price_paid}, returning=ReturnMethod.representation)
             .execute()
         )
+        invalidate_user_tickets_count(user_id)
+        table_counters.adjust("commandes", 1)
         rows = res.data or []
         return rows[0] if isinstance(rows, list) and rows else res.data or None
     except Exception:
@@ -98,4 +114,61 @@ def insert_commande_with_token(**kwargs):
 
 def insert_commande_service(**kwargs):
     """Wrapper public vers _insert_commande_service (service-role, bypass RLS, typiquement webhook)."""
-    return _insert_commande_service(**kwargs)
\ No newline at end of file
+    return _insert_commande_service(**kwargs)
+
+class BulkInsertResult(NamedTuple):
+    """Issue d’une insertion en lot: lignes créées, lignes non écrites (chunks en échec, tokens inchangés)."""
+    created: List[dict]
+    failed: List[dict]
+
+def insert_commandes_bulk(
+    rows: List[Dict[str, Any]],
+    *,
+    user_token: Optional[str] = None,
+    use_service: bool = False,
+    chunk_size: Optional[int] = None,
+) -> BulkInsertResult:
+    """
+    Insère plusieurs commandes (billets) en lot: une requête PostgREST par chunk.
+    - Client: service-role si use_service, sinon client utilisateur (RLS) si user_token, sinon anon
+    - chunk_size: taille maximale d’un lot (défaut COMMANDES_INSERT_CHUNK_SIZE) pour les très grosses commandes
+    - Retour: BulkInsertResult(created, failed); created = représentation renvoyée par PostgREST (ou lignes
+      envoyées si RLS masque le retour), failed = lignes des chunks en échec, à réessayer telles quelles
+      (mêmes tokens: un nouvel essai n’écrit pas de billet en double)
+    - Chunk refusé en 23505 (token déjà présent): écrit par un essai précédent dont la réponse a été
+      perdue, compté comme créé
+    """
+    if not rows:
+        return BulkInsertResult([], [])
+    if use_service:
+        client = supabase_client.get_service_supabase()
+    elif user_token:
+        client = supabase_client.get_user_supabase(user_token)
+    else:
+        client = supabase_client.get_supabase()
+
+    size = max(1, int(chunk_size or COMMANDES_INSERT_CHUNK_SIZE))
+    created: List[dict] = []
+    failed: List[dict] = []
+    for start in range(0, len(rows), size):
+        chunk = rows[start:start + size]
+        try:
+            res = client.table("commandes").insert(chunk).execute()
+        except Exception as e:
+            if isinstance(e, APIError) and e.code == "23505":
+                logger.warning("payments.repository.insert_commandes_bulk chunk déjà écrit rows=%s", len(chunk))
+                created.extend(chunk)
+                continue
+            failed.extend(chunk)
+            logger.exception(
+                "payments.repository.insert_commandes_bulk failed chunk=%s/%s rows=%s",
+                start // size + 1, (len(rows) + size - 1) // size, len(chunk),
+            )
+            continue
+        data = getattr(res, "data", None)
+        created.extend(data if isinstance(data, list) and data else chunk)
+    if created:
+        table_counters.adjust("commandes", len(created))
+        for user_id in {str(r.get("user_id")) for r in rows if r.get("user_id")}:
+            invalidate_user_tickets_count(user_id)
+    return BulkInsertResult(created, failed)
@@ -9,6 +9,8 @@ from . import repository
 from . import cart
 from . import stripe_client
 from . import metadata as meta
+from . import idempotency
+from backend.infra import job_queue
 from typing import Any, Dict, List
 
 from . import cart as cart_logic
@@ -54,22 +56,16 @@ def confirm_session_by_id(session_id: str) -> Dict[str, Any]:
     meta = extract_metadata_from_session(session)
     return {"session": session, "metadata": meta}
 
-def process_cart_purchase(
-    user_id: str,
-    cart_list: List[Dict[str, Any]],
-    user_token: Optional[str] = None,
-    use_service: bool = False
-) -> int:
+def build_ticket_rows(user_id: str, cart_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
-    Insère les commandes (une par ticket) à partir d’un panier confirmé.
-    - Contexte: webhook Stripe ou confirmation manuelle
-    - Insertion: via repository.* selon use_service / user_token
-    Retour: nombre de lignes insérées.
+    Construit toutes les lignes 'commandes' (une par billet) d’un panier confirmé.
+    - Ignore les lignes invalides (id vide, quantité <= 0, offre introuvable, prix <= 0)
+    - Chaque billet reçoit un token uuid4 et le prix payé formaté (2 décimales)
     """
     ids = [str(x.get("id") or "") for x in cart_list if x.get("id")]
     offers_by_id = get_offers_map(ids)
 
-    created = 0
+    rows: List[Dict[str, Any]] = []
     for entry in cart_list:
         offre_id = str(entry.get("id") or "")
         qty = int(entry.get("quantity") or 0)
@@ -82,23 +78,112 @@ def process_cart_purchase(
         if price <= 0:
             continue
         price_paid = f"{price:.2f}"
-        for _ in range(qty):
-            token = str(uuid4())
-            if use_service:
-                row = repository.insert_commande_service(user_id=user_id, offre_id=offre_id, token=token, price_paid=price_paid)
-            elif user_token:
-                row = repository.insert_commande_with_token(user_id=user_id, offre_id=offre_id, token=token, price_paid=price_paid, user_token=user_token)
-            else:
-                row = repository.insert_commande(user_id=user_id, offre_id=offre_id, token=token, price_paid=price_paid)
-            if row:
-                created += 1
+        rows.extend(
+            {"user_id": user_id, "offre_id": offre_id, "token": str(uuid4()), "price_paid": price_paid}
+            for _ in range(qty)
+        )
+    return rows
+
+def insert_cart_tickets(
+    user_id: str,
+    cart_list: List[Dict[str, Any]],
+    user_token: Optional[str] = None,
+    use_service: bool = False
+) -> repository.BulkInsertResult:
+    """
+    Insère en lot les billets d’un panier confirmé: BulkInsertResult(created, failed).
+    - Toutes les lignes sont construites d’abord puis écrites via repository.insert_commandes_bulk
+      (une requête par chunk): la latence reste quasi constante quelle que soit la taille du panier
+    """
+    rows = build_ticket_rows(user_id, cart_list)
+    if not rows:
+        return repository.BulkInsertResult([], [])
+    return repository.insert_commandes_bulk(rows, user_token=user_token, use_service=use_service)
+
+def process_cart_purchase(
+    user_id: str,
+    cart_list: List[Dict[str, Any]],
+    user_token: Optional[str] = None,
+    use_service: bool = False
+) -> int:
+    """
+    Insère les commandes (une par ticket) à partir d’un panier confirmé.
+    - Contexte: webhook Stripe ou confirmation manuelle
+    - Insertion en lot via insert_cart_tickets (client choisi selon use_service / user_token)
+    Retour: nombre de lignes insérées.
+    - Lève RuntimeError si des billets n’ont pas pu être écrits (insertion partielle)
+    """
+    result = insert_cart_tickets(user_id, cart_list, user_token=user_token, use_service=use_service)
+    if result.failed:
+        raise RuntimeError(f"{len(result.failed)} billet(s) non écrit(s) sur {len(result.created) + len(result.failed)}")
+    return len(result.created)
+
+def process_session_once(
+    session_id: Optional[str],
+    user_id: str,
+    cart_list: List[Dict[str, Any]],
+    user_token: Optional[str] = None,
+    use_service: bool = False
+) -> int:
+    """
+    Insère les billets d’une session Stripe une seule fois (webhook, retries Stripe et /confirm confondus).
+    - Claim atomique sur l’id de session (idempotency.run_once): un seul appel insère, les autres
+      reçoivent le résultat enregistré sans toucher à la base
+    - Session terminée seulement si toutes les lignes construites sont écrites. Sinon les lignes
+      manquantes (mêmes tokens) sont mémorisées (idempotency.save_pending), le claim est libéré et
+      RuntimeError est levée: la tentative suivante n’écrit que ces lignes
+    - Aucun billet construit pour un panier non vide: le claim est libéré (nouvelle tentative possible)
+    - Sans session_id: traitement direct (pas de déduplication possible)
+    Retour: nombre de billets créés par le traitement (initial ou antérieur).
+    """
+    if not session_id:
+        return process_cart_purchase(user_id, cart_list, user_token=user_token, use_service=use_service)
+
+    def _process() -> Dict[str, Any]:
+        pending = idempotency.get_pending(session_id)
+        if pending:
+            rows, done = pending.get("rows") or [], int(pending.get("created") or 0)
+        else:
+            rows, done = build_ticket_rows(user_id, cart_list), 0
+        if not rows:
+            return {"created": done, "retry": not done and bool(cart_list)}
+        result = repository.insert_commandes_bulk(rows, user_token=user_token, use_service=use_service)
+        created = done + len(result.created)
+        if result.failed:
+            idempotency.save_pending(session_id, result.failed, created)
+            return {"created": created, "missing": len(result.failed), "retry": True}
+        if pending:
+            idempotency.clear_pending(session_id)
+        return {"created": created}
+
+    result, _ = idempotency.run_once(session_id, _process)
+    if result.get("missing"):
+        raise RuntimeError(f"Session {session_id}: {result['missing']} billet(s) non écrit(s), nouvel essai requis")
+    return int(result.get("created") or 0)
+
+CHECKOUT_COMPLETED_JOB = "payments.checkout_completed"
+
+def handle_checkout_completed(event: Dict[str, Any]) -> int:
+    """
+    Traitement (worker de la file de jobs) d’un event checkout.session.completed mis en file par le webhook.
+    - Idempotent par session (process_session_once): un retry ou un /confirm concurrent ne duplique rien
+    - Insertion partielle (process_session_once lève) ou aucun billet créé pour un panier non vide:
+      erreur => la file réessaie (lignes manquantes seulement), puis dead-letter
+    """
+    user_id, cart_list = meta.extract_metadata(event)
+    session_id = meta.extract_session_id(event)
+    created = process_session_once(session_id, user_id, cart_list)
+    if not created and cart_list:
+        raise RuntimeError(f"Aucun billet créé pour la session {session_id}")
     return created
 
+job_queue.register_handler(CHECKOUT_COMPLETED_JOB, handle_checkout_completed)
+
 def confirm_session_by_id(session_id: str, current_user_id: str, user_token: Optional[str]) -> int:
     """
     Confirme une session Stripe (sans webhook) et insère les commandes si payment_status='paid'.
     - Vérifie l’appartenance via metadata.user_id
-    - Appelle process_cart_purchase(...) pour l’insertion
+    - Appelle process_session_once(...) pour l’insertion (idempotente avec le webhook)
     """
     stripe_client.require_stripe()
     session = stripe_client.get_session(session_id)
@@ -111,5 +196,5 @@ def confirm_session_by_id(session_id: str, current_user_id: str, user_token: Opt
     if meta_user_id and meta_user_id != current_user_id:
         raise HTTPException(status_code=403, detail="Session appartenant à un autre utilisateur")
 
-    created = process_cart_purchase(current_user_id, cart_list, user_token=user_token)
+    created = process_session_once(session_id, current_user_id, cart_list, user_token=user_token)
     return created
\ No newline at end of file
@@ -3,9 +3,11 @@ from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Request, Depends, HTTPException
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 
 from backend.utils.security import require_user, COOKIE_NAME
 from backend.utils.rate_limit import optional_rate_limit
+from backend.infra import job_queue
 
 # Services Payments (sans passer par backend.models)
 from backend.payments import stripe_client
@@ -29,9 +31,9 @@ async def create_checkout_session(request: Request, user: dict = Depends(require
     - Sécurité: require_user + rate limit (10 req / 60s)
     - Étapes:
       1) Agréger les quantités (payments_cart.aggregate_quantities)
-      2) Charger les offres (payments_repo.get_offers_map)
+      2) Charger les offres (payments_repo.get_offers_map_async, sans bloquer la boucle)
       3) Construire line_items + metadata (payments_cart.*)
-      4) Créer la session Stripe (stripe_client.create_session) et renvoyer {id, url}
+      4) Créer la session Stripe (stripe_client.create_session, SDK synchrone exécuté en threadpool) et renvoyer {id, url}
     - Fallback tests: en mode tests (PYTEST_CURRENT_TEST), bascule sur backend.models mocké
     - Erreurs: 400 si payload/panier invalide ou session non créée
     """
@@ -47,7 +49,7 @@ async def create_checkout_session(request: Request, user: dict = Depends(require
 
         # Préparer line_items + metadata
         quantities = payments_cart.aggregate_quantities(items)
-        offers = payments_repo.get_offers_map(list(quantities.keys()))
+        offers = await payments_repo.get_offers_map_async(list(quantities.keys()))
         try:
             # Chemin normal: microservice payments
             line_items = payments_cart.to_line_items(offers, quantities)
@@ -58,7 +60,8 @@ async def create_checkout_session(request: Request, user: dict = Depends(require
             success_url = f"{base_success}?session_id={{CHECKOUT_SESSION_ID}}&success=1"
             cancel_url = str(request.url_for("user_session"))
 
-            session = stripe_client.create_session(
+            session = await run_in_threadpool(
+                stripe_client.create_session,
                 line_items=line_items,
                 mode="payment",
                 success_url=success_url,
@@ -88,20 +91,32 @@ async def webhook_stripe(request: Request):
     """
     Webhook Stripe (Checkout): consomme checkout.session.completed pour créer les commandes.
     - Signature: valide via stripe_client.parse_event (Stripe-Signature + STRIPE_WEBHOOK_SECRET)
+    - File de jobs: l’event validé est mis en file (job_queue) et Stripe reçoit {"status": "queued"}
+      immédiatement; les workers du lifespan font l’insertion. Sans file (Redis absent), traitement inline:
     - Métadonnées: extrait (user_id, cart) via payments_metadata.extract_metadata
-    - Insertion: payments_service.process_cart_purchase(user_id, cart_list)
-    - Réponses: {"status": "ok", "created": <int>} ou {"status": "ignored"}
+    - Insertion: payments_service.process_session_once(session_id, user_id, cart_list), idempotente
+      par session (retries Stripe et /confirm ne recréent pas de billets)
+    - Réponses: {"status": "queued"}, {"status": "ok", "created": <int>} ou {"status": "ignored"}
     - Erreurs: 400 si signature/payload invalide
     """
     try:
         # Utiliser toujours les fonctions du microservice (patchées en tests)
         event = await stripe_client.parse_event(request)
         if (event or {}).get("type") == "checkout.session.completed":
-            user_id, cart_list = payments_metadata.extract_metadata(event)
             # Importer le module pour bénéficier des monkeypatchs de tests
             from backend.payments import service as payments_service
-            created = payments_service.process_cart_purchase(user_id=user_id, cart_list=cart_list)
-            logger.info("payments.webhook created=%s items=%s user_id=%s", created, len(cart_list or []), user_id)
+            if await job_queue.enqueue(payments_service.CHECKOUT_COMPLETED_JOB, event):
+                return JSONResponse({"status": "queued"})
+            user_id, cart_list = payments_metadata.extract_metadata(event)
+            session_id = payments_metadata.extract_session_id(event)
+            # Écritures synchrones (supabase-py) hors de la boucle d'événements
+            created = await run_in_threadpool(
+                payments_service.process_session_once, session_id, user_id=user_id, cart_list=cart_list
+            )
+            logger.info(
+                "payments.webhook created=%s items=%s user_id=%s session_id=%s",
+                created, len(cart_list or []), user_id, session_id,
+            )
             return JSONResponse({"status": "ok", "created": created})
         return JSONResponse({"status": "ignored"})
     except HTTPException:
@@ -120,7 +135,9 @@ async def confirm_checkout_get(request: Request, session_id: str, user: dict = D
     """
     try:
         user_token = request.cookies.get(COOKIE_NAME)
-        created = confirm_session_insert(session_id=session_id, current_user_id=user.get("id"), user_token=user_token)
+        created = await run_in_threadpool(
+            confirm_session_insert, session_id=session_id, current_user_id=user.get("id"), user_token=user_token
+        )
         return {"status": "ok", "created": created}
     except HTTPException:
         raise
@@ -1,28 +1,124 @@
 """
 Accès aux données 'tickets' (table commandes + jointure offre).
 - list_user_tickets: récupère les commandes de l'utilisateur avec les champs nécessaires.
+- list_user_tickets_page: une page (curseur keyset created_at desc, id).
+- get_user_ticket: un billet par (user_id, token), lecture ciblée (sans lister les billets).
+- count_user_tickets: COUNT côté base (count="exact", requête HEAD), mis en cache par utilisateur;
+  invalidé par les insertions de commandes (invalidate_user_tickets_count), TTL TICKETS_COUNT_CACHE_TTL
+  entre instances.
 - Remarque: la sélection inclut offres(title, price) pour hydrater l'affichage.
 """
-from typing import List, Dict
+from typing import List, Dict, Optional
+import logging
+import threading
 from backend.infra.supabase_client import get_supabase
+from backend.config import TICKETS_COUNT_CACHE_TTL
+from backend.utils.cache import named_cache
+from backend.utils.pagination import CursorError, Keyset, Page, fetch_page
+
+logger = logging.getLogger(__name__)
+
+_TICKET_COLUMNS = "id, token, offre_id, created_at, price_paid, offres(title, price)"
+
+_count_cache = named_cache("tickets_count", maxsize=4096, ttl=TICKETS_COUNT_CACHE_TTL)
+_generation_lock = threading.Lock()
+# Incrémenté à chaque invalidation: un comptage démarré avant n’est pas remis en cache
+_generation = 0
 
 def list_user_tickets(user_id: str) -> List[Dict]:
     """
     Récupère les tickets (commandes) d'un utilisateur avec la jointure 'offres'.
     - Filtre: eq("user_id", user_id)
     - Tri: par created_at décroissant (les plus récents d'abord)
-    - Champs: id, token, created_at, price_paid, offres(title, price)
+    - Champs: id, token, offre_id, created_at, price_paid, offres(title, price)
     - Retour: [] si erreur
     """
     try:
         res = (
             get_supabase()
             .table("commandes")
-            .select("id, token, created_at, price_paid, offres(title, price)")
+            .select(_TICKET_COLUMNS)
             .eq("user_id", user_id)
             .order("created_at", desc=True)
             .execute()
         )
         return res.data or []
     except Exception:
-        return []
\ No newline at end of file
+        return []
+
+def list_user_tickets_page(user_id: str, after: Optional[Keyset], limit: int) -> Page:
+    """
+    Page de billets d'un utilisateur (plus récents d'abord), reprise après la clé `after`.
+    - Retour: Page(items, next_cursor); Page vide si erreur
+    """
+    try:
+        query = get_supabase().table("commandes").select(_TICKET_COLUMNS).eq("user_id", user_id)
+        return fetch_page(query, after, limit, "created_at", desc=True)
+    except CursorError:
+        raise
+    except Exception:
+        logger.exception("tickets.repository.list_user_tickets_page failed user_id=%s", user_id)
+        return Page([], None)
+
+def get_user_ticket(user_id: str, token: str) -> Optional[Dict]:
+    """
+    Billet (commande) d'un utilisateur par son token, avec la jointure 'offres'.
+    - Filtres: eq("user_id"), eq("token") (token unique), limit(1)
+    - Retour: None si absent, n'appartenant pas à l'utilisateur, ou en cas d'erreur
+    """
+    if not user_id or not token:
+        return None
+    try:
+        res = (
+            get_supabase()
+            .table("commandes")
+            .select(_TICKET_COLUMNS)
+            .eq("user_id", user_id)
+            .eq("token", token)
+            .limit(1)
+            .execute()
+        )
+        rows = res.data or []
+        return rows[0] if rows else None
+    except Exception:
+        logger.exception("tickets.repository.get_user_ticket failed user_id=%s", user_id)
+        return None
+
+def count_user_tickets(user_id: str) -> int:
+    """
+    Nombre de billets d'un utilisateur (COUNT côté base, aucune ligne transférée).
+    - Servi depuis le cache par utilisateur si présent
+    - Retour: 0 en cas d'erreur (non mis en cache)
+    """
+    if not user_id:
+        return 0
+    count = _count_cache.get(user_id)
+    if count is not None:
+        return count
+    generation = _generation
+    try:
+        res = (
+            get_supabase()
+            .table("commandes")
+            .select("id", count="exact", head=True)
+            .eq("user_id", user_id)
+            .execute()
+        )
+        count = int(res.count or 0)
+    except Exception:
+        logger.exception("tickets.repository.count_user_tickets failed user_id=%s", user_id)
+        return 0
+    with _generation_lock:
+        if generation == _generation:
+            _count_cache.set(user_id, count)
+    return count
+
+def invalidate_user_tickets_count(user_id: Optional[str] = None) -> None:
+    """Oublie le nombre de billets d'un utilisateur (ou de tous, ex. suppression par id)."""
+    global _generation
+    with _generation_lock:
+        _generation += 1
+        if user_id is None:
+            _count_cache.clear()
+        else:
+            _count_cache.pop(str(user_id))
\ No newline at end of file
@@ -1,33 +1,80 @@
-from typing import List, Dict
-from .repository import list_user_tickets
+from typing import List, Dict, Optional
+from .repository import list_user_tickets, list_user_tickets_page, get_user_ticket as fetch_user_ticket, count_user_tickets
+from backend.utils.pagination import Keyset, Page
+from backend.utils.qrcode_utils import render_qr_codes, qr_data_url
+from backend.utils.ticket_tokens import build_scan_token
 
 def get_user_tickets(user_id: str) -> list[dict]:
     """
     Logique applicative: retourne les billets d'un utilisateur sous une forme normalisée.
     - Délègue à repository.list_user_tickets pour la lecture.
     - Enrichit la sortie: alias offre_title, mapping de champs utiles (token, price_paid, etc.).
-    - Point d'extension: ajout futur d'URL/QR inline, filtrage, pagination, etc.
+    - QR inline: voir attach_qr_codes.
     """
     raw = list_user_tickets(user_id)
-    
-    tickets: List[Dict] = []
-    for row in raw:
-        offre = row.get("offres") or {}
-        tickets.append({
-            "token": row.get("token"),
-            "price_paid": row.get("price_paid"),
-            "offre_title": offre.get("title"),
-            # Champs supplémentaires conservés si utiles
-            "id": row.get("id"),
-            "created_at": row.get("created_at"),
-        })
-    return tickets
+    return [_normalize(row) for row in raw]
+
+def get_user_tickets_page(user_id: str, after: Optional[Keyset], limit: int) -> Page:
+    """Une page de billets normalisés (voir get_user_tickets), avec le curseur de la page suivante."""
+    page = list_user_tickets_page(user_id, after, limit)
+    return Page([_normalize(row) for row in page.items], page.next_cursor)
+
+def _normalize(row: Dict) -> Dict:
+    offre = row.get("offres") or {}
+    return {
+        "token": row.get("token"),
+        "price_paid": row.get("price_paid"),
+        "offre_title": offre.get("title"),
+        # Champs supplémentaires conservés si utiles
+        "id": row.get("id"),
+        "offre_id": row.get("offre_id"),
+        "created_at": row.get("created_at"),
+    }
+
+def get_user_ticket(user_id: str, token: str) -> Optional[Dict]:
+    """
+    Un billet de l'utilisateur par son token (même forme que get_user_tickets).
+    - Lecture ciblée repository.get_user_ticket (user_id, token); None si absent
+    """
+    row = fetch_user_ticket(user_id, token)
+    return _normalize(row) if row else None
 
 def get_user_tickets_count(user_id: str) -> int:
     """
     Retourne le nombre de billets d'un utilisateur.
-    - Utilise repository.list_user_tickets puis calcule len(...).
-    - Peut être optimisé côté DB si besoin (COUNT).
+    - COUNT côté base, mis en cache par utilisateur (repository.count_user_tickets).
     """
-    tickets = list_user_tickets(user_id)
-    return len(tickets)
\ No newline at end of file
+    return count_user_tickets(user_id)
+
+def get_user_key(user_id: str) -> str:
+    """Clé utilisateur (users.bio) utilisée dans les jetons de scan, "" si absente."""
+    from backend.users.repository import get_user_by_id
+    user_row = get_user_by_id(user_id)
+    return (user_row or {}).get("bio") or ""
+
+def ticket_scan_url(base_url: str, ticket: Dict, user_key: str) -> str:
+    """URL de scan admin d'un billet: /admin/scan?token=<jeton signé ou user_key.ticket_token>."""
+    final_token = build_scan_token(ticket.get("token"), ticket.get("offre_id"), user_key)
+    return f"{base_url.rstrip('/')}/admin/scan?token={final_token}"
+
+def attach_qr_codes(tickets: List[Dict], user_id: str, base_url: str, user_key: Optional[str] = None) -> List[Dict]:
+    """
+    Renseigne ticket["qr_code"] (data URL PNG) pour chaque billet.
+    - Clé utilisateur lue une seule fois pour toute la liste
+    - Rendu groupé (render_qr_codes): cache puis pool de processus, dans le budget QR_RENDER_TIMEOUT
+    - qr_code = None si la clé utilisateur est absente ou si le rendu n'a pas abouti à temps
+    """
+    for ticket in tickets:
+        ticket["qr_code"] = None
+    with_token = [t for t in tickets if t.get("token")]
+    if not with_token:
+        return tickets
+    if user_key is None:
+        user_key = get_user_key(user_id)
+    if not user_key:
+        return tickets
+    urls = [ticket_scan_url(base_url, t, user_key) for t in with_token]
+    for ticket, content in zip(with_token, render_qr_codes(urls, "png")):
+        if content is not None:
+            ticket["qr_code"] = qr_data_url(content)
+    return tickets
@@ -2,32 +2,54 @@
 Endpoints API pour Tickets: récupération des billets de l'utilisateur, compteur,
 et génération d'un QR code pointant vers l'interface admin de scan/validation.
 - Sécurité: toutes les routes requièrent un utilisateur authentifié (require_user).
-- Intégration scan/admin: le QR encode une URL /admin/scan?token=<user_key>.<ticket_token>.
+- Intégration scan/admin: le QR encode une URL /admin/scan?token=<jeton>, jeton signé
+  (backend.utils.ticket_tokens) ou, sans secret configuré, <user_key>.<ticket_token>.
+- QR en JSON (data URL base64) ou en image directe (.png / .svg), rendus mis en cache;
+  liste avec QR inline (?include_qr=1) rendus en parallèle (pool de processus).
 """
-from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from backend.utils.security import require_user
-from .service import get_user_tickets
+from .service import get_user_tickets_page, get_user_ticket, attach_qr_codes, get_user_key, ticket_scan_url
 from .service import get_user_tickets_count
 from backend.config import BASE_URL
-from backend.utils.qrcode_utils import generate_qr_code
+from backend.utils.qrcode_utils import generate_qr_code, render_qr_code, FORMATS as QR_FORMATS
+from backend.utils.pagination import cursor_or_400, page_size
+from typing import Optional
 from typing import Any, Dict, List
+import hashlib
 from .service import get_user_tickets_count
 
 router = APIRouter(prefix="/api/v1/tickets", tags=["Tickets"])
 
 @router.get("/", response_model=List[Dict])
-def list_tickets(user: Dict[str, Any] = Depends(require_user)):
+def list_tickets(
+    request: Request,
+    response: Response,
+    include_qr: bool = Query(False),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    user: Dict[str, Any] = Depends(require_user),
+):
     """
-    Liste les billets de l'utilisateur authentifié.
+    Liste les billets de l'utilisateur authentifié, par pages (plus récents d'abord).
     - Sécurité: require_user
     - Retour: liste de dicts normalisés (token, price_paid, offre_title, id, created_at)
-    - Erreurs: 403 si l'utilisateur est invalide (pas d'id)
+    - Pagination: ?limit= (PAGE_SIZE_DEFAULT par défaut, PAGE_SIZE_MAX au plus) et ?cursor=; le curseur
+      de la page suivante est renvoyé dans l'en-tête X-Next-Cursor (absent sur la dernière page)
+    - include_qr=1: chaque billet porte "qr_code" (data URL PNG, ou None si non rendu dans le budget
+      QR_RENDER_TIMEOUT ou sans clé utilisateur; le client peut alors appeler /{ticket_token}/qrcode)
+    - Erreurs: 403 si l'utilisateur est invalide (pas d'id), 400 si le curseur est invalide
     """
     user_id = user.get("id")
     if not user_id:
         raise HTTPException(status_code=403, detail="Utilisateur non valide")
     
-    tickets = get_user_tickets(user_id)
+    page = get_user_tickets_page(user_id, cursor_or_400(cursor), page_size(limit))
+    tickets = page.items
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    if include_qr:
+        attach_qr_codes(tickets, user_id, str(request.base_url))
     return tickets
 
 @router.get("/count")
@@ -40,32 +62,56 @@ def tickets_count(user: Dict[str, Any] = Depends(require_user)):
     count = get_user_tickets_count(user.get("id"))
     return {"count": count}
 
+def _ticket_scan_url(ticket_token: str, request: Request, user: Dict[str, Any]) -> str:
+    """
+    URL de scan admin encodée dans le QR d'un billet de l'utilisateur courant.
+    - 404 si le billet n'appartient pas à l'utilisateur, 400 si la clé utilisateur (user_key) est absente
+    """
+    user_id = user.get("id")
+    ticket = get_user_ticket(user_id, ticket_token)
+    if not ticket:
+        raise HTTPException(status_code=404, detail="Billet non trouvé")
+
+    # Construire l’URL de validation avec le jeton signé (ou la clé composite user_key.ticket_token)
+    user_key = get_user_key(user_id)
+    if not user_key:
+        # Clé utilisateur obligatoire pour construire le QR (token composite)
+        raise HTTPException(status_code=400, detail="user_key_required")
+    return ticket_scan_url(str(request.base_url), ticket, user_key)
+
 @router.get("/{ticket_token}/qrcode")
 def get_ticket_qrcode(ticket_token: str, request: Request, user: dict = Depends(require_user)):
     """
     Génère un QR code pour un billet spécifique de l'utilisateur courant.
-    - Recherche le billet dans la liste utilisateur.
-    - Construit une URL de scan admin: /admin/scan?token=<user_key>.<ticket_token>
-      où user_key est stockée dans users.bio.
+    - Recherche le billet par (user_id, token), sans lister les billets de l'utilisateur.
+    - Construit une URL de scan admin: /admin/scan?token=<jeton>
+      - jeton signé "t1.<payload>.<signature>" (ticket_token, offre_id, user_key) si TICKET_SIGNING_SECRET
+      - sinon composite <user_key>.<ticket_token>, où user_key est stockée dans users.bio.
     - Retour: {"qr_code": "<data:image/png;base64,...>"}
+    - Variante image directe (sans base64): /{ticket_token}/qrcode.png | .svg
     - Erreurs:
       - 404 si le billet n'appartient pas à l'utilisateur
       - 400 si la clé utilisateur (user_key) est absente
     """
-    user_id = user.get("id")
-    tickets = get_user_tickets(user_id)
-    ticket = next((c for c in tickets if c.get("token") == ticket_token), None)
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Billet non trouvé")
+    validate_url = _ticket_scan_url(ticket_token, request, user)
+    return {"qr_code": generate_qr_code(validate_url)}
 
-    # Construire l’URL de validation avec la clé composite (user_key + "." + ticket_token)
-    from backend.users.repository import get_user_by_id
-    user_row = get_user_by_id(user.get("id"))
-    user_key = (user_row or {}).get("bio") or ""
-    if not user_key:
-        # Clé utilisateur obligatoire pour construire le QR (token composite)
-        raise HTTPException(status_code=400, detail="user_key_required")
-    base = str(request.base_url).rstrip("/")
-    final_token = f"{user_key}.{ticket_token}"
-    validate_url = f"{base}/admin/scan?token={final_token}"
-    return {"qr_code": generate_qr_code(validate_url)}
\ No newline at end of file
+@router.get("/{ticket_token}/qrcode.{fmt}")
+def get_ticket_qrcode_image(ticket_token: str, fmt: str, request: Request, user: dict = Depends(require_user)):
+    """
+    QR code d'un billet servi directement en image (image/png ou image/svg+xml).
+    - Même contenu que /{ticket_token}/qrcode, sans l'enveloppe JSON + base64 (~33 % de moins)
+    - Rendu mis en cache (render_qr_code); ETag = empreinte du contenu
+    - Cache navigateur: privé (route authentifiée), longue durée et immuable; If-None-Match => 304
+    - Erreurs: 404 format inconnu ou billet absent, 400 si user_key absente
+    """
+    media_type = QR_FORMATS.get(fmt)
+    if media_type is None:
+        raise HTTPException(status_code=404, detail="Format non supporté")
+    validate_url = _ticket_scan_url(ticket_token, request, user)
+    content = render_qr_code(validate_url, fmt)
+    etag = '"' + hashlib.sha256(content).hexdigest()[:32] + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type=media_type, headers=headers)
@@ -4,6 +4,17 @@ Les exceptions sont « catchées » et transforment les résultats en valeurs ne
 """
 from typing import Any, Dict, List, Optional
 from backend.infra.supabase_client import get_supabase, get_service_supabase
+from backend.offres import catalog as offres_catalog
+from backend.utils.pagination import CursorError, Keyset, Page, fetch_page
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Projections de la table users (colonnes réellement lues par les appelants)
+# - profil: lu par l’admin (formulaire), la validation (nom de l’acheteur), les billets et la synchro (bio)
+# - recherche par email: test d’existence à l’inscription
+USER_PROFILE_COLUMNS = "id, email, full_name, role, bio"
+USER_LOOKUP_COLUMNS = "id, email, role"
 
 def get_user_orders(user_id: str) -> List[Dict[str, Any]]:
     """Retourne les commandes de l’utilisateur, jointes avec les infos d’offre.
@@ -30,32 +41,39 @@ def get_user_orders(user_id: str) -> List[Dict[str, Any]]:
     except Exception:
         return []
 
+def get_user_orders_page(user_id: str, after: Optional[Keyset], limit: int) -> Page:
+    """Page des commandes de l’utilisateur (created_at desc, id), reprise après `after`; Page vide si erreur."""
+    if not user_id:
+        return Page([], None)
+    try:
+        query = (
+            get_supabase()
+            .table("commandes")
+            .select("id, token, price_paid, created_at, offre_id, offres(title, price)")
+            .eq("user_id", user_id)
+        )
+        return fetch_page(query, after, limit, "created_at", desc=True)
+    except CursorError:
+        raise
+    except Exception:
+        logger.exception("users.repository.get_user_orders_page failed user_id=%s", user_id)
+        return Page([], None)
+
 def get_offers() -> List[Dict[str, Any]]:
     """Liste les offres disponibles pour l’UI publique et /session.
     - Table: offres
     - Tri: price asc (si la colonne existe)
+    - Source: catalogue des offres en cache mémoire (backend.offres.catalog)
     - En cas d’erreur: liste vide
     """
-    # ... déjà défini dans ce fichier ...
-    # Récupère les offres disponibles (triées par prix croissant si la colonne existe)
-    try:
-        res = (
-            get_supabase()
-            .table("offres")
-            .select("*")
-            .order("price", desc=False)
-            .execute()
-        )
-        return res.data or []
-    except Exception:
-        return []
+    return offres_catalog.list_offres()
 
 def get_user_by_email(email: str) -> Optional[dict]:
-    """Récupère un utilisateur par email (table users).
+    """Récupère un utilisateur par email (table users, colonnes USER_LOOKUP_COLUMNS).
     - Retour: dict utilisateur ou None si introuvable/erreur
     """
     try:
-        res = get_supabase().table("users").select("*").eq("email", email).single().execute()
+        res = get_supabase().table("users").select(USER_LOOKUP_COLUMNS).eq("email", email).single().execute()
         return res.data or None
     except Exception:
         return None
@@ -82,13 +100,13 @@ def upsert_user_profile(user_id: str, email: str, role: Optional[str] = None, bi
         return False
 
 def get_user_by_id(user_id: str) -> Optional[dict]:
-    """Récupère un utilisateur par id (table users).
+    """Récupère un utilisateur par id (table users, colonnes USER_PROFILE_COLUMNS).
     - Retour: dict utilisateur ou None si introuvable/erreur
     """
     if not user_id:
         return None
     try:
-        res = get_supabase().table("users").select("*").eq("id", user_id).single().execute()
+        res = get_supabase().table("users").select(USER_PROFILE_COLUMNS).eq("id", user_id).single().execute()
         return res.data or None
     except Exception:
-        return None
\ No newline at end of file
+        return None
@@ -4,6 +4,7 @@
 - Billeterie: liste des événements et offres disponibles
 - Session: tableau de bord utilisateur authentifié (protégé par require_user)
 - Mes billets: page personnelle listant les billets de l’utilisateur
+- API: commandes de l’utilisateur paginées par curseur (/api/v1/users/orders)
 Ces pages utilisent le moteur de templates et appliquent le token CSRF + entêtes no-cache pour éviter la réutilisation d’état sensible via le bouton retour du navigateur.
 """
 from fastapi import APIRouter, Depends, Request
@@ -12,8 +13,10 @@ from starlette.status import HTTP_303_SEE_OTHER
 from backend.utils.security import require_user
 from backend.utils.templates import templates
 from .service import get_user_dashboard
-from .repository import get_user_orders
-from typing import Dict, Any  # <-- Ajout pour éviter NameError
+from .repository import get_user_orders, get_user_orders_page
+from typing import Dict, Any, Optional  # <-- Ajout pour éviter NameError
+from fastapi import Query
+from backend.utils.pagination import cursor_or_400, page_size
 from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse
 from backend.utils.templates import templates
@@ -85,4 +88,12 @@ def mes_billets_page(request: Request, user: Dict[str, Any] = Depends(require_us
     resp.headers["Expires"] = "0"
     attach_csrf_cookie_if_missing(resp, request, csrf)
     return resp
-api_router = APIRouter(prefix="/api/v1/users", tags=["Users API"])
\ No newline at end of file
+api_router = APIRouter(prefix="/api/v1/users", tags=["Users API"])
+@api_router.get("/orders")
+def list_my_orders(cursor: Optional[str] = None, limit: Optional[int] = Query(None, ge=1), user: Dict[str, Any] = Depends(require_user)):
+    """Commandes de l’utilisateur authentifié (plus récentes d’abord), paginées par curseur.
+    - Retour: {"items": [...], "next_cursor": str|None}
+    - 400 si le curseur est invalide
+    """
+    page = get_user_orders_page(user.get("id") or "", cursor_or_400(cursor), page_size(limit))
+    return {"items": page.items, "next_cursor": page.next_cursor}
@@ -0,0 +1,113 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import threading
+import time
+
+"""
+Cache mémoire LRU borné avec expiration par entrée (TTL).
+
+- Thread-safe (les routes synchrones FastAPI tournent dans un pool de threads)
+- Taille maximale stricte: l'entrée la moins récemment utilisée est évincée
+- Chaque entrée peut porter sa propre date d'expiration (ex. exp d'un JWT)
+- Compteurs hits/misses/evictions exposés via stats() et cache_stats() pour le dimensionnement
+"""
+
+_MISSING = object()
+
+# Registre des caches nommés (pour /health/caches)
+_registry: Dict[str, "TTLCache"] = {}
+_registry_lock = threading.Lock()
+
+
+class TTLCache:
+    """Cache LRU à expiration par entrée."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = float(ttl)
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Retourne la valeur si présente et non expirée (et la marque comme récente), sinon default."""
+        now = self._clock()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = item
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Insère/remplace une entrée; ttl (secondes) borné par le TTL par défaut du cache."""
+        eff_ttl = self.ttl if ttl is None else min(float(ttl), self.ttl)
+        if eff_ttl <= 0:
+            return
+        expires_at = self._clock() + eff_ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Supprime une entrée (invalidation explicite)."""
+        with self._lock:
+            item = self._data.pop(key, _MISSING)
+        return default if item is _MISSING else item[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        now = self._clock()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            return item is not _MISSING and item[0] > now
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / total, 4) if total else None,
+            }
+
+
+def named_cache(name: str, maxsize: int = 1024, ttl: float = 60.0) -> TTLCache:
+    """Retourne (en le créant au besoin) un cache nommé, visible dans cache_stats()."""
+    with _registry_lock:
+        cache = _registry.get(name)
+        if cache is None:
+            cache = TTLCache(maxsize=maxsize, ttl=ttl)
+            _registry[name] = cache
+        return cache
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Statistiques de tous les caches nommés."""
+    with _registry_lock:
+        caches = dict(_registry)
+    return {name: cache.stats() for name, cache in caches.items()}
@@ -0,0 +1,45 @@
+"""
+Sérialisation en flux (CSV / NDJSON) de lignes lues page par page.
+
+- stream_rows(pages, fmt, columns): un bloc d'octets par page => mémoire constante quelle que soit
+  la taille de la table (à passer à une StreamingResponse)
+- CSV: en-tête puis une ligne par enregistrement, colonnes fixes; NDJSON: un objet JSON par ligne
+- CSV injection: une cellule texte commençant par =, +, -, @, tabulation ou CR (nom, email saisis par
+  l'utilisateur) est préfixée par une apostrophe, pour qu'un tableur ne l'évalue pas comme formule
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+import csv
+import io
+import json
+
+EXPORT_FORMATS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _csv_cell(value: Any) -> Any:
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_chunk(rows: List[Dict[str, Any]], columns: Sequence[str], header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(columns), extrasaction="ignore", lineterminator="\n")
+    if header:
+        writer.writeheader()
+    writer.writerows({c: _csv_cell(row.get(c)) for c in columns} for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+def _ndjson_chunk(rows: List[Dict[str, Any]], columns: Sequence[str]) -> bytes:
+    lines = (json.dumps({c: row.get(c) for c in columns}, ensure_ascii=False, default=str) for row in rows)
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+def stream_rows(pages: Iterable[List[Dict[str, Any]]], fmt: str, columns: Sequence[str]) -> Iterator[bytes]:
+    """Octets de l'export au format `fmt` (csv | ndjson), page par page. ValueError si format inconnu."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format d'export non supporté: {fmt}")
+    if fmt == "csv":
+        # En-tête émis même pour une table vide
+        yield _csv_chunk([], columns, header=True)
+    for rows in pages:
+        yield _csv_chunk(rows, columns, header=False) if fmt == "csv" else _ndjson_chunk(rows, columns)
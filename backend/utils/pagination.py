@@ -0,0 +1,150 @@
+"""
+Pagination par clé (keyset) sur (colonne de tri, id) pour les requêtes PostgREST.
+
+- Pas d'OFFSET: chaque page reprend strictement après la dernière clé lue => coût constant par page,
+  stable pendant les insertions concurrentes
+- keyset_page(query, after, ...): ordre (tri, id) + filtre "après (valeur, id)" + limite
+- iter_keyset_pages(fetch_page, ...): parcours complet d'une table page par page (exports),
+  une seule page en mémoire à la fois
+- Endpoints de liste: curseur opaque (base64url de la clé (tri, id)), taille de page bornée
+  (PAGE_SIZE_DEFAULT / PAGE_SIZE_MAX), réponse avec next_cursor (None sur la dernière page)
+  - fetch_page(query, after, limit, ...): une page en base (limit + 1 lignes lues pour détecter la suite)
+  - paginate_rows(rows, after, limit, sort_key): même contrat sur une liste en mémoire (catalogues en cache)
+- La colonne de tri doit être non nulle (created_at, date_evenement, price...)
+- Curseur altéré: CursorError (sous-classe de ValueError), réponse 400 via le handler d'exceptions de l'app:
+  au décodage (forme, types), à la comparaison en mémoire, ou valeur refusée par PostgREST (SQLSTATE 22)
+"""
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+import base64
+import json
+
+from fastapi import HTTPException
+from postgrest.exceptions import APIError
+
+from backend.config import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX
+
+Keyset = Tuple[Any, Any]
+
+
+class CursorError(ValueError):
+    """Curseur illisible ou altéré."""
+
+
+class Page(NamedTuple):
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(after: Keyset) -> str:
+    """Curseur opaque (base64url sans padding) d'une clé (valeur de tri, id)."""
+    raw = json.dumps(list(after), separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Keyset]:
+    """Clé (valeur de tri, id) d'un curseur; None si absent. Lève CursorError s'il est invalide."""
+    if not cursor:
+        return None
+    try:
+        value = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise CursorError("curseur invalide") from e
+    if not isinstance(value, list) or len(value) != 2 or not all(_is_key_part(v) for v in value):
+        raise CursorError("curseur invalide")
+    return value[0], value[1]
+
+def _is_key_part(value: Any) -> bool:
+    # Valeurs produites par encode_cursor: texte (dates ISO, uuid) ou nombre (prix, id entier)
+    return isinstance(value, (str, int, float)) and not isinstance(value, bool)
+
+def cursor_or_400(cursor: Optional[str]) -> Optional[Keyset]:
+    """decode_cursor pour les vues: HTTPException 400 si le curseur est invalide."""
+    try:
+        return decode_cursor(cursor)
+    except CursorError:
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+
+def page_size(limit: Optional[int]) -> int:
+    """Taille de page effective: PAGE_SIZE_DEFAULT si absente, bornée à [1, PAGE_SIZE_MAX]."""
+    if not limit:
+        return PAGE_SIZE_DEFAULT
+    return max(1, min(int(limit), PAGE_SIZE_MAX))
+
+
+def _quote(value: Any) -> str:
+    # Valeur entre guillemets dans un filtre or=(...): protège ',', '.', ':', '+' (horodatages, décimaux)
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def keyset_filter(after: Keyset, sort_column: str = "created_at", desc: bool = False) -> str:
+    """Filtre PostgREST (or=) des lignes situées après `after` = (valeur de tri, id) dans l'ordre demandé."""
+    value, last_id = after
+    op = "lt" if desc else "gt"
+    return f"{sort_column}.{op}.{_quote(value)},and({sort_column}.eq.{_quote(value)},id.{op}.{_quote(last_id)})"
+
+def keyset_page(query, after: Optional[Keyset], limit: int, sort_column: str = "created_at", desc: bool = False):
+    """Applique tri (colonne, id), filtre de reprise et limite à une requête select PostgREST."""
+    if after is not None:
+        query = query.or_(keyset_filter(after, sort_column, desc))
+    return query.order(sort_column, desc=desc).order("id", desc=desc).limit(limit)
+
+def row_keyset(row: Dict[str, Any], sort_column: str = "created_at") -> Keyset:
+    """Clé de reprise d'une ligne: (valeur de tri, id)."""
+    return row.get(sort_column), row.get("id")
+
+def fetch_page(query, after: Optional[Keyset], limit: int, sort_column: str = "created_at", desc: bool = False) -> Page:
+    """
+    Exécute une page keyset de `query` (select PostgREST) et calcule next_cursor.
+    - Valeur de curseur refusée par PostgREST (SQLSTATE 22: date, uuid... invalide): CursorError
+    - Les autres erreurs d'exécution sont propagées (le repository applique sa convention d'erreur,
+      en laissant passer CursorError)
+    """
+    try:
+        rows = keyset_page(query, after, limit + 1, sort_column, desc).execute().data or []
+    except APIError as e:
+        if after is not None and str(e.code or "").startswith("22"):
+            raise CursorError("curseur invalide") from e
+        raise
+    if len(rows) <= limit:
+        return Page(rows, None)
+    rows = rows[:limit]
+    return Page(rows, encode_cursor(row_keyset(rows[-1], sort_column)))
+
+def paginate_rows(
+    rows: Sequence[Dict[str, Any]],
+    after: Optional[Keyset],
+    limit: int,
+    sort_key: Callable[[Dict[str, Any]], Keyset],
+) -> Page:
+    """
+    Page d'une liste en mémoire ordonnée par sort_key(row) = (valeur de tri, id), reprise après `after`.
+    - CursorError si `after` n'est pas comparable aux clés (types différents)
+    """
+    ordered = sorted(rows, key=sort_key)
+    if after is not None:
+        after = tuple(after)
+        try:
+            ordered = [r for r in ordered if sort_key(r) > after]
+        except TypeError as e:
+            raise CursorError("curseur invalide") from e
+    if len(ordered) <= limit:
+        return Page(list(ordered), None)
+    items = list(ordered[:limit])
+    return Page(items, encode_cursor(sort_key(items[-1])))
+
+def iter_keyset_pages(
+    fetch_page: Callable[[Optional[Keyset], int], List[Dict[str, Any]]],
+    page_size: int,
+    sort_column: str = "created_at",
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Itère sur toutes les pages de fetch_page(after, limit), jusqu'à une page incomplète.
+    - Les erreurs de fetch_page sont propagées (un parcours interrompu ne doit pas paraître complet)
+    """
+    size = max(1, int(page_size))
+    after: Optional[Keyset] = None
+    while True:
+        rows = fetch_page(after, size)
+        if rows:
+            yield rows
+        if len(rows) < size:
+            return
+        after = row_keyset(rows[-1], sort_column)
@@ -1,33 +1,320 @@
+"""
+Rendu des QR codes (PNG / SVG) avec cache.
+
+- Le rendu est déterministe pour (contenu, format, box_size, border): les octets sont mis en cache
+  mémoire (LRU "qr_codes") et, si QR_CACHE_DIR est défini, sur disque (partagé entre workers)
+- Écriture disque atomique (fichier temporaire puis os.replace); une erreur disque n'empêche pas le rendu
+- Nettoyage du cache disque (prune_disk_cache): fichiers non utilisés depuis QR_CACHE_DIR_MAX_AGE
+  supprimés, puis les plus anciens jusqu'à repasser sous QR_CACHE_DIR_MAX_MB; lancé en tâche de fond
+  après une écriture, au plus une fois par QR_CACHE_DIR_PRUNE_INTERVAL et par processus. Une lecture
+  disque rafraîchit la date du fichier (les QR servis restent en cache)
+- generate_qr_code conserve son format historique (data URL PNG base64)
+- render_qr_codes: rendu groupé, les absents du cache sont rendus en parallèle dans un pool de
+  processus (QR_RENDER_WORKERS, hors GIL), dans un budget de temps QR_RENDER_TIMEOUT; un rendu hors
+  budget n'est pas abandonné: il termine en arrière-plan et alimente le cache (requête suivante servie)
+- Un même QR en cours de rendu n'est soumis qu'une fois au pool (requêtes concurrentes)
+- warm_pool (démarrage): lance les processus du pool pour que la première requête ne paie pas le spawn
+"""
 import qrcode
+import qrcode.image.svg
 import base64
+import hashlib
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, wait
+from functools import partial
 from io import BytesIO
+from typing import Dict, List, Optional, Sequence
 
-def generate_qr_code(data: str, box_size: int = 10, border: int = 4) -> str:
+from backend.config import (
+    QR_CACHE_MAXSIZE, QR_CACHE_TTL, QR_CACHE_DIR, QR_CACHE_DIR_MAX_MB, QR_CACHE_DIR_MAX_AGE,
+    QR_CACHE_DIR_PRUNE_INTERVAL, QR_RENDER_WORKERS, QR_RENDER_TIMEOUT, QR_POOL_WARMUP,
+)
+from backend.utils.cache import named_cache
+
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+
+_cache = named_cache("qr_codes", maxsize=QR_CACHE_MAXSIZE, ttl=QR_CACHE_TTL)
+_pool: Optional[Executor] = None
+_pool_lock = threading.Lock()
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+_last_prune: Optional[float] = None
+_prune_lock = threading.Lock()
+
+def _cache_key(data: str, fmt: str, box_size: int, border: int) -> str:
+    return hashlib.sha256(f"{fmt}|{box_size}|{border}|{data}".encode("utf-8")).hexdigest()
+
+def _disk_path(key: str, fmt: str) -> Optional[str]:
+    if not QR_CACHE_DIR:
+        return None
+    return os.path.join(QR_CACHE_DIR, key[:2], f"{key}.{fmt}")
+
+def _read_disk(path: Optional[str]) -> Optional[bytes]:
+    if not path:
+        return None
+    try:
+        with open(path, "rb") as f:
+            content = f.read()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        logger.warning("qr cache: lecture disque impossible %s: %s", path, e)
+        return None
+    try:
+        os.utime(path)  # date de dernier usage, pour prune_disk_cache
+    except OSError:
+        pass
+    return content
+
+def _write_disk(path: Optional[str], content: bytes) -> None:
+    if not path:
+        return
+    try:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("qr cache: écriture disque impossible %s: %s", path, e)
+        return
+    _schedule_prune()
+
+def prune_disk_cache(now: Optional[float] = None) -> int:
     """
-    Génère un QR code à partir d'une chaîne de caractères et le retourne en base64.
-    
-    Args:
-        data: La chaîne de caractères à encoder dans le QR code (généralement un token)
-        box_size: La taille de chaque boîte du QR code
-        border: La taille de la bordure du QR code
-        
-    Returns:
-        Une chaîne de caractères représentant l'image du QR code encodée en base64
+    Nettoie QR_CACHE_DIR et retourne le nombre de fichiers supprimés.
+    - Du plus ancien au plus récent (mtime = dernier usage): suppression des fichiers plus vieux que
+      QR_CACHE_DIR_MAX_AGE, puis tant que le total dépasse QR_CACHE_DIR_MAX_MB
+    - Sûr entre processus: un fichier déjà supprimé est ignoré, un QR supprimé sera simplement re-rendu
     """
+    if not QR_CACHE_DIR:
+        return 0
+    now = time.time() if now is None else now
+    entries = []
+    for root, _dirs, files in os.walk(QR_CACHE_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+    entries.sort()
+    total = sum(size for _mtime, size, _path in entries)
+    max_bytes = QR_CACHE_DIR_MAX_MB * 1024 * 1024
+    removed = 0
+    for mtime, size, path in entries:
+        expired = QR_CACHE_DIR_MAX_AGE > 0 and now - mtime > QR_CACHE_DIR_MAX_AGE
+        if not expired and (max_bytes <= 0 or total <= max_bytes):
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning("qr cache: suppression impossible %s: %s", path, e)
+            continue
+        total -= size
+        removed += 1
+    if removed:
+        logger.info("qr cache: %s fichier(s) supprimé(s) de %s", removed, QR_CACHE_DIR)
+    return removed
+
+def _prune_quietly() -> None:
+    try:
+        prune_disk_cache()
+    except Exception:
+        logger.exception("qr cache: échec du nettoyage disque")
+
+def _schedule_prune() -> None:
+    """Lance prune_disk_cache dans un thread, au plus une fois par QR_CACHE_DIR_PRUNE_INTERVAL."""
+    global _last_prune
+    now = time.monotonic()
+    with _prune_lock:
+        if _last_prune is not None and now - _last_prune < QR_CACHE_DIR_PRUNE_INTERVAL:
+            return
+        _last_prune = now
+    threading.Thread(target=_prune_quietly, name="qr-cache-prune", daemon=True).start()
+
+def _render(data: str, fmt: str, box_size: int, border: int) -> bytes:
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
         box_size=box_size,
         border=border,
+        image_factory=qrcode.image.svg.SvgPathImage if fmt == "svg" else None,
     )
     qr.add_data(data)
     qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    # Convertir l'image en base64
+
+    img = qr.make_image(fill_color="black", back_color="white") if fmt == "png" else qr.make_image()
     buffered = BytesIO()
-    img.save(buffered, format="PNG")
-    img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
-    
-    return f"data:image/png;base64,{img_str}"
\ No newline at end of file
+    if fmt == "png":
+        img.save(buffered, format="PNG")
+    else:
+        img.save(buffered)
+    return buffered.getvalue()
+
+def render_qr_code(data: str, fmt: str = "png", box_size: int = 10, border: int = 4) -> bytes:
+    """
+    Octets de l'image QR (PNG ou SVG) pour `data`, servis depuis le cache si possible.
+    - Ordre: cache mémoire, puis cache disque (QR_CACHE_DIR), puis rendu
+    - ValueError si le format n'est pas supporté
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Format QR non supporté: {fmt}")
+    key = _cache_key(data, fmt, box_size, border)
+    content = _cache.get(key)
+    if content is not None:
+        return content
+    path = _disk_path(key, fmt)
+    content = _read_disk(path)
+    if content is None:
+        content = _render(data, fmt, box_size, border)
+        _write_disk(path, content)
+    _cache.set(key, content)
+    return content
+
+def _get_pool() -> Optional[Executor]:
+    """Pool de processus de rendu, créé au premier usage (None si QR_RENDER_WORKERS <= 0)."""
+    global _pool
+    if QR_RENDER_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn: pas de fork d'un processus serveur multi-threadé
+            _pool = ProcessPoolExecutor(max_workers=QR_RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def warm_pool() -> None:
+    """
+    Démarre les processus du pool (lifespan), sans attendre: un rendu minimal par worker importe
+    qrcode/PIL dans chaque processus. Sans effet si QR_POOL_WARMUP=0 ou si le pool est désactivé.
+    """
+    if not QR_POOL_WARMUP:
+        return
+    pool = _get_pool()
+    if pool is None:
+        return
+    for _ in range(QR_RENDER_WORKERS):
+        pool.submit(_render, "warmup", "png", 1, 0)
+
+def _on_rendered(key: str, fmt: str, future: Future) -> None:
+    """Callback de fin de rendu en pool: alimente les caches, que l'appelant ait attendu ou non."""
+    with _inflight_lock:
+        _inflight.pop(key, None)
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        logger.error("qr render: échec du rendu en pool: %s", error)
+        return
+    content = future.result()
+    _write_disk(_disk_path(key, fmt), content)
+    _cache.set(key, content)
+
+def _submit(pool: Executor, key: str, data: str, fmt: str, box_size: int, border: int) -> Future:
+    """Soumet un rendu au pool, ou réutilise le rendu déjà en cours pour la même clé."""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        created = future is None
+        if created:
+            future = pool.submit(_render, data, fmt, box_size, border)
+            _inflight[key] = future
+    if created:
+        # Hors verrou: le callback est exécuté immédiatement si le rendu est déjà terminé
+        future.add_done_callback(partial(_on_rendered, key, fmt))
+    return future
+
+def shutdown_pool() -> None:
+    """Arrête le pool de rendu (lifespan); les rendus non démarrés sont annulés."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def render_qr_codes(items: Sequence[str], fmt: str = "png", box_size: int = 10, border: int = 4,
+                    timeout: float = QR_RENDER_TIMEOUT) -> List[Optional[bytes]]:
+    """
+    Version groupée de render_qr_code, dans l'ordre de `items`.
+    - Cache mémoire/disque d'abord; les contenus manquants sont rendus en parallèle (pool de processus),
+      ou dans le processus courant si le pool est désactivé ou s'il n'y a qu'un rendu
+    - Budget: au-delà de `timeout` secondes, les rendus non terminés valent None (l'appelant peut
+      se rabattre sur le QR unitaire); ils continuent dans le pool et sont mis en cache à leur fin
+    - ValueError si le format n'est pas supporté
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Format QR non supporté: {fmt}")
+    results: List[Optional[bytes]] = [None] * len(items)
+    missing: Dict[str, List[int]] = {}
+    for index, data in enumerate(items):
+        key = _cache_key(data, fmt, box_size, border)
+        content = _cache.get(key)
+        if content is None:
+            content = _read_disk(_disk_path(key, fmt))
+            if content is not None:
+                _cache.set(key, content)
+        if content is None:
+            missing.setdefault(key, []).append(index)
+        else:
+            results[index] = content
+    if not missing:
+        return results
+
+    pool = _get_pool() if len(missing) > 1 else None
+    if pool is None:
+        rendered = {}
+        for key, indexes in missing.items():
+            rendered[key] = _render(items[indexes[0]], fmt, box_size, border)
+            _write_disk(_disk_path(key, fmt), rendered[key])
+            _cache.set(key, rendered[key])
+    else:
+        # La mise en cache est faite par _on_rendered, y compris pour les rendus hors budget
+        futures = {key: _submit(pool, key, items[indexes[0]], fmt, box_size, border) for key, indexes in missing.items()}
+        wait(futures.values(), timeout=timeout)
+        rendered = {}
+        late = 0
+        for key, future in futures.items():
+            if not future.done():
+                late += 1
+                continue
+            try:
+                rendered[key] = future.result()
+            except Exception:
+                continue
+        if late:
+            logger.warning("qr render: budget de %.2fs dépassé, %s QR différés (mis en cache à la fin du rendu)", timeout, late)
+
+    for key, content in rendered.items():
+        for index in missing[key]:
+            results[index] = content
+    return results
+
+def qr_data_url(content: bytes) -> str:
+    """Data URL PNG base64 (format de generate_qr_code)."""
+    return "data:image/png;base64," + base64.b64encode(content).decode("utf-8")
+
+def generate_qr_code(data: str, box_size: int = 10, border: int = 4) -> str:
+    """
+    Génère un QR code à partir d'une chaîne de caractères et le retourne en base64.
+
+    Args:
+        data: La chaîne de caractères à encoder dans le QR code (généralement un token)
+        box_size: La taille de chaque boîte du QR code
+        border: La taille de la bordure du QR code
+
+    Returns:
+        Une chaîne de caractères représentant l'image du QR code encodée en base64
+        (rendu PNG mis en cache, voir render_qr_code)
+    """
+    return qr_data_url(render_qr_code(data, "png", box_size, border))
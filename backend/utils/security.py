@@ -1,4 +1,5 @@
 from fastapi import Request, HTTPException, Depends
+from starlette.requests import HTTPConnection
 from fastapi.responses import Response
 from typing import Optional, Dict, Any
 from backend.config import COOKIE_SECURE
@@ -33,15 +34,18 @@ def set_session_cookie(response: Response, access_token: str):
 def clear_session_cookie(response: Response):
     response.delete_cookie(COOKIE_NAME, path="/")
 
-def get_current_user(request: Request) -> Dict[str, Any]:
-    # Hybride: priorité au Bearer, fallback cookie
+def token_from_connection(conn: HTTPConnection) -> Optional[str]:
+    """Access token d'une requête HTTP ou d'un WebSocket: Bearer prioritaire, fallback cookie."""
     token = None
-    auth_header = request.headers.get("Authorization", "")
+    auth_header = conn.headers.get("Authorization", "")
     if auth_header.startswith("Bearer "):
         token = auth_header[7:].strip()
     if not token:
-        token = request.cookies.get(COOKIE_NAME)
+        token = conn.cookies.get(COOKIE_NAME)
+    return token or None
 
+def user_from_token(token: Optional[str]) -> Dict[str, Any]:
+    """Utilisateur normalisé d'un access token; HTTPException 401 si absent, invalide ou expiré."""
     if not token:
         raise HTTPException(status_code=401, detail="Non authentifié")
 
@@ -57,6 +61,10 @@ def get_current_user(request: Request) -> Dict[str, Any]:
     except Exception:
         raise HTTPException(status_code=401, detail="Session expirée, veuillez vous connecter")
 
+def get_current_user(request: Request) -> Dict[str, Any]:
+    # Hybride: priorité au Bearer, fallback cookie
+    return user_from_token(token_from_connection(request))
+
 def require_user(user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
     return user
 
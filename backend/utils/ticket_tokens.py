@@ -0,0 +1,128 @@
+"""Jetons de billet signés (QR), vérifiables sans accès base.
+- Format: "t1.<payload>.<signature>"
+  - payload: base64url(ticket_token | offre_id | user_key)
+  - signature: HMAC-SHA256 tronqué à 128 bits (base64url) sur "t1.<payload>", clé TICKET_SIGNING_SECRET
+- Rotation: TICKET_SIGNING_PREVIOUS_SECRETS (liste séparée par des virgules) reste acceptée en vérification.
+- Format historique "<user_key>.<ticket_token>": accepté tant que TICKET_LEGACY_TOKENS est actif
+  (billets déjà imprimés); sans secret configuré, les QR restent émis dans ce format.
+- parse_scan_token rejette un jeton forgé ou malformé sans I/O (TicketTokenError avec une raison courte).
+"""
+from typing import List, NamedTuple, Optional
+import base64
+import binascii
+import hashlib
+import hmac
+
+from backend.config import TICKET_SIGNING_SECRET, TICKET_SIGNING_PREVIOUS_SECRETS, TICKET_LEGACY_TOKENS
+
+TOKEN_VERSION = "t1"
+_FIELD_SEP = "|"
+_SIGNATURE_BYTES = 16
+
+
+class ScannedToken(NamedTuple):
+    ticket_token: str
+    user_key: str
+    offre_id: Optional[str]
+    signed: bool
+
+
+class TicketTokenError(ValueError):
+    """
+    Jeton scanné refusé avant toute lecture base.
+    - reason: code court repris dans les réponses ('invalid_signature', 'malformed_token', ...)
+    """
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+        self.message = message
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _secrets() -> List[str]:
+    previous = [s.strip() for s in (TICKET_SIGNING_PREVIOUS_SECRETS or "").split(",")]
+    return [s for s in [TICKET_SIGNING_SECRET, *previous] if s]
+
+
+def _signature(secret: str, signed_part: str) -> str:
+    digest = hmac.new(secret.encode("utf-8"), signed_part.encode("ascii"), hashlib.sha256).digest()
+    return _b64encode(digest[:_SIGNATURE_BYTES])
+
+
+def _clean(value: str) -> str:
+    return (value or "").strip().strip('"').strip("'")
+
+
+def signing_enabled() -> bool:
+    return bool(TICKET_SIGNING_SECRET)
+
+
+def sign_ticket_token(ticket_token: str, offre_id: str, user_key: str) -> str:
+    """Construit le jeton signé d'un billet (ValueError si secret absent ou champ vide/invalide)."""
+    if not TICKET_SIGNING_SECRET:
+        raise ValueError("TICKET_SIGNING_SECRET manquant")
+    fields = [str(ticket_token or ""), str(offre_id or ""), str(user_key or "")]
+    if any(not f or _FIELD_SEP in f for f in fields):
+        raise ValueError("Champs de jeton invalides")
+    payload = _b64encode(_FIELD_SEP.join(fields).encode("utf-8"))
+    signed_part = f"{TOKEN_VERSION}.{payload}"
+    return f"{signed_part}.{_signature(TICKET_SIGNING_SECRET, signed_part)}"
+
+
+def build_scan_token(ticket_token: str, offre_id: Optional[str], user_key: str) -> str:
+    """Jeton à encoder dans le QR: signé si un secret est configuré, sinon format historique."""
+    if signing_enabled() and offre_id:
+        return sign_ticket_token(ticket_token, offre_id, user_key)
+    return f"{user_key}.{ticket_token}"
+
+
+def _parse_signed(raw: str) -> ScannedToken:
+    parts = raw.split(".")
+    if len(parts) != 3 or not parts[1] or not parts[2]:
+        raise TicketTokenError("malformed_token", "Format de billet invalide")
+    signed_part = f"{parts[0]}.{parts[1]}"
+    secrets = _secrets()
+    try:
+        # compare_digest sur chaque clé connue (temps constant par comparaison)
+        valid = any(hmac.compare_digest(_signature(s, signed_part), parts[2]) for s in secrets)
+    except (TypeError, UnicodeEncodeError):
+        valid = False
+    if not valid:
+        raise TicketTokenError("invalid_signature", "Signature du billet invalide")
+    try:
+        fields = _b64decode(parts[1]).decode("utf-8").split(_FIELD_SEP)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise TicketTokenError("malformed_token", "Format de billet invalide")
+    if len(fields) != 3 or not all(fields):
+        raise TicketTokenError("malformed_token", "Format de billet invalide")
+    ticket_token, offre_id, user_key = fields
+    return ScannedToken(ticket_token=ticket_token, user_key=user_key, offre_id=offre_id, signed=True)
+
+
+def parse_scan_token(token: str) -> ScannedToken:
+    """
+    Analyse un jeton scanné (signé ou historique) sans accès base.
+    - Signé: vérifie la signature puis décode (ticket_token, offre_id, user_key)
+    - Historique "<user_key>.<ticket_token>": découpage sur le premier point
+    - Lève TicketTokenError: 'user_key_required' | 'invalid_composite_token' | 'malformed_token'
+      | 'invalid_signature' | 'legacy_token_rejected'
+    """
+    raw = _clean(token)
+    if raw.startswith(TOKEN_VERSION + "."):
+        return _parse_signed(raw)
+
+    if "." not in raw:
+        raise TicketTokenError("user_key_required", "Clé utilisateur requise")
+    user_key, ticket_token = (_clean(p) for p in raw.split(".", 1))
+    if not user_key or not ticket_token:
+        raise TicketTokenError("invalid_composite_token", "Format de clé invalide")
+    if not TICKET_LEGACY_TOKENS:
+        raise TicketTokenError("legacy_token_rejected", "Format de billet obsolète")
+    return ScannedToken(ticket_token=ticket_token, user_key=user_key, offre_id=None, signed=False)
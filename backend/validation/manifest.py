@@ -0,0 +1,144 @@
+"""
+Manifeste hors ligne des billets d’une offre, pour les scanners à connectivité faible.
+
+- Contenu: empreintes des tokens de billets (SHA-256 tronqué à MANIFEST_HASH_BYTES octets),
+  triées et concaténées (base64) => recherche dichotomique O(log n) côté scanner
+- Version: horodatage (ms) du billet le plus récent inclus (commandes.created_at)
+- Delta: billets créés depuis une version (since), avec un recouvrement MANIFEST_DELTA_OVERLAP
+  pour les transactions validées après la lecture; le scanner fusionne (union d’ensembles)
+- Suppressions (billet supprimé/remboursé): un delta est additif et ne les transporte pas. Chaque
+  réponse (complète ou delta) porte donc l’état de l’ensemble complet: total (nombre d’empreintes)
+  et digest (SHA-256 hex des empreintes triées concaténées). Après fusion, le scanner compare son
+  ensemble à (total, digest); en cas d’écart il recharge le manifeste complet (since absent)
+- Lecture base: une fois par offre et par MANIFEST_CACHE_TTL (instantané mémoire), par pages
+  de _PAGE_SIZE lignes; les deltas sont calculés sur l’instantané, sans requête
+- Chargements concurrents sérialisés par verrous répartis (_LOCK_STRIPES verrous fixes, indexés par
+  offre_id): mémoire bornée quel que soit l’offre_id envoyé par le client
+- Les doublons de scan restent détectés en ligne (scan_guard) lors de la resynchronisation
+"""
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import base64
+import bisect
+import hashlib
+import logging
+import threading
+
+from backend.config import MANIFEST_CACHE_TTL, MANIFEST_HASH_BYTES, MANIFEST_DELTA_OVERLAP
+from backend.infra.supabase_client import get_service_supabase
+from backend.utils.cache import named_cache
+
+logger = logging.getLogger(__name__)
+
+HASH_ALGORITHM = "sha256"
+_PAGE_SIZE = 1000
+
+_cache = named_cache("validation_manifest", maxsize=256, ttl=MANIFEST_CACHE_TTL)
+_LOCK_STRIPES = 64
+_load_locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+
+
+class ManifestSnapshot(NamedTuple):
+    offre_id: str
+    version: int
+    # (created_at en ms, empreinte) triés par date de création
+    entries: List[Tuple[int, bytes]]
+    # Empreintes triées et concaténées (manifeste complet)
+    blob: bytes
+    # SHA-256 hex de blob: contrôle de l’ensemble complet côté scanner
+    digest: str
+
+
+def token_hash(token: str) -> bytes:
+    """Empreinte d’un token de billet (même calcul côté scanner)."""
+    return hashlib.sha256(token.encode("utf-8")).digest()[:MANIFEST_HASH_BYTES]
+
+def _to_ms(value: Any) -> int:
+    try:
+        return int(datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp() * 1000)
+    except (TypeError, ValueError):
+        return 0
+
+def _load_rows(offre_id: str) -> Optional[List[Dict[str, Any]]]:
+    """Tous les billets (token, created_at) d’une offre, par pages. None en cas d’erreur."""
+    rows: List[Dict[str, Any]] = []
+    start = 0
+    try:
+        while True:
+            res = (
+                get_service_supabase()
+                .table("commandes")
+                .select("token, created_at")
+                .eq("offre_id", offre_id)
+                .order("created_at", desc=False)
+                .order("id", desc=False)
+                .range(start, start + _PAGE_SIZE - 1)
+                .execute()
+            )
+            page = res.data or []
+            rows.extend(page)
+            if len(page) < _PAGE_SIZE:
+                return rows
+            start += _PAGE_SIZE
+    except Exception:
+        logger.exception("validation.manifest load failed offre_id=%s", offre_id)
+        return None
+
+def build_snapshot(offre_id: str, rows: List[Dict[str, Any]]) -> ManifestSnapshot:
+    entries = sorted((_to_ms(r.get("created_at")), token_hash(r["token"])) for r in rows if r.get("token"))
+    version = entries[-1][0] if entries else 0
+    blob = b"".join(sorted(h for _, h in entries))
+    return ManifestSnapshot(offre_id=offre_id, version=version, entries=entries, blob=blob,
+                            digest=hashlib.sha256(blob).hexdigest())
+
+def _lock_for(offre_id: str) -> threading.Lock:
+    stripe = int.from_bytes(hashlib.sha256(offre_id.encode("utf-8")).digest()[:4], "big") % _LOCK_STRIPES
+    return _load_locks[stripe]
+
+def get_snapshot(offre_id: str) -> Optional[ManifestSnapshot]:
+    """Instantané courant de l’offre (un seul chargement concurrent par offre). None si erreur."""
+    snapshot = _cache.get(offre_id)
+    if snapshot is not None:
+        return snapshot
+    with _lock_for(offre_id):
+        snapshot = _cache.get(offre_id)
+        if snapshot is not None:
+            return snapshot
+        rows = _load_rows(offre_id)
+        if rows is None:
+            return None
+        snapshot = build_snapshot(offre_id, rows)
+        _cache.set(offre_id, snapshot)
+        return snapshot
+
+def render(snapshot: ManifestSnapshot, since: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Manifeste complet (since absent) ou delta depuis `since`.
+    - hashes: base64 des empreintes triées concaténées (MANIFEST_HASH_BYTES octets chacune)
+    - total / digest: taille et SHA-256 hex de l’ensemble complet (détection des suppressions après un delta)
+    """
+    full = since is None or since <= 0
+    if full:
+        blob = snapshot.blob
+    else:
+        threshold = since - int(MANIFEST_DELTA_OVERLAP * 1000)
+        start = bisect.bisect_left(snapshot.entries, (threshold, b""))
+        blob = b"".join(sorted(h for _, h in snapshot.entries[start:]))
+    return {
+        "offre_id": snapshot.offre_id,
+        "version": snapshot.version,
+        "since": None if full else since,
+        "full": full,
+        "hash": {"algorithm": HASH_ALGORITHM, "bytes": MANIFEST_HASH_BYTES},
+        "count": len(blob) // MANIFEST_HASH_BYTES,
+        "hashes": base64.b64encode(blob).decode("ascii"),
+        "total": len(snapshot.entries),
+        "digest": snapshot.digest,
+    }
+
+def invalidate(offre_id: Optional[str] = None) -> None:
+    """Oublie l’instantané d’une offre (ou de toutes)."""
+    if offre_id is None:
+        _cache.clear()
+    else:
+        _cache.pop(offre_id)
@@ -1,81 +1,200 @@
 # module backend.validation.repository
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 import logging
 from supabase import create_client
 from backend.config import SUPABASE_URL, SUPABASE_ANON
-from backend.infra.supabase_client import get_service_supabase
+from backend.infra.supabase_client import get_service_supabase, get_async_service_supabase
 from postgrest.exceptions import APIError
 
 logger = logging.getLogger(__name__)
 
-def get_ticket_by_token(token: str) -> Optional[Dict[str, Any]]:
-    """
-    Récupère une 'commande' (billet) par token.
-    Lecture robuste: on évite les sélections imbriquées dépendantes de FKs et on fait des fetch séparés.
-    """
-    # Sécurisation: nettoyer guillemets et, si jamais un composite arrive, ne garder que la partie droite
+def _clean_ticket_token(token: str) -> str:
     cleaned = (token or "").strip().strip('"').strip("'")
     if "." in cleaned:
         cleaned = cleaned.split(".", 1)[1].strip().strip('"').strip("'")
+    return cleaned
 
-    try:
-        base_res = (
-            get_service_supabase()
-            .table("commandes")
-            .select("id, token, user_id, created_at, offre_id")
-            .eq("token", cleaned)
-            .single()
-            .execute()
-        )
-        row = base_res.data or None
-    except Exception as e:
-        logger.exception("Erreur lors de la récupération de la commande par token: %s", e)
-        return None
+_TICKET_COLUMNS = "id, token, user_id, created_at, offre_id"
+_OFFRE_COLUMNS = "id, title, description"
+_USER_COLUMNS = "id, full_name, email, bio"
+_VALIDATION_COLUMNS = "id, token, commande_id, scanned_at, scanned_by, status"
 
-    if not row:
-        return None
+# Niveau d'embarquement supporté par le schéma PostgREST, mémorisé après le premier échec:
+# 2 = offres + users + dernière ticket_validations, 1 = offres + users, 0 = requêtes séparées
+_embed_level = 2
+# Codes PostgREST "relation introuvable / ambiguë" (les autres erreurs ne déclenchent pas de repli)
+_EMBED_ERROR_CODES = {"PGRST200", "PGRST201"}
+
+def _ticket_select(level: int) -> str:
+    columns = _TICKET_COLUMNS
+    if level >= 1:
+        columns += f", offres({_OFFRE_COLUMNS}), users({_USER_COLUMNS})"
+    if level >= 2:
+        columns += f", ticket_validations({_VALIDATION_COLUMNS})"
+    return columns
+
+def _with_last_validation(query, level: int):
+    # Dernière validation par billet (tri + limite appliqués à chaque ligne parente)
+    if level >= 2:
+        query = query.order("scanned_at", desc=True, foreign_table="ticket_validations").limit(1, foreign_table="ticket_validations")
+    return query
 
-    result: Dict[str, Any] = {
+def _ticket_query(client, cleaned: str, level: int):
+    query = client.table("commandes").select(_ticket_select(level)).eq("token", cleaned)
+    return _with_last_validation(query, level).limit(1)
+
+def _ticket_from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalise une ligne commandes (éventuellement embarquée) vers le format ticket."""
+    validations = row.get("ticket_validations")
+    if isinstance(validations, list):
+        last = validations[0] if validations else None
+    else:
+        last = validations or None
+    return {
         "id": row.get("id"),
         "token": row.get("token"),
         "user_id": row.get("user_id"),
         "created_at": row.get("created_at"),
         "offre_id": row.get("offre_id"),
+        "offres": row.get("offres") or None,
+        "users": row.get("users") or None,
+        "last_validation": last,
     }
 
-    # Optionnel: récupérer l'offre associée (retirer 'image' si la colonne n'existe pas)
+def _downgrade_embed(level: int, e: Exception) -> None:
+    global _embed_level
+    if _embed_level == level:
+        logger.warning("Sélection embarquée niveau %s refusée par PostgREST, repli: %s", level, e)
+        _embed_level = level - 1
+
+def get_ticket_by_token(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Récupère une 'commande' (billet) par token, avec son offre, l'utilisateur (bio = user_key)
+    et la dernière validation ('last_validation'), en une seule requête (sélection embarquée).
+    - Si le schéma ne permet pas l'embarquement (relation absente), repli mémorisé sur
+      une sélection partielle puis sur des requêtes séparées
+    """
+    # Sécurisation: nettoyer guillemets et, si jamais un composite arrive, ne garder que la partie droite
+    cleaned = _clean_ticket_token(token)
+
+    while True:
+        level = _embed_level
+        try:
+            res = _ticket_query(get_service_supabase(), cleaned, level).execute()
+            rows = res.data or []
+            break
+        except APIError as e:
+            if level == 0 or getattr(e, "code", None) not in _EMBED_ERROR_CODES:
+                logger.exception("Erreur lors de la récupération de la commande par token: %s", e)
+                return None
+            _downgrade_embed(level, e)
+        except Exception as e:
+            logger.exception("Erreur lors de la récupération de la commande par token: %s", e)
+            return None
+
+    if not rows:
+        return None
+    result = _ticket_from_row(rows[0])
+    if level >= 2:
+        return result
+
+    if level == 0:
+        result["offres"] = _fetch_single("offres", _OFFRE_COLUMNS, result["offre_id"]) if result.get("offre_id") else None
+        result["users"] = _fetch_single("users", _USER_COLUMNS, result["user_id"]) if result.get("user_id") else None
+    result["last_validation"] = get_last_validation(cleaned)
+    return result
+
+# Taille max d'un filtre in_ (longueur d'URL PostgREST)
+_IN_CHUNK_SIZE = 200
+
+def get_tickets_by_tokens(tokens: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Version groupée de get_ticket_by_token (scan par lot): {token: ticket}, tokens inconnus absents.
+    - Une requête in_("token", ...) par tranche de _IN_CHUNK_SIZE tokens, même sélection embarquée
+    - Repli (embarquement partiel): offres, users et dernières validations lus par in_ groupés
+    - Erreur sur une tranche (ex. token mal formé pour le type uuid): repli token par token
+    """
+    cleaned = list(dict.fromkeys(t for t in (_clean_ticket_token(x) for x in tokens) if t))
+    found: Dict[str, Dict[str, Any]] = {}
+    for start in range(0, len(cleaned), _IN_CHUNK_SIZE):
+        chunk = cleaned[start:start + _IN_CHUNK_SIZE]
+        rows = _fetch_ticket_rows(chunk)
+        if rows is None:
+            for token in chunk:
+                ticket = get_ticket_by_token(token)
+                if ticket:
+                    found[token] = ticket
+            continue
+        found.update(rows)
+    return found
+
+def _fetch_ticket_rows(tokens: List[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+    while True:
+        level = _embed_level
+        try:
+            query = get_service_supabase().table("commandes").select(_ticket_select(level)).in_("token", tokens)
+            rows = _with_last_validation(query, level).execute().data or []
+            break
+        except APIError as e:
+            if level == 0 or getattr(e, "code", None) not in _EMBED_ERROR_CODES:
+                logger.warning("Lecture groupée des commandes en échec (%s tokens): %s", len(tokens), e)
+                return None
+            _downgrade_embed(level, e)
+        except Exception as e:
+            logger.warning("Lecture groupée des commandes en échec (%s tokens): %s", len(tokens), e)
+            return None
+
+    tickets = {t["token"]: t for t in (_ticket_from_row(r) for r in rows) if t.get("token")}
+    if level >= 2 or not tickets:
+        return tickets
+
+    if level == 0:
+        offres = _fetch_many("offres", _OFFRE_COLUMNS, {t["offre_id"] for t in tickets.values() if t.get("offre_id")})
+        users = _fetch_many("users", _USER_COLUMNS, {t["user_id"] for t in tickets.values() if t.get("user_id")})
+        for t in tickets.values():
+            t["offres"] = offres.get(str(t.get("offre_id")))
+            t["users"] = users.get(str(t.get("user_id")))
+    last = _fetch_last_validations(list(tickets))
+    for token, t in tickets.items():
+        t["last_validation"] = last.get(token)
+    return tickets
+
+def _fetch_many(table: str, columns: str, ids: set) -> Dict[str, Dict[str, Any]]:
+    if not ids:
+        return {}
     try:
-        if row.get("offre_id"):
-            offre_res = (
-                get_service_supabase()
-                .table("offres")
-                .select("id, title, description")  # image retiré
-                .eq("id", row["offre_id"])
-                .single()
-                .execute()
-            )
-            result["offres"] = offre_res.data or None
+        res = get_service_supabase().table(table).select(columns).in_("id", list(ids)).execute()
+        return {str(r.get("id")): r for r in (res.data or [])}
     except Exception as e:
-        logger.warning("Impossible de récupérer l'offre associée: %s", e)
-        result["offres"] = None
+        logger.warning("Impossible de récupérer %s (%s ids): %s", table, len(ids), e)
+        return {}
 
-    # Optionnel: récupérer l'utilisateur associé (pour bio = user_key)
+def _fetch_last_validations(tokens: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Dernière validation par token (une requête, tri scanned_at décroissant)."""
     try:
-        if row.get("user_id"):
-            user_res = (
-                get_service_supabase()
-                .table("users")
-                .select("id, full_name, email, bio")
-                .eq("id", row["user_id"])
-                .single()
-                .execute()
-            )
-            result["users"] = user_res.data or None
+        res = (
+            get_service_supabase()
+            .table("ticket_validations")
+            .select(_VALIDATION_COLUMNS)
+            .in_("token", tokens)
+            .order("scanned_at", desc=True)
+            .execute()
+        )
     except Exception as e:
-        logger.warning("Impossible de récupérer l'utilisateur associé: %s", e)
-        result["users"] = None
+        logger.warning("Impossible de récupérer les validations (%s tokens): %s", len(tokens), e)
+        return {}
+    last: Dict[str, Dict[str, Any]] = {}
+    for row in res.data or []:
+        last.setdefault(row.get("token"), row)
+    return last
 
-    return result
+def _fetch_single(table: str, columns: str, row_id: Any) -> Optional[Dict[str, Any]]:
+    try:
+        res = get_service_supabase().table(table).select(columns).eq("id", row_id).single().execute()
+        return res.data or None
+    except Exception as e:
+        logger.warning("Impossible de récupérer %s id=%s: %s", table, row_id, e)
+        return None
 
 def get_last_validation(token: str) -> Optional[Dict[str, Any]]:
     """
@@ -85,7 +204,7 @@ def get_last_validation(token: str) -> Optional[Dict[str, Any]]:
         res = (
             get_service_supabase()
             .table("ticket_validations")
-            .select("id, token, commande_id, scanned_at, scanned_by, status")
+            .select(_VALIDATION_COLUMNS)
             .eq("token", token)
             .order("scanned_at", desc=True)
             .limit(1)
@@ -122,4 +241,87 @@ def insert_validation(token: str, commande_id: str, admin_id: str, status: str =
             code = e.args[0].get("code")
         if code == "23505":
             return None
-        return None
\ No newline at end of file
+        return None
+
+def insert_validations_bulk(rows: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Insère plusieurs validations en une requête (scan par lot sans garde Redis).
+    - Retour: lignes créées; None si le lot est refusé (doublon 23505 ou autre erreur),
+      l'appelant repasse alors ligne à ligne (insert_validation) pour isoler les doublons
+    """
+    if not rows:
+        return []
+    try:
+        res = get_service_supabase().table("ticket_validations").insert(rows).execute()
+        data = res.data
+        return data if isinstance(data, list) and data else list(rows)
+    except APIError as e:
+        if getattr(e, "code", None) != "23505":
+            logger.warning("Insertion en lot des validations refusée: %s", e)
+        return None
+    except Exception as e:
+        logger.exception("Insertion en lot des validations en échec: %s", e)
+        return None
+
+
+def is_permanent_error(e: Exception) -> bool:
+    """
+    Erreur définitive (la même écriture échouera encore): 4xx HTTP, SQLSTATE 22 (données),
+    23 (intégrité, ex. 23503 commande supprimée) ou 42 (requête invalide), codes PGRST hors PGRST0xx.
+    - Transport, 5xx, PGRST0xx (connexion) et codes inconnus: transitoire (nouvel essai)
+    """
+    if not isinstance(e, APIError):
+        return False
+    code = str(e.code or "")
+    if code.isdigit() and len(code) == 3:
+        return code.startswith("4")
+    if code.startswith("PGRST"):
+        return not code.startswith("PGRST0")
+    return code[:2] in ("22", "23", "42")
+
+class BulkWriteResult(NamedTuple):
+    """Issue d'une écriture en lot; dead et retry référencent les lignes par leur indice dans le lot."""
+    written: int
+    dead: List[Tuple[int, str]]  # (indice, erreur): rejet définitif
+    retry: List[int]             # erreur transitoire: à réessayer
+
+# --- Variantes async (pool HTTP partagé, pour les handlers async def) ---
+
+async def _insert_validation_row_async(row: Dict[str, Any]) -> None:
+    await get_async_service_supabase().table("ticket_validations").insert(row).execute()
+
+async def insert_validations_bulk_async(rows: List[Dict[str, Any]]) -> BulkWriteResult:
+    """
+    Insère plusieurs validations en une requête (writer différé de scan_guard).
+    - Erreur transport sur le lot: tout le lot est à réessayer
+    - Toute autre erreur du lot (APIError): repli ligne à ligne pour isoler les lignes fautives;
+      doublon 23505 = déjà écrite, erreur définitive (is_permanent_error) = dead, sinon retry
+    """
+    if not rows:
+        return BulkWriteResult(0, [], [])
+    try:
+        await get_async_service_supabase().table("ticket_validations").insert(rows).execute()
+        return BulkWriteResult(len(rows), [], [])
+    except APIError as e:
+        if getattr(e, "code", None) != "23505":
+            logger.warning("Insertion en lot des validations refusée, repli ligne à ligne: %s", e)
+    except Exception as e:
+        logger.exception("Insertion en lot des validations en échec: %s", e)
+        return BulkWriteResult(0, [], list(range(len(rows))))
+    written = 0
+    dead: List[Tuple[int, str]] = []
+    retry: List[int] = []
+    for index, row in enumerate(rows):
+        try:
+            await _insert_validation_row_async(row)
+            written += 1
+        except Exception as e:
+            if isinstance(e, APIError) and e.code == "23505":
+                written += 1
+            elif is_permanent_error(e):
+                logger.error("Validation rejetée définitivement token=%s: %s", row.get("token"), e)
+                dead.append((index, str(e)[:500]))
+            else:
+                logger.warning("Validation non écrite (nouvel essai) token=%s: %s", row.get("token"), e)
+                retry.append(index)
+    return BulkWriteResult(written, dead, retry)
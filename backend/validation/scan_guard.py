@@ -0,0 +1,248 @@
+"""
+Garde anti-double scan sur Redis + écriture différée des validations (ticket_validations).
+
+- claim(token, record): SET NX scan:validated:<token> — le premier scan gagne, les suivants lisent
+  l’enregistrement du gagnant (déjà validé) sans requête base
+- La validation gagnante est poussée sur scan:validations:pending puis écrite en lot par un writer
+  asyncio démarré par le lifespan (insert multi-lignes, SCAN_WRITE_BATCH_SIZE lignes max)
+- Lot en cours: scan:validations:processing:<instance>, sous bail (work_leases); seuls les lots des
+  instances dont le bail a expiré sont repris (doublons 23505 ignorés), jamais celui d’un writer vivant
+- Lignes rejetées définitivement (4xx, SQLSTATE 22/23/42): scan:validations:dead {raw, error, failed_at},
+  à examiner puis rejouer ou supprimer à la main; les erreurs transitoires sont réessayées
+- Redis non configuré/injoignable ou SCAN_GUARD_ENABLED=false: claim lève ScanGuardUnavailable et le
+  service applique le chemin base historique (insert + contrainte d’unicité)
+- Compatible fakeredis (USE_FAKE_REDIS_FOR_TESTS=1)
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import redis
+from fastapi import FastAPI
+
+from backend.config import SCAN_GUARD_ENABLED, SCAN_CLAIM_TTL, SCAN_WRITE_BATCH_SIZE, SCAN_WRITE_INTERVAL
+from backend.infra import redis_client, work_leases
+from backend.validation import repository
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "scan:validations:pending"
+PROCESSING_KEY = "scan:validations:processing"
+DEAD_KEY = "scan:validations:dead"
+
+# module backend.validation.scan_guard
+class ScanGuardUnavailable(Exception):
+    """Garde désactivée ou Redis injoignable: le service écrit la validation directement en base."""
+
+def _claim_key(token: str) -> str:
+    return f"scan:validated:{token}"
+
+def _client() -> Optional[redis.Redis]:
+    return redis_client.get_redis() if SCAN_GUARD_ENABLED else None
+
+def new_validation(token: str, commande_id: Any, admin_id: str, status: str = "validated") -> Dict[str, Any]:
+    """Ligne ticket_validations construite côté application (scanned_at = maintenant, UTC)."""
+    return {
+        "token": token,
+        "commande_id": commande_id,
+        "scanned_by": admin_id,
+        "status": status,
+        "scanned_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+def get_claim(token: str) -> Optional[Dict[str, Any]]:
+    """Enregistrement du scan gagnant pour ce token, None si absent ou Redis indisponible."""
+    client = _client()
+    if client is None:
+        return None
+    try:
+        raw = client.get(_claim_key(token))
+    except redis.RedisError as e:
+        logger.warning("scan_guard.get_claim indisponible: %s", e)
+        return None
+    return json.loads(raw) if raw else None
+
+def get_claims(tokens: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Version groupée de get_claim (un MGET): {token: enregistrement} pour les tokens déjà réservés."""
+    client = _client()
+    if client is None or not tokens:
+        return {}
+    try:
+        values = client.mget([_claim_key(t) for t in tokens])
+    except redis.RedisError as e:
+        logger.warning("scan_guard.get_claims indisponible: %s", e)
+        return {}
+    return {t: json.loads(raw) for t, raw in zip(tokens, values) if raw}
+
+def claim(token: str, record: Dict[str, Any], durable: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Réserve atomiquement le token (SET NX).
+    - Retour: None si ce scan gagne, l’enregistrement du scan gagnant existant sinon
+    - durable=True: la validation gagnante (record["validation"]) est mise en file d’écriture
+    - Lève ScanGuardUnavailable si la garde est désactivée ou Redis injoignable
+    """
+    client = _client()
+    if client is None:
+        raise ScanGuardUnavailable("scan_guard désactivé")
+    key = _claim_key(token)
+    try:
+        if client.set(key, json.dumps(record, default=str), nx=True, ex=SCAN_CLAIM_TTL):
+            if durable:
+                try:
+                    client.rpush(PENDING_KEY, json.dumps(record["validation"], default=str))
+                except redis.RedisError:
+                    # Écriture non planifiée: libérer pour que l’appelant écrive en base
+                    client.delete(key)
+                    raise
+            return None
+        raw = client.get(key)
+    except redis.RedisError as e:
+        raise ScanGuardUnavailable(str(e)) from e
+    return json.loads(raw) if raw else record
+
+def latest_validation(token: str, last: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Dernière validation connue: celle lue en base, sinon le scan gagnant pas encore écrit (Redis)."""
+    if last and last.get("status") == "validated":
+        return last
+    record = get_claim(token)
+    return (record or {}).get("validation") or last
+
+
+# --- Writer asynchrone (lifespan) ---
+
+async def _take_batch(client, size: int) -> List[str]:
+    pipe = client.pipeline(transaction=False)
+    for _ in range(size):
+        pipe.lmove(PENDING_KEY, work_leases.processing_key(PROCESSING_KEY), "LEFT", "RIGHT")
+    return [raw for raw in await pipe.execute() if raw is not None]
+
+def _dead_entry(raw: str, error: str) -> str:
+    return json.dumps({"raw": raw, "error": error, "failed_at": datetime.now(timezone.utc).isoformat()})
+
+async def flush_pending(client, size: int = SCAN_WRITE_BATCH_SIZE) -> int:
+    """
+    Écrit au plus `size` validations en attente en une requête.
+    - Lignes écrites (ou déjà présentes): retirées de processing
+    - Rejet définitif (ex. commande supprimée, 23503) ou JSON illisible: déplacées vers scan:validations:dead
+      (une ligne fautive ne bloque pas les suivantes)
+    - Erreur transitoire (transport, 5xx): lignes remises en tête de pending (nouvel essai au tour suivant)
+    - Retour: nombre de validations consommées
+    """
+    batch = await _take_batch(client, size)
+    if not batch:
+        return 0
+    raws: List[str] = []
+    rows = []
+    dead: List[str] = []
+    for raw in batch:
+        try:
+            rows.append(json.loads(raw))
+            raws.append(raw)
+        except Exception:
+            logger.error("scan_guard: validation illisible, dead-letter raw=%.200s", raw)
+            dead.append(_dead_entry(raw, "JSON illisible"))
+    result = await repository.insert_validations_bulk_async(rows)
+    dead.extend(_dead_entry(raws[i], error) for i, error in result.dead)
+    retry = [raws[i] for i in result.retry]
+    pipe = client.pipeline(transaction=True)
+    for raw in reversed(retry):
+        pipe.lpush(PENDING_KEY, raw)
+    if dead:
+        pipe.rpush(DEAD_KEY, *dead)
+    processing = work_leases.processing_key(PROCESSING_KEY)
+    for raw in batch:
+        pipe.lrem(processing, 1, raw)
+    await pipe.execute()
+    if retry:
+        raise RuntimeError(f"écriture des validations en échec ({len(retry)} à réessayer)")
+    return len(batch)
+
+async def recover_processing(client) -> int:
+    """
+    Remet en tête de pending les lots interrompus des instances sans bail (arrêt brutal).
+    Retour: nombre de validations reprises.
+    """
+    moved = await work_leases.recover_expired(client, PROCESSING_KEY, PENDING_KEY, "RIGHT", "LEFT")
+    if moved:
+        logger.warning("scan_guard: %s validation(s) reprises depuis processing", moved)
+    return moved
+
+async def _writer_loop() -> None:
+    """Vide la file d’écriture jusqu’à annulation; pause SCAN_WRITE_INTERVAL quand elle est vide."""
+    while True:
+        try:
+            client = redis_client.get_async_redis()
+            if client is None:
+                return
+            if await flush_pending(client) < SCAN_WRITE_BATCH_SIZE:
+                await asyncio.sleep(SCAN_WRITE_INTERVAL)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("scan_guard writer error")
+            await asyncio.sleep(1)
+
+async def start_writer(app: FastAPI) -> Optional[asyncio.Task]:
+    """
+    Démarre le writer si la garde est active et Redis configuré (app.state.scan_writer).
+    - Bail de l’instance pris avant toute reprise; work_leases.keep_alive (app.state.scan_lease) le
+      renouvelle et reprend périodiquement les lots des instances disparues
+    """
+    task = None
+    lease_task = None
+    client = redis_client.get_async_redis() if SCAN_GUARD_ENABLED else None
+    if client is not None:
+        try:
+            await work_leases.renew(client, PROCESSING_KEY)
+            await recover_processing(client)
+            task = asyncio.create_task(_writer_loop())
+            lease_task = asyncio.create_task(work_leases.keep_alive(PROCESSING_KEY, recover_processing))
+        except redis.RedisError as e:
+            logger.warning("scan_guard: writer non démarré (Redis indisponible): %s", e)
+    app.state.scan_writer = task
+    app.state.scan_lease = lease_task
+    return task
+
+async def stop_writer(app: FastAPI) -> None:
+    """
+    Arrête le writer après une dernière vidange (les validations restantes restent en Redis), puis rend
+    le bail: un lot interrompu est repris par une autre instance sans attendre son expiration.
+    """
+    task = getattr(app.state, "scan_writer", None)
+    if task is None:
+        return
+    lease_task = getattr(app.state, "scan_lease", None)
+    tasks = [task] + ([lease_task] if lease_task is not None else [])
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    app.state.scan_writer = None
+    app.state.scan_lease = None
+    client = redis_client.get_async_redis()
+    if client is not None:
+        try:
+            while await flush_pending(client):
+                pass
+        except Exception:
+            logger.exception("scan_guard: vidange finale incomplète")
+        try:
+            await work_leases.release(client, PROCESSING_KEY)
+        except redis.RedisError as e:
+            logger.warning("scan_guard: bail non rendu (il expirera): %s", e)
+
+async def writer_stats() -> Dict[str, Any]:
+    """Validations en attente d’écriture, lot en cours et lignes rejetées (dead)."""
+    client = redis_client.get_async_redis() if SCAN_GUARD_ENABLED else None
+    if client is None:
+        return {"enabled": False}
+    try:
+        return {
+            "enabled": True,
+            "pending": await client.llen(PENDING_KEY),
+            "processing": await work_leases.processing_count(client, PROCESSING_KEY),
+            "dead": await client.llen(DEAD_KEY),
+        }
+    except redis.RedisError as e:
+        return {"enabled": True, "error": str(e)}
@@ -3,105 +3,66 @@ Routes web pour l'interface Admin de scan/validation.
 - GET /admin/scan: page HTML avec caméra, saisie token, et état unifié du billet.
 - POST /admin/scan/validate: valide un billet et renvoie une réponse JSON.
 - Normalisation d’état (UI): Invalid | Scanned | Validated | AlreadyValidated | Error.
+- État et validation calculés en processus (validation.scan_state / validation.service):
+  aucun appel HTTP vers l’application elle-même.
 """
-from fastapi import APIRouter, Request, Form, Query
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
-import requests
-from urllib.parse import quote
-from backend.utils.csrf import get_csrf_token
-from backend.utils.jinja import templates
-from backend.validation.schemas import normalize_status_from_payload
-from backend.validation.services import validate_ticket_service
-from backend.validation.schemas import TicketStatus, TicketValidationRequest, TicketValidationResponse
+from fastapi import APIRouter, Depends, Request, Form, Query
+from fastapi.responses import HTMLResponse, JSONResponse
+from starlette.concurrency import run_in_threadpool
+from backend.admin.views import require_scanner
+from backend.utils.csrf import get_or_create_csrf_token, attach_csrf_cookie_if_missing, validate_csrf_token
+from backend.utils.templates import templates
+from backend.validation.scan_state import get_scan_state, normalize_status_from_payload
+from backend.validation.service import validate_ticket_token
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
-
-def normalize_status_from_payload(payload: dict):
-    """
-    Convertit la réponse API en statut UI unifié.
-    - Entrée: payload JSON renvoyé par l'API de validation
-    - Sorties: "Invalid" | "Scanned" | "Validated" | "AlreadyValidated"
-    - Logique:
-      - status == validated => Validated
-      - status == already_validated => AlreadyValidated
-      - ticket présent sans validation => Scanned
-      - sinon => Invalid
-    """
-    # Retourne l'un de: "Invalid" | "Scanned" | "Validated" | "AlreadyValidated"
-    if not payload:
-        return "Invalid"
-    status = payload.get("status")
-    ticket = payload.get("ticket")
-    validation = payload.get("validation")
-    if isinstance(status, str):
-        s = status.lower()
-        if s == "validated":
-            return "Validated"
-        if s == "already_validated":
-            return "AlreadyValidated"
-    if ticket and not validation:
-        return "Scanned"
-    if ticket and validation:
-        return "AlreadyValidated"
-    return "Invalid"
 
 @router.get("/admin/scan", response_class=HTMLResponse)
-async def get_admin_scan(request: Request, token: str | None = Query(default=None)):
+async def get_admin_scan(request: Request, token: str | None = Query(default=None), user: dict = Depends(require_scanner)):
     """
     Affiche la page de scan Admin.
-    - Si token est fourni, interroge l’API pour déterminer l’état du billet et prépare le contexte.
-    - Gère les erreurs réseau en affichant "Erreur de communication API.".
+    - Si token est fourni, calcule l’état du billet via scan_state.get_scan_state (threadpool).
+    - Gère les erreurs de lecture en affichant "Erreur de lecture du billet.".
     - Ajoute le jeton CSRF au contexte et désactive le cache.
     """
-    csrf_token_value = get_csrf_token(request)
+    csrf_token_value = get_or_create_csrf_token(request)
     context = {
-        "request": request, "csrf_token": csrf_token_value, "token": token or "",
-        "status": None, "message": None, "ticket": None,
+        "request": request, "user": user, "csrf_token": csrf_token_value, "token": token or "",
+        "status": None, "message": None, "ticket": None, "validation": None,
     }
 
     if token:
         try:
-            api_url = request.url_for("get_ticket_by_token_api", token=token)
-            r = requests.get(str(api_url), cookies=request.cookies, headers={"Accept": "application/json"}, timeout=5)
-            data = r.json() if r.status_code == 200 else {}
-            status = normalize_status_from_payload(data)
-            ticket = data.get("ticket")
-            message = data.get("message")
-
-            # Messages explicites selon le statut
-            if status == "Scanned":
-                message = "Prêt à valider"
-            elif status == "AlreadyValidated":
-                message = "Déjà validé"
-            elif status == "Invalid":
-                message = "Billet introuvable"
-
-            context.update({"ticket": ticket, "status": status, "message": message})
-        except requests.RequestException:
-            context.update({"status": "Error", "message": "Erreur de communication API."})
+            state = await run_in_threadpool(get_scan_state, token)
+            context.update(status=state["status"], message=state["message"], ticket=state["ticket"], validation=state["validation"])
+        except Exception:
+            context.update({"status": "Error", "message": "Erreur de lecture du billet."})
 
     resp = templates.TemplateResponse("admin-scan.html", context=context)
     resp.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
+    attach_csrf_cookie_if_missing(resp, request, csrf_token_value)
     return resp
 
 @router.post("/admin/scan/validate")
-async def post_admin_validate(request: Request, token: str = Form(...)):
+async def post_admin_validate(request: Request, token: str = Form(...), user: dict = Depends(require_scanner)):
     """
     Valide un billet côté Admin et renvoie une réponse JSON.
-    - Utilise validate_ticket_service(...).
+    - Sécurité: require_scanner + jeton CSRF du formulaire.
+    - Utilise validate_ticket_token(...) (threadpool).
     - Réponses:
       - 200: {"status": "validated", "message": "..."} si succès
-      - 400: {"status": "error", "message": "..."} si non validé
-      - 500: {"status": "error", "message": "Erreur interne du serveur: ..."} en cas d'exception
+      - 400: {"status": "error", "message": "...", "scan_status": ...} si non validé
+      - 403: CSRF invalide
+      - 500: {"status": "error", "message": "Erreur interne du serveur"} en cas d'exception
     """
+    if not validate_csrf_token(request, await request.form()):
+        return JSONResponse(status_code=403, content={"status": "error", "message": "CSRF invalide"})
     try:
-        validation_payload = TicketValidationRequest(token=token)
-        response_data = await validate_ticket_service(validation_payload)
-        if response_data.status == TicketStatus.VALIDATED:
+        status, data = await run_in_threadpool(validate_ticket_token, token, admin_id=user.get("id", ""), admin_token=user.get("token"))
+        if status == "validated":
             return JSONResponse(content={"status": "validated", "message": "Billet Validé avec succès !"})
-        else:
-            return JSONResponse(status_code=400, content={"status": "error", "message": response_data.message})
-    except Exception as e:
-        return JSONResponse(status_code=500, content={"status": "error", "message": f"Erreur interne du serveur: {e}"})
\ No newline at end of file
+        scan_status = normalize_status_from_payload({"status": status})
+        message = "Déjà validé" if scan_status == "AlreadyValidated" else (data.get("message") or "Billet introuvable")
+        return JSONResponse(status_code=400, content={"status": "error", "message": message, "scan_status": scan_status})
+    except Exception:
+        return JSONResponse(status_code=500, content={"status": "error", "message": "Erreur interne du serveur"})
@@ -0,0 +1,76 @@
+"""
+État d’un billet scanné, calculé en processus (aucun appel HTTP vers l’application elle-même).
+- Partagé par la page /admin/scan (admin.views, validation.scan_routes) et l’API
+  GET /api/v1/validation/ticket/{token} (validation.views)
+- Jeton signé vérifié sans I/O, puis une lecture embarquée (get_ticket_by_token); la dernière
+  validation tient compte des scans réservés dans Redis et pas encore écrits (scan_guard)
+- Statut UI unifié: Invalid | Scanned | Validated | AlreadyValidated (normalize_status_from_payload)
+"""
+from typing import Any, Dict, Optional
+
+from backend.utils.ticket_tokens import parse_scan_token, TicketTokenError
+from backend.validation import scan_guard
+from backend.validation.repository import get_ticket_by_token
+
+
+def normalize_status_from_payload(payload: Optional[Dict[str, Any]]) -> str:
+    """
+    Convertit un état de billet (ou une réponse de validation) en statut UI unifié.
+    - Sorties: "Invalid" | "Scanned" | "Validated" | "AlreadyValidated"
+    - Logique:
+      - status == validated => Validated
+      - status == already_validated => AlreadyValidated
+      - ticket présent sans validation => Scanned
+      - ticket présent avec validation => AlreadyValidated
+      - sinon => Invalid
+    """
+    if not payload:
+        return "Invalid"
+    status = payload.get("status")
+    ticket = payload.get("ticket")
+    validation = payload.get("validation")
+    if isinstance(status, str):
+        s = status.lower()
+        if s == "validated":
+            return "Validated"
+        if s == "already_validated":
+            return "AlreadyValidated"
+    if ticket and not validation:
+        return "Scanned"
+    if ticket and validation:
+        return "AlreadyValidated"
+    return "Invalid"
+
+
+def get_scan_state(token: Optional[str]) -> Dict[str, Any]:
+    """
+    État d’un billet à partir d’une clé scannée (signée, composite user_key.token ou token seul).
+    - Retour: {"status", "message", "reason", "ticket_token", "ticket", "validation"}
+      - status: statut UI (normalize_status_from_payload)
+      - reason: None | 'invalid_token' (jeton refusé, sans I/O) | 'ticket_not_found'
+      - message: renseigné uniquement pour les refus (le libellé du statut suffit sinon)
+    """
+    state: Dict[str, Any] = {
+        "status": "Invalid", "message": None, "reason": None,
+        "ticket_token": None, "ticket": None, "validation": None,
+    }
+    raw = (token or "").strip().strip('"').strip("'")
+    try:
+        ticket_token = parse_scan_token(raw).ticket_token if "." in raw else raw
+    except TicketTokenError as e:
+        state.update(message=e.message, reason="invalid_token")
+        return state
+    if not ticket_token:
+        state.update(message="Token invalide", reason="invalid_token")
+        return state
+
+    state["ticket_token"] = ticket_token
+    ticket = get_ticket_by_token(ticket_token)
+    if not ticket:
+        state.update(message="Billet introuvable", reason="ticket_not_found")
+        return state
+
+    last = scan_guard.latest_validation(ticket_token, ticket.pop("last_validation", None))
+    state.update(ticket=ticket, validation=last or None)
+    state["status"] = normalize_status_from_payload({"ticket": ticket, "validation": last})
+    return state
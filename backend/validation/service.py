@@ -1,5 +1,7 @@
-from backend.validation.repository import get_ticket_by_token, get_last_validation, insert_validation
-from typing import Tuple, Dict, Any, Optional
+from backend.validation.repository import get_ticket_by_token, get_tickets_by_tokens, insert_validation, insert_validations_bulk
+from backend.utils.ticket_tokens import parse_scan_token, ScannedToken, TicketTokenError
+from backend.validation import scan_guard
+from typing import Tuple, Dict, Any, List, Optional
 
 class ValidationError(Exception):
     """
@@ -13,63 +15,181 @@ class ValidationError(Exception):
 
 def validate_ticket_token(token: str, admin_id: str, admin_token: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
     """
-    Valide un billet à partir d'une clé scannée (composite).
-    - Format attendu: "<user_key>.<ticket_token>"
+    Valide un billet à partir d'une clé scannée.
+    - Formats acceptés (backend.utils.ticket_tokens):
+      - signé "t1.<payload>.<signature>" (ticket_token, offre_id, user_key)
+      - historique "<user_key>.<ticket_token>" (si TICKET_LEGACY_TOKENS)
     - Étapes:
-      1) Vérifie le format composite et nettoie guillemets/espaces
-      2) Récupère le ticket via raw_token (partie droite)
-      3) Vérifie la correspondance stricte user_key == users.bio
-      4) insert_validation(..., status='validated'): si None => déjà validé
-      5) get_last_validation: renvoie l’état le plus récent
+      1) Analyse et vérifie la signature sans I/O: un jeton forgé ou malformé est refusé ici
+      2) Récupère en une requête le ticket via ticket_token, son offre, l’utilisateur
+         et la dernière validation (get_ticket_by_token)
+      3) Vérifie la correspondance stricte user_key == users.bio (clé révoquée => refus)
+         et, pour un jeton signé, l'offre du billet
+      4) Dernière validation 'validated' => déjà validé, sans écriture
+      5) Réservation Redis SET NX (scan_guard): gagnant => 'validated', ligne écrite en lot
+         par le writer différé; conflit => déjà validé (enregistrement du gagnant)
+      6) Sans Redis: insert_validation(..., status='validated'); None => doublon concurrent
+    - Jeton signé déjà réservé: réponse depuis Redis, sans requête base
+    - Au plus une lecture base par scan avec Redis (lecture + insertion sans), aucune si jeton refusé
     - Statuts possibles:
-      - 'validated' | 'already_validated' | 'not_found' | 'invalid' | 'Scanned'
+      - 'validated' | 'already_validated' | 'not_found' | 'invalid'
     - Retour:
       - Tuple (status, payload) où payload contient: token, commande_id, offre, user, validation...
     """
-    provided_user_key: Optional[str] = None
-    raw = (token or "").strip().strip('"').strip("'")
+    try:
+        scanned = parse_scan_token(token)
+    except TicketTokenError as e:
+        return ("invalid", {"message": e.message, "reason": e.reason})
+    raw_token = scanned.ticket_token
 
-    # Exiger le token composite "user_key.token"
-    if "." not in raw:
-        return ("invalid", {"message": "Clé utilisateur requise", "reason": "user_key_required"})
+    # Jeton signé (authentique): un scan déjà réservé dans Redis répond sans requête base
+    if scanned.signed:
+        prior = scan_guard.get_claim(raw_token)
+        if prior is not None:
+            return ("already_validated", _claim_payload(raw_token, prior))
 
-    parts = raw.split(".", 1)
-    if len(parts) != 2 or not parts[0] or not parts[1]:
-        return ("invalid", {"message": "Format de clé invalide", "reason": "invalid_composite_token"})
+    ticket = get_ticket_by_token(raw_token)
+    rejected = _check_ticket(scanned, ticket)
+    if rejected:
+        return rejected
 
-    provided_user_key = parts[0].strip().strip('"').strip("'")
-    raw_token = parts[1].strip().strip('"').strip("'")
-    if not provided_user_key or not raw_token:
-        return ("invalid", {"message": "Format de clé invalide", "reason": "invalid_composite_token"})
+    outcome = _claim_scan(raw_token, ticket, admin_id)
+    if outcome:
+        return outcome
 
-    ticket = get_ticket_by_token(raw_token)
+    # Sans Redis: insertion directe, la contrainte d'unicité (23505) détecte le doublon
+    created = insert_validation(token=raw_token, commande_id=ticket["id"], admin_id=admin_id, status="validated", user_token=admin_token)
+    if created is None:
+        # Doublon (validé entre la lecture et l’insertion)
+        return ("already_validated", _ticket_payload(raw_token, ticket, ticket.get("last_validation") or None))
+    return ("validated", _ticket_payload(raw_token, ticket, created))
+
+def validate_ticket_tokens(tokens: List[str], admin_id: str, admin_token: Optional[str] = None) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Valide un lot de clés scannées (scanners qui rejouent une file hors connexion).
+    - Mêmes règles et statuts que validate_ticket_token, un résultat par clé, dans l'ordre reçu
+    - Regroupement des I/O:
+      - réservations Redis des jetons signés lues en un MGET
+      - billets lus par in_ sur token (get_tickets_by_tokens)
+      - sans Redis: validations insérées en une requête (repli ligne à ligne si doublon)
+    - Un même billet présent deux fois dans le lot: le second est 'already_validated'
+    """
+    results: List[Optional[Tuple[str, Dict[str, Any]]]] = [None] * len(tokens)
+    parsed: List[Tuple[int, ScannedToken]] = []
+    for i, token in enumerate(tokens):
+        try:
+            parsed.append((i, parse_scan_token(token)))
+        except TicketTokenError as e:
+            results[i] = ("invalid", {"message": e.message, "reason": e.reason})
+
+    claims = scan_guard.get_claims(list(dict.fromkeys(s.ticket_token for _, s in parsed if s.signed)))
+    tickets = get_tickets_by_tokens(list(dict.fromkeys(s.ticket_token for _, s in parsed if not (s.signed and s.ticket_token in claims))))
+
+    decided: Dict[str, Optional[Dict[str, Any]]] = {}
+    direct: List[Tuple[int, str, Dict[str, Any]]] = []
+    for i, scanned in parsed:
+        raw_token = scanned.ticket_token
+        if scanned.signed and raw_token in claims:
+            results[i] = ("already_validated", _claim_payload(raw_token, claims[raw_token]))
+            continue
+        ticket = tickets.get(raw_token)
+        rejected = _check_ticket(scanned, ticket)
+        if rejected:
+            results[i] = rejected
+            continue
+        if raw_token in decided:
+            results[i] = ("already_validated", _ticket_payload(raw_token, ticket, decided[raw_token]))
+            continue
+        outcome = _claim_scan(raw_token, ticket, admin_id)
+        if outcome is None:
+            direct.append((i, raw_token, ticket))
+            decided[raw_token] = None
+            continue
+        results[i] = outcome
+        decided[raw_token] = outcome[1]["validation"]
+
+    if direct:
+        _insert_direct(direct, results, admin_id, admin_token)
+    return [r for r in results if r is not None]
+
+def _insert_direct(direct: List[Tuple[int, str, Dict[str, Any]]], results: List[Any], admin_id: str, admin_token: Optional[str]) -> None:
+    """Sans garde Redis: insertion groupée, puis ligne à ligne si le lot est refusé (doublon concurrent)."""
+    rows = [{"token": rt, "commande_id": t["id"], "scanned_by": admin_id, "status": "validated"} for _, rt, t in direct]
+    created = insert_validations_bulk(rows)
+    if created is not None:
+        by_token = {r.get("token"): r for r in created}
+        for (i, rt, t), row in zip(direct, rows):
+            results[i] = ("validated", _ticket_payload(rt, t, by_token.get(rt) or row))
+        return
+    for i, rt, t in direct:
+        created_row = insert_validation(token=rt, commande_id=t["id"], admin_id=admin_id, status="validated", user_token=admin_token)
+        if created_row is None:
+            results[i] = ("already_validated", _ticket_payload(rt, t, t.get("last_validation") or None))
+        else:
+            results[i] = ("validated", _ticket_payload(rt, t, created_row))
+
+def _check_ticket(scanned: ScannedToken, ticket: Optional[Dict[str, Any]]) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Refus (not_found / invalid) d'un billet lu en base, None s'il peut être validé."""
     if not ticket:
         return ("not_found", {"message": "Billet introuvable", "reason": "ticket_not_found"})
 
     # Vérification stricte de la clé utilisateur (users.bio)
     stored_user_key = ((ticket.get("users") or {}).get("bio") or "").strip()
-    if not stored_user_key or stored_user_key != provided_user_key:
+    if not stored_user_key or stored_user_key != scanned.user_key:
         return ("invalid", {"message": "Clé utilisateur invalide", "reason": "user_key_mismatch"})
 
-    created = insert_validation(token=raw_token, commande_id=ticket["id"], admin_id=admin_id, status="validated", user_token=admin_token)
-    if created is None:
-        # Doublon (déjà validé)
-        last = get_last_validation(raw_token)
-        return ("already_validated", {
-            "token": raw_token,
-            "commande_id": ticket["id"],
-            "offre": ticket.get("offres"),
-            "user": ticket.get("users"),
-            "validation": last or None
-        })
-
-    last = get_last_validation(raw_token)
-    if last:
-        return ("validated", {
-            "token": raw_token,
-            "commande_id": ticket["id"],
-            "offre": ticket.get("offres"),
-            "user": ticket.get("users"),
-            "validation": last
-        })
-    return ("Scanned", {"token": raw_token})
\ No newline at end of file
+    if scanned.signed:
+        stored_offre_id = ticket.get("offre_id") or (ticket.get("offres") or {}).get("id")
+        if str(stored_offre_id or "") != scanned.offre_id:
+            return ("invalid", {"message": "Offre du billet invalide", "reason": "offre_mismatch"})
+    return None
+
+def _claim_scan(raw_token: str, ticket: Dict[str, Any], admin_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Décision pour un billet authentique: déjà validé en base, ou réservation Redis (SET NX).
+    - None: garde indisponible, l'appelant insère directement en base
+    """
+    last = ticket.get("last_validation")
+    if last and last.get("status") == "validated":
+        # Validation antérieure à la garde Redis: la mémoriser pour les scans suivants
+        _remember_claim(raw_token, _claim_record(ticket, last))
+        return ("already_validated", _ticket_payload(raw_token, ticket, last))
+
+    # Chemin rapide: réservation atomique Redis, écriture ticket_validations différée (en lot)
+    validation = scan_guard.new_validation(raw_token, ticket["id"], admin_id)
+    try:
+        prior = scan_guard.claim(raw_token, _claim_record(ticket, validation))
+    except scan_guard.ScanGuardUnavailable:
+        return None
+    if prior is not None:
+        return ("already_validated", _ticket_payload(raw_token, ticket, prior.get("validation")))
+    return ("validated", _ticket_payload(raw_token, ticket, validation))
+
+def _ticket_payload(raw_token: str, ticket: Dict[str, Any], validation: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "token": raw_token,
+        "commande_id": ticket["id"],
+        "offre": ticket.get("offres"),
+        "user": ticket.get("users"),
+        "validation": validation,
+    }
+
+def _claim_record(ticket: Dict[str, Any], validation: Dict[str, Any]) -> Dict[str, Any]:
+    """Enregistrement Redis d'un scan gagnant (sans la clé utilisateur users.bio)."""
+    user = {k: v for k, v in (ticket.get("users") or {}).items() if k != "bio"}
+    return {"commande_id": ticket["id"], "offre": ticket.get("offres"), "user": user or None, "validation": validation}
+
+def _remember_claim(raw_token: str, record: Dict[str, Any]) -> None:
+    try:
+        scan_guard.claim(raw_token, record, durable=False)
+    except scan_guard.ScanGuardUnavailable:
+        pass
+
+def _claim_payload(raw_token: str, record: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "token": raw_token,
+        "commande_id": record.get("commande_id"),
+        "offre": record.get("offre"),
+        "user": record.get("user"),
+        "validation": record.get("validation"),
+    }
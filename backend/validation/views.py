@@ -1,13 +1,17 @@
-from typing import Any, Dict
-from fastapi import APIRouter, Depends, HTTPException
-from backend.utils.security import require_user
-from backend.validation.service import validate_ticket_token
-from backend.validation.repository import get_ticket_by_token, get_last_validation
+from typing import Any, Dict, List, Tuple
+from urllib.parse import urlsplit
+import json
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+from backend.utils.security import require_user, token_from_connection, user_from_token
+from backend.validation.service import validate_ticket_token, validate_ticket_tokens
+from backend.config import SCAN_BATCH_MAX_TOKENS, CORS_ORIGINS
+from backend.validation import manifest
+from backend.validation.scan_state import get_scan_state
 from fastapi import Request, Query
 from typing import Optional
 from fastapi.responses import HTMLResponse
 from backend.utils.templates import templates
-from backend.validation.repository import get_ticket_by_token
 from backend.users.repository import get_user_by_id
 from backend.admin.service import get_offre_by_id
 
@@ -51,39 +55,158 @@ def scan_and_validate(payload: Dict[str, Any], user: dict = Depends(require_user
         raise HTTPException(status_code=404, detail=data.get("message") or "Billet introuvable")
     raise HTTPException(status_code=400, detail=data.get("message") or "Erreur de validation")
 
+@router.post("/scan/batch")
+def scan_and_validate_batch(payload: Dict[str, Any], user: dict = Depends(require_user)):
+    """
+    Scanner/Valider un lot de billets (API), ex. file de scans rejouée après une coupure réseau.
+    - Body: {"tokens": ["<token>", ...]} (SCAN_BATCH_MAX_TOKENS au plus)
+    - Une authentification et un contrôle de droits pour tout le lot; lectures et écritures groupées
+      (voir service.validate_ticket_tokens)
+    - Réponse: {"results": [{"index", "status", ...}], "counts": {status: n}}, dans l'ordre reçu
+      - status: "ok" | "already_validated" | "not_found" | "invalid" (+ message/reason si refus)
+    - Erreurs: 400 si tokens absent/vide ou non-liste, 413 si le lot dépasse la limite
+    """
+    ensure_can_scan(user)
+    tokens = (payload or {}).get("tokens")
+    if not isinstance(tokens, list) or not tokens:
+        raise HTTPException(status_code=400, detail="tokens manquants")
+    if len(tokens) > SCAN_BATCH_MAX_TOKENS:
+        raise HTTPException(status_code=413, detail=f"{SCAN_BATCH_MAX_TOKENS} tokens maximum par lot")
+
+    outcomes = validate_ticket_tokens([str(t or "") for t in tokens], admin_id=user.get("id", ""), admin_token=user.get("token"))
+    return _batch_response(outcomes)
+
+def _scan_result(status: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Résultat JSON d'un scan (statut 'validated' exposé en 'ok', comme POST /scan)."""
+    return {"status": "ok" if status == "validated" else status, **data}
+
+def _batch_response(outcomes: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    results = []
+    counts: Dict[str, int] = {}
+    for index, (status, data) in enumerate(outcomes):
+        result = _scan_result(status, data)
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+        results.append({"index": index, **result})
+    return {"results": results, "counts": counts}
+
+def _origin_allowed(websocket: WebSocket) -> bool:
+    """
+    Protection CSWSH: un navigateur envoie Origin et le cookie de session; seules la même origine
+    et les origines CORS explicites (hors "*") sont acceptées. Sans Origin (client natif): accepté.
+    """
+    origin = websocket.headers.get("origin")
+    if not origin:
+        return True
+    host = websocket.headers.get("host", "")
+    if urlsplit(origin).netloc == host:
+        return True
+    return origin.rstrip("/") in {o.rstrip("/") for o in CORS_ORIGINS if o != "*"}
+
+@router.websocket("/ws")
+async def scan_websocket(websocket: WebSocket):
+    """
+    Canal de scan persistant (WebSocket /api/v1/validation/ws) pour les terminaux de scan.
+    - Authentification et rôle (ensure_can_scan) vérifiés une fois à l'ouverture
+      (Bearer ou cookie de session, Origin contrôlée); refus: fermeture 4401 / 4403
+    - Messages reçus (JSON): {"token": "...", "id": <optionnel>} ou {"tokens": [...], "id": ...};
+      un texte non JSON est traité comme un token
+    - Réponses (JSON, même connexion): {"id", "status", ...} ou {"id", "results", "counts"}
+      (mêmes statuts que POST /scan et /scan/batch, sans exception HTTP)
+    - Expiration du token de session: message d'erreur puis fermeture 4401
+    """
+    token = token_from_connection(websocket)
+    if not _origin_allowed(websocket):
+        await websocket.close(code=4403)
+        return
+    try:
+        user = await run_in_threadpool(user_from_token, token)
+        ensure_can_scan(user)
+    except HTTPException as e:
+        await websocket.close(code=4403 if e.status_code == 403 else 4401)
+        return
+
+    await websocket.accept()
+    admin_id = user.get("id", "")
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                message = json.loads(raw)
+            except ValueError:
+                message = {"token": raw}
+            if not isinstance(message, dict):
+                message = {"token": message}
+            msg_id = message.get("id")
+
+            try:
+                # Token de session: recontrôle via le cache d'authentification (exp respecté)
+                await run_in_threadpool(user_from_token, token)
+            except HTTPException:
+                await websocket.send_json({"id": msg_id, "status": "error", "detail": "Session expirée"})
+                await websocket.close(code=4401)
+                return
+
+            tokens = message.get("tokens")
+            if isinstance(tokens, list):
+                if not tokens or len(tokens) > SCAN_BATCH_MAX_TOKENS:
+                    await websocket.send_json({"id": msg_id, "status": "error", "detail": f"1 à {SCAN_BATCH_MAX_TOKENS} tokens par lot"})
+                    continue
+                outcomes = await run_in_threadpool(validate_ticket_tokens, [str(t or "") for t in tokens], admin_id=admin_id, admin_token=token)
+                await websocket.send_json({"id": msg_id, **_batch_response(outcomes)})
+                continue
+
+            scan_token = message.get("token")
+            if not scan_token or not isinstance(scan_token, str):
+                await websocket.send_json({"id": msg_id, "status": "error", "detail": "token manquant"})
+                continue
+            status, data = await run_in_threadpool(validate_ticket_token, scan_token, admin_id=admin_id, admin_token=token)
+            await websocket.send_json({"id": msg_id, **_scan_result(status, data)})
+    except WebSocketDisconnect:
+        return
+
+@router.get("/manifest")
+def get_manifest(offre_id: str = Query(..., min_length=1), since: Optional[int] = Query(None, ge=0), user: dict = Depends(require_user)):
+    """
+    Manifeste hors ligne des billets d'une offre (scanners à connectivité faible).
+    - Autorisation: ensure_can_scan
+    - since absent: manifeste complet; since=<version>: delta des billets créés depuis (voir manifest.render)
+    - Retour: {"offre_id", "version", "since", "full", "hash": {...}, "count", "hashes": "<base64>", "total", "digest"}
+    - Après fusion d'un delta, écart avec (total, digest) => billets supprimés: recharger le manifeste complet
+    - Erreurs: 503 si le manifeste ne peut pas être chargé
+    """
+    ensure_can_scan(user)
+    snapshot = manifest.get_snapshot(offre_id)
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="Manifeste indisponible")
+    return manifest.render(snapshot, since)
+
 @router.get("/ticket/{token}")
 def get_ticket_status(token: str, user: dict = Depends(require_user)):
     """
     Consultation de l'état d'un billet pour l'administration (API).
     - Autorisation: ensure_can_scan
-    - Normalisation token: si "user_key.token", on conserve la partie droite "token"
+    - État via validation.scan_state.get_scan_state (jeton signé ou "user_key.token", signature vérifiée sans I/O)
     - Retour:
-      - {"ticket": {...}, "validation": {...}|None, "status": "validated"|"not_validated"|...}
+      - {"ticket": {...}, "validation": {...}|None, "status": "validated"|"not_validated"|...,
+         "scan_status": "Scanned"|"AlreadyValidated"} (statut UI unifié)
     - Erreurs:
       - 400 si token invalide
       - 404 si billet introuvable
     """
     ensure_can_scan(user)
-    # Nettoyer guillemets/espaces et n'utiliser que l'UUID (partie droite après le point)
-    raw = (token or "").strip().strip('"').strip("'")
-    if "." in raw:
-        _, rhs = raw.split(".", 1)
-        raw_token = rhs.strip().strip('"').strip("'")
-    else:
-        raw_token = raw
-
-    if not raw_token:
-        raise HTTPException(status_code=400, detail="Token invalide")
-
-    ticket = get_ticket_by_token(raw_token)
-    if not ticket:
+    # État calculé en processus (service partagé avec la page /admin/scan)
+    state = get_scan_state(token)
+    if state["reason"] == "invalid_token":
+        raise HTTPException(status_code=400, detail=state["message"] or "Token invalide")
+    if state["reason"] == "ticket_not_found":
         raise HTTPException(status_code=404, detail="Billet introuvable")
 
-    last = get_last_validation(raw_token)
+    last = state["validation"]
     return {
-        "ticket": ticket,
-        "validation": last or None,
+        "ticket": state["ticket"],
+        "validation": last,
         "status": (last or {}).get("status") or "not_validated",
+        "scan_status": state["status"],
     }
 
 # --- Web router public pour /validate (migré depuis backend/views/validate.py) ---
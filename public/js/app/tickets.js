@@ -20,17 +20,27 @@ class TicketsManager {
             this.confirmIfReturnedFromStripe().finally(() => this.loadTickets());
         };
         /**
-         * Charge la liste des billets utilisateur depuis l’API puis les rend.
-         * Enchaîne un fetch des QR codes pour chaque billet affiché.
+         * Charge la liste des billets utilisateur depuis l’API (toutes les pages) puis les rend.
+         * QR codes inclus dans la réponse (include_qr=1); fetch unitaire pour ceux non rendus.
          */
         this.loadTickets = () => __awaiter(this, void 0, void 0, function* () {
             try {
                 const HttpAny = window.Http;
-                const tickets = HttpAny
-                    ? yield HttpAny.getJson("/api/v1/tickets/")
-                    : yield (yield fetch("/api/v1/tickets/", { credentials: "same-origin" })).json();
+                // Pages successives: curseur de la page suivante dans l'en-tête X-Next-Cursor
+                const tickets = [];
+                let cursor = null;
+                do {
+                    const url = "/api/v1/tickets/?include_qr=1" + (cursor ? "&cursor=" + encodeURIComponent(cursor) : "");
+                    const res = HttpAny
+                        ? yield HttpAny.request(url)
+                        : yield fetch(url, { credentials: "same-origin" });
+                    if (!res.ok)
+                        throw new Error(`HTTP ${res.status}`);
+                    tickets.push(...(yield res.json()));
+                    cursor = res.headers.get("X-Next-Cursor");
+                } while (cursor);
                 this.renderTickets(tickets);
-                // Nouveau: télécharger les QR codes pour chaque billet
+                // QR manquants (budget de rendu dépassé): fetch unitaire
                 this.fetchQRCodes(tickets).catch(() => { });
             }
             catch (error) {
@@ -123,14 +133,14 @@ class TicketsManager {
         });
     }
     /**
-     * Récupère et injecte les QR codes des billets déjà rendus dans le DOM.
+     * Récupère et injecte les QR codes absents de la liste (billets déjà rendus dans le DOM).
      */
     fetchQRCodes(tickets) {
         return __awaiter(this, void 0, void 0, function* () {
             const HttpAny = window.Http;
             for (const t of tickets) {
                 const token = t.token;
-                if (!token)
+                if (!token || t.qr_code)
                     continue;
                 try {
                     const res = HttpAny
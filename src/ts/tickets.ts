@@ -63,17 +63,26 @@ class TicketsManager {
   }
   
   /**
-   * Charge la liste des billets utilisateur depuis l’API puis les rend.
-   * Enchaîne un fetch des QR codes pour chaque billet affiché.
+   * Charge la liste des billets utilisateur depuis l’API (toutes les pages) puis les rend.
+   * QR codes inclus dans la réponse (include_qr=1); fetch unitaire pour ceux non rendus.
    */
   private loadTickets = async (): Promise<void> => {
     try {
       const HttpAny = (window as any).Http;
-      const tickets: Ticket[] = HttpAny
-        ? await HttpAny.getJson("/api/v1/tickets/")
-        : await (await fetch("/api/v1/tickets/", { credentials: "same-origin" })).json();
+      // Pages successives: curseur de la page suivante dans l'en-tête X-Next-Cursor
+      const tickets: Ticket[] = [];
+      let cursor: string | null = null;
+      do {
+        const url = "/api/v1/tickets/?include_qr=1" + (cursor ? "&cursor=" + encodeURIComponent(cursor) : "");
+        const res: Response = HttpAny
+          ? await HttpAny.request(url)
+          : await fetch(url, { credentials: "same-origin" });
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        tickets.push(...((await res.json()) as Ticket[]));
+        cursor = res.headers.get("X-Next-Cursor");
+      } while (cursor);
       this.renderTickets(tickets);
-      // Nouveau: télécharger les QR codes pour chaque billet
+      // QR manquants (budget de rendu dépassé): fetch unitaire
       this.fetchQRCodes(tickets).catch(() => {});
     } catch (error) {
       console.error('Erreur:', error);
@@ -118,13 +127,13 @@ class TicketsManager {
   }
   
   /**
-   * Récupère et injecte les QR codes des billets déjà rendus dans le DOM.
+   * Récupère et injecte les QR codes absents de la liste (billets déjà rendus dans le DOM).
    */
   private async fetchQRCodes(tickets: Ticket[]): Promise<void> {
     const HttpAny = (window as any).Http;
     for (const t of tickets) {
       const token = t.token;
-      if (!token) continue;
+      if (!token || t.qr_code) continue;
       try {
         const res = HttpAny
           ? await HttpAny.getJson(`/api/v1/tickets/${encodeURIComponent(token)}/qrcode`)
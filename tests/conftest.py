@@ -1,8 +1,12 @@
+import os
 import pytest
 from typing import Generator, Dict, Any
 from fastapi.testclient import TestClient
 from unittest.mock import MagicMock, AsyncMock
 
+# Pas de démarrage du pool de rendu QR à chaque lifespan de TestClient
+os.environ.setdefault("QR_POOL_WARMUP", "0")
+
 from backend.app import app as fastapi_app
 from backend.utils.security import require_user
 from backend.utils.security import require_admin
@@ -86,28 +90,58 @@ def _mock_payments_and_stripe(monkeypatch):
     def _fake_get_offers_map(ids):
         return {str(k): {"title": f"offre-{k}", "price": 10} for k in ids}
 
+    async def _fake_get_offers_map_async(ids):
+        return _fake_get_offers_map(ids)
+
     # Générer des line_items sans dépendre d’objets réels
     def _fake_to_line_items(offers_by_id, quantities):
         return [{"price_data": {"currency": "eur", "unit_amount": 1000}, "quantity": int(q)} for _, q in (quantities or {}).items()]
 
     # Ne pas écrire en base lors du webhook
-    def _fake_process_cart_purchase(user_id, cart_list, use_service=True):
+    def _fake_process_cart_purchase(user_id, cart_list, use_service=True, **kwargs):
         return 1
 
     # Patch des nouvelles cibles
     monkeypatch.setattr("backend.payments.stripe_client.create_session", _fake_create_session, raising=True)
     monkeypatch.setattr("backend.payments.stripe_client.parse_event", _fake_parse_event, raising=True)
     monkeypatch.setattr("backend.payments.repository.get_offers_map", _fake_get_offers_map, raising=True)
+    monkeypatch.setattr("backend.payments.repository.get_offers_map_async", _fake_get_offers_map_async, raising=True)
     monkeypatch.setattr("backend.payments.cart.to_line_items", _fake_to_line_items, raising=True)
     monkeypatch.setattr("backend.payments.service.process_cart_purchase", _fake_process_cart_purchase, raising=True)
 
 
+@pytest.fixture
+def commandes_bulk(monkeypatch):
+    """Remplace payments.repository.insert_commandes_bulk: enregistre les lignes envoyées, toutes créées."""
+    from backend.payments.repository import BulkInsertResult
+    calls: Dict[str, Any] = {"rows": [], "batches": 0}
+
+    def _fake_insert_commandes_bulk(rows, *, user_token=None, use_service=False, chunk_size=None):
+        calls["rows"].extend(rows)
+        calls["batches"] += 1
+        return BulkInsertResult(list(rows), [])
+
+    monkeypatch.setattr("backend.payments.repository.insert_commandes_bulk", _fake_insert_commandes_bulk)
+    return calls
+
+
 # Mock database dependency for all tests
 @pytest.fixture(scope="function", autouse=True)
 def mock_db_dependency(monkeypatch):
     """
     Mocks database access for all tests by patching functions in les nouveaux modules.
     """
+    # Catalogue des offres vide au début de chaque test (cache mémoire partagé)
+    from backend.offres import catalog as offres_catalog
+    offres_catalog.invalidate()
+    from backend.evenements import public_listing
+    public_listing.invalidate()
+    from backend.infra import table_counters
+    table_counters.invalidate()
+    from backend.tickets import repository as tickets_repository
+    tickets_repository.invalidate_user_tickets_count()
+    from backend.payments.repository import BulkInsertResult
+
     # Patch les accès à Supabase
     monkeypatch.setattr("backend.infra.supabase_client.get_supabase", lambda: MagicMock())
     monkeypatch.setattr("backend.infra.supabase_client.get_service_supabase", lambda: MagicMock())
@@ -128,6 +162,7 @@ def mock_db_dependency(monkeypatch):
     monkeypatch.setattr("backend.payments.repository.insert_commande", lambda **kwargs: {"status": "ok"})
     monkeypatch.setattr("backend.payments.repository.insert_commande_with_token", lambda **kwargs: {"status": "ok"})
     monkeypatch.setattr("backend.payments.repository.insert_commande_service", lambda **kwargs: {"status": "ok"})
+    monkeypatch.setattr("backend.payments.repository.insert_commandes_bulk", lambda rows, **kwargs: BulkInsertResult(list(rows), []))
     monkeypatch.setattr("backend.payments.repository.fetch_offres_by_ids", lambda ids: [])
 
    
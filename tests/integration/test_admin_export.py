@@ -0,0 +1,43 @@
+import json
+
+from backend.admin import views as admin_views
+
+
+def _pages_of(rows):
+    calls = []
+    def fetch_page(after, limit):
+        calls.append((after, limit))
+        remaining = [r for r in rows if after is None or (r["created_at"], r["id"]) > after]
+        return remaining[:limit]
+    return fetch_page, calls
+
+
+def test_export_commandes_csv_streams_all_pages(authenticated_admin_client, monkeypatch):
+    rows = [{"id": f"c{i:03d}", "token": f"t{i}", "user_id": "u1", "offre_id": "o1", "price_paid": "10", "created_at": f"2024-01-01T00:00:{i:02d}"} for i in range(25)]
+    fetch_page, calls = _pages_of(rows)
+    monkeypatch.setattr("backend.admin.repository.fetch_commandes_page", fetch_page)
+    monkeypatch.setattr(admin_views, "EXPORT_PAGE_SIZE", 10)
+
+    r = authenticated_admin_client.get("/admin/api/commandes/export")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    assert "attachment" in r.headers["content-disposition"]
+    lines = r.text.splitlines()
+    assert lines[0] == "id,token,user_id,offre_id,price_paid,created_at"
+    assert len(lines) == 26
+    assert [after for after, _ in calls] == [None, ("2024-01-01T00:00:09", "c009"), ("2024-01-01T00:00:19", "c019")]
+
+
+def test_export_users_ndjson(authenticated_admin_client, monkeypatch):
+    rows = [{"id": "u1", "email": "a@b", "full_name": "A", "created_at": "2024-01-01"}]
+    fetch_page, _ = _pages_of(rows)
+    monkeypatch.setattr("backend.admin.repository.fetch_users_page", fetch_page)
+
+    r = authenticated_admin_client.get("/admin/api/users/export?format=ndjson")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in r.text.splitlines()] == rows
+
+
+def test_export_rejects_unknown_format(authenticated_admin_client):
+    assert authenticated_admin_client.get("/admin/api/users/export?format=xlsx").status_code == 422
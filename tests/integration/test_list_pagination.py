@@ -0,0 +1,69 @@
+from unittest.mock import MagicMock
+
+from postgrest.exceptions import APIError
+
+from backend.tickets import views as tickets_views
+from backend.utils.pagination import Page, encode_cursor
+
+
+def test_tickets_next_cursor_header(client, monkeypatch):
+    calls = []
+    def fake_page(uid, after, limit):
+        calls.append((after, limit))
+        return Page([{"token": "t1"}], encode_cursor(("2024-01-01", "c1")) if after is None else None)
+    monkeypatch.setattr(tickets_views, "get_user_tickets_page", fake_page)
+
+    r = client.get("/api/v1/tickets/?limit=1")
+    assert r.status_code == 200 and r.json() == [{"token": "t1"}]
+    cursor = r.headers["x-next-cursor"]
+    r2 = client.get(f"/api/v1/tickets/?limit=1&cursor={cursor}")
+    assert "x-next-cursor" not in r2.headers
+    assert calls == [(None, 1), (("2024-01-01", "c1"), 1)]
+
+
+def test_tickets_invalid_cursor(client):
+    assert client.get("/api/v1/tickets/?cursor=%25%25").status_code == 400
+
+
+def test_admin_lists_return_next_cursor(authenticated_admin_client, monkeypatch):
+    seen = {}
+    def fake_page(after, limit):
+        seen["args"] = (after, limit)
+        return Page([{"id": "c1"}], "next")
+    monkeypatch.setattr("backend.admin.repository.fetch_admin_commandes_page", fake_page)
+
+    r = authenticated_admin_client.get("/admin/api/commandes?limit=100000")
+    assert r.json() == {"items": [{"id": "c1"}], "next_cursor": "next"}
+    # Taille de page bornée
+    from backend.utils.pagination import PAGE_SIZE_MAX
+    assert seen["args"] == (None, PAGE_SIZE_MAX)
+
+
+def test_admin_offres_paginated_from_catalog(authenticated_admin_client, monkeypatch):
+    offres = [{"id": f"o{i}", "price": p} for i, p in enumerate([30, 10, 20])]
+    monkeypatch.setattr("backend.offres.catalog.list_offres", lambda: offres)
+
+    first = authenticated_admin_client.get("/admin/api/offres?limit=2").json()
+    assert [o["id"] for o in first["items"]] == ["o1", "o2"]
+    second = authenticated_admin_client.get(f"/admin/api/offres?limit=2&cursor={first['next_cursor']}").json()
+    assert [o["id"] for o in second["items"]] == ["o0"] and second["next_cursor"] is None
+
+
+def test_user_orders_paginated(client, monkeypatch):
+    monkeypatch.setattr("backend.users.views.get_user_orders_page", lambda uid, after, limit: Page([{"id": "c1", "uid": uid}], None))
+    assert client.get("/api/v1/users/orders").json() == {"items": [{"id": "c1", "uid": "test-user"}], "next_cursor": None}
+
+
+def test_cursor_of_wrong_type_is_rejected(authenticated_admin_client, monkeypatch):
+    monkeypatch.setattr("backend.offres.catalog.list_offres", lambda: [{"id": "o1", "price": 10}])
+    r = authenticated_admin_client.get(f"/admin/api/offres?cursor={encode_cursor(('x', 1))}")
+    assert r.status_code == 400
+
+
+def test_cursor_value_refused_by_postgrest_is_rejected(authenticated_admin_client, monkeypatch):
+    client = MagicMock()
+    query = client.table.return_value.select.return_value.or_.return_value.order.return_value.order.return_value
+    query.limit.return_value.execute.side_effect = APIError({"code": "22007", "message": "invalid input syntax for type timestamp"})
+    monkeypatch.setattr("backend.admin.repository.get_service_supabase", lambda: client)
+    r = authenticated_admin_client.get(f"/admin/api/users?cursor={encode_cursor(('not-a-date', 'u1'))}")
+    assert r.status_code == 400
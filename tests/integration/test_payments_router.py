@@ -1,6 +1,6 @@
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from backend.app import app  # Importer l'application FastAPI
 from backend.utils.security import require_user
 from backend.auth.models import AuthResponse
@@ -48,7 +48,7 @@ def test_create_checkout_session_authenticated(app, client: TestClient, authenti
 
     # Patch côté microservice payments (plus backend.models)
     from unittest.mock import patch
-    with patch('backend.payments.repository.get_offers_map', return_value={"offre-1": {"id": "offre-1", "price_id": "price_123"}}):
+    with patch('backend.payments.repository.get_offers_map_async', new=AsyncMock(return_value={"offre-1": {"id": "offre-1", "price_id": "price_123"}})):
         response = client.post("/api/v1/payments/checkout", json={"items": [{"id": "offre-1", "quantity": 1}]})
 
     assert response.status_code == 200
@@ -1,6 +1,9 @@
 import json
 
-def test_process_cart_purchase_inserts(monkeypatch):
+# Panier de test: 2 billets offre 1 (10.00) + 1 billet offre 2 (5.50)
+EXPECTED_ROWS = [("user-123", "1", "10.00"), ("user-123", "1", "10.00"), ("user-123", "2", "5.50")]
+
+def test_process_cart_purchase_inserts(monkeypatch, commandes_bulk):
     # Ancien: from backend.models import payments as cart_utils
     import backend.payments as cart_utils
 
@@ -17,24 +20,16 @@ def test_process_cart_purchase_inserts(monkeypatch):
             "2": {"id": "2", "title": "Offre B", "price": 5.5},
         }
 
-    calls = {"count": 0}
-    def fake_insert_commande(user_id, offre_id, token, price_paid):
-        assert user_id == "user-123"
-        assert offre_id in ("1", "2")
-        assert isinstance(token, str) and len(token) > 0
-        assert price_paid in ("10.00", "5.50")
-        calls["count"] += 1
-        return True
-
     # Patch sur les bons symboles utilisés par le service Payments
     monkeypatch.setattr("backend.payments.service.get_offers_map", fake_get_offers_map)
-    monkeypatch.setattr("backend.payments.repository.insert_commande", fake_insert_commande)
 
     created = cart_utils.process_cart_purchase("user-123", cart)
     assert created == 3
-    assert calls["count"] == 3
+    assert commandes_bulk["batches"] == 1
+    assert sorted((r["user_id"], r["offre_id"], r["price_paid"]) for r in commandes_bulk["rows"]) == EXPECTED_ROWS
+    assert all(r["token"] for r in commandes_bulk["rows"])
 
-def test_process_checkout_completed_inserts(monkeypatch):
+def test_process_checkout_completed_inserts(monkeypatch, commandes_bulk):
     import backend.payments as payments_mod
 
     event = {
@@ -59,20 +54,12 @@ def test_process_checkout_completed_inserts(monkeypatch):
             "2": {"id": "2", "title": "Offre B", "price": 5.5},
         }
 
-    calls = {"count": 0}
-    def fake_insert_commande(user_id, offre_id, token, price_paid):
-        assert user_id == "user-123"
-        assert offre_id in ("1", "2")
-        assert isinstance(token, str) and len(token) > 0
-        assert price_paid in ("10.00", "5.50")
-        calls["count"] += 1
-        return True
-
     # Patch sur les symboles réellement utilisés par le service
     monkeypatch.setattr("backend.payments.service.get_offers_map", fake_get_offers_map)
-    monkeypatch.setattr("backend.payments.repository.insert_commande", fake_insert_commande)
 
     user_id, cart = payments_mod.extract_metadata(event)
     created = payments_mod.process_cart_purchase(user_id, cart)
     assert created == 3
-    assert calls["count"] == 3
\ No newline at end of file
+    assert commandes_bulk["batches"] == 1
+    assert sorted((r["user_id"], r["offre_id"], r["price_paid"]) for r in commandes_bulk["rows"]) == EXPECTED_ROWS
+    assert all(r["token"] for r in commandes_bulk["rows"])
\ No newline at end of file
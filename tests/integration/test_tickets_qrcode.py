@@ -0,0 +1,69 @@
+import pytest
+
+from backend.tickets import views
+from backend.utils import qrcode_utils
+from backend.utils.pagination import Page
+
+
+@pytest.fixture
+def owned_ticket(monkeypatch):
+    monkeypatch.setattr(views, "get_user_tickets_page", lambda uid, after, limit: Page([{"token": "tok-1", "offre_id": "offre-1"}], None))
+    monkeypatch.setattr(views, "get_user_ticket", lambda uid, token: {"token": token, "offre_id": "offre-1"} if token == "tok-1" else None)
+    monkeypatch.setattr("backend.users.repository.get_user_by_id", lambda uid: {"id": uid, "bio": "ukey"})
+
+
+@pytest.fixture
+def inline_render(monkeypatch):
+    monkeypatch.setattr(qrcode_utils, "QR_RENDER_WORKERS", 0)
+
+
+def test_list_tickets_without_qr_by_default(client, owned_ticket):
+    r = client.get("/api/v1/tickets/")
+    assert r.status_code == 200
+    assert "qr_code" not in r.json()[0]
+
+
+def test_list_tickets_include_qr_reads_user_key_once(client, monkeypatch, inline_render):
+    tickets = [{"token": f"tok-{i}", "offre_id": "offre-1"} for i in range(20)] + [{"token": None}]
+    monkeypatch.setattr(views, "get_user_tickets_page", lambda uid, after, limit: Page([dict(t) for t in tickets], None))
+    monkeypatch.setattr(views, "get_user_ticket", lambda uid, token: next(dict(t) for t in tickets if t["token"] == token))
+    lookups = []
+    monkeypatch.setattr("backend.users.repository.get_user_by_id", lambda uid: lookups.append(uid) or {"bio": "ukey"})
+
+    r = client.get("/api/v1/tickets/?include_qr=1")
+    assert r.status_code == 200
+    body = r.json()
+    assert len(lookups) == 1
+    assert all(t["qr_code"].startswith("data:image/png;base64,") for t in body[:20])
+    assert body[20]["qr_code"] is None
+    single = client.get("/api/v1/tickets/tok-3/qrcode").json()["qr_code"]
+    assert body[3]["qr_code"] == single
+
+
+def test_list_tickets_include_qr_without_user_key(client, monkeypatch, owned_ticket):
+    monkeypatch.setattr("backend.users.repository.get_user_by_id", lambda uid: {"bio": ""})
+    r = client.get("/api/v1/tickets/?include_qr=1")
+    assert r.status_code == 200
+    assert r.json()[0]["qr_code"] is None
+
+
+def test_qrcode_json_variant(client, owned_ticket):
+    r = client.get("/api/v1/tickets/tok-1/qrcode")
+    assert r.status_code == 200
+    assert r.json()["qr_code"].startswith("data:image/png;base64,")
+
+
+@pytest.mark.parametrize("fmt, media_type", [("png", "image/png"), ("svg", "image/svg+xml")])
+def test_qrcode_image_variant(client, owned_ticket, fmt, media_type):
+    r = client.get(f"/api/v1/tickets/tok-1/qrcode.{fmt}")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith(media_type)
+    assert "immutable" in r.headers["cache-control"] and "private" in r.headers["cache-control"]
+
+    cached = client.get(f"/api/v1/tickets/tok-1/qrcode.{fmt}", headers={"If-None-Match": r.headers["etag"]})
+    assert cached.status_code == 304 and cached.content == b""
+
+
+def test_qrcode_image_unknown_format_or_ticket(client, owned_ticket):
+    assert client.get("/api/v1/tickets/tok-1/qrcode.gif").status_code == 404
+    assert client.get("/api/v1/tickets/other/qrcode.png").status_code == 404
@@ -0,0 +1,84 @@
+import pytest
+
+from backend.utils.security import require_user
+from backend.validation import scan_guard
+from backend.validation import service as svc
+
+
+def _ticket(token, ticket_id, last_validation=None):
+    return {
+        "id": ticket_id,
+        "token": token,
+        "offre_id": "offre-1",
+        "offres": {"id": "offre-1", "title": "Solo"},
+        "users": {"id": "user-1", "bio": "ukey"},
+        "last_validation": last_validation,
+    }
+
+
+@pytest.fixture
+def scanner(app):
+    app.dependency_overrides[require_user] = lambda: {"id": "scanner-1", "role": "scanner", "token": "scan-token"}
+    yield
+    app.dependency_overrides.pop(require_user, None)
+
+
+@pytest.fixture
+def tickets(monkeypatch):
+    monkeypatch.setattr(scan_guard, "SCAN_GUARD_ENABLED", False)
+    lookups = []
+    known = {
+        "tok-1": _ticket("tok-1", "c1"),
+        "tok-2": _ticket("tok-2", "c2", last_validation={"status": "validated", "id": "v0"}),
+    }
+    def _lookup(tokens):
+        lookups.append(list(tokens))
+        return {t: known[t] for t in tokens if t in known}
+    monkeypatch.setattr(svc, "get_tickets_by_tokens", _lookup)
+    return lookups
+
+
+def test_batch_scan_returns_status_per_token(client, scanner, tickets, monkeypatch):
+    inserted = []
+    def _bulk(rows):
+        inserted.append(rows)
+        return [{"id": f"v-{r['token']}", **r} for r in rows]
+    monkeypatch.setattr(svc, "insert_validations_bulk", _bulk)
+    monkeypatch.setattr(svc, "insert_validation", lambda **kw: pytest.fail("insertion ligne à ligne"))
+
+    tokens = ["ukey.tok-1", "ukey.tok-2", "ukey.tok-3", "no_composite", "other.tok-1", "ukey.tok-1"]
+    r = client.post("/api/v1/validation/scan/batch", json={"tokens": tokens})
+
+    assert r.status_code == 200
+    body = r.json()
+    assert [res["status"] for res in body["results"]] == [
+        "ok", "already_validated", "not_found", "invalid", "invalid", "already_validated",
+    ]
+    assert body["results"][0]["validation"]["id"] == "v-tok-1"
+    assert body["results"][4]["reason"] == "user_key_mismatch"
+    assert body["counts"] == {"ok": 1, "already_validated": 2, "not_found": 1, "invalid": 2}
+    # Une lecture groupée et une insertion groupée pour tout le lot
+    assert len(tickets) == 1 and tickets[0] == ["tok-1", "tok-2", "tok-3"]
+    assert [[row["token"] for row in rows] for rows in inserted] == [["tok-1"]]
+
+
+def test_batch_scan_falls_back_per_row_on_duplicate(client, scanner, tickets, monkeypatch):
+    monkeypatch.setattr(svc, "insert_validations_bulk", lambda rows: None)
+    monkeypatch.setattr(svc, "insert_validation", lambda **kw: None)
+
+    r = client.post("/api/v1/validation/scan/batch", json={"tokens": ["ukey.tok-1"]})
+
+    assert r.status_code == 200
+    assert r.json()["results"][0]["status"] == "already_validated"
+
+
+def test_batch_scan_rejects_bad_payloads(client, scanner, monkeypatch):
+    from backend.validation import views
+    monkeypatch.setattr(views, "SCAN_BATCH_MAX_TOKENS", 2)
+    assert client.post("/api/v1/validation/scan/batch", json={"tokens": []}).status_code == 400
+    assert client.post("/api/v1/validation/scan/batch", json={"tokens": "ukey.tok-1"}).status_code == 400
+    assert client.post("/api/v1/validation/scan/batch", json={"tokens": ["a.b"] * 3}).status_code == 413
+
+
+def test_batch_scan_requires_scanner_role(client):
+    assert client.post("/api/v1/validation/scan/batch", json={"tokens": ["ukey.tok-1"]}).status_code == 403
@@ -0,0 +1,85 @@
+import pytest
+from fastapi import HTTPException
+from starlette.websockets import WebSocketDisconnect
+
+from backend.validation import views
+
+USERS = {
+    "scanner-token": {"id": "scanner-1", "role": "scanner"},
+    "user-token": {"id": "user-1", "role": "user"},
+}
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    """Tokens de session connus; les tokens retirés de USERS sont considérés expirés."""
+    users = dict(USERS)
+    def _user_from_token(token):
+        if token not in users:
+            raise HTTPException(status_code=401, detail="Session expirée")
+        return users[token]
+    monkeypatch.setattr(views, "user_from_token", _user_from_token)
+    return users
+
+
+@pytest.fixture
+def scans(monkeypatch):
+    calls = []
+    def _validate(token, admin_id, admin_token=None):
+        calls.append((token, admin_id))
+        if token == "ukey.unknown":
+            return ("not_found", {"message": "Billet introuvable", "reason": "ticket_not_found"})
+        return ("validated", {"token": token.split(".", 1)[1], "validation": {"status": "validated"}})
+    monkeypatch.setattr(views, "validate_ticket_token", _validate)
+    monkeypatch.setattr(views, "validate_ticket_tokens", lambda tokens, admin_id, admin_token=None: [_validate(t, admin_id) for t in tokens])
+    return calls
+
+
+def _connect(client, token="scanner-token", **headers):
+    return client.websocket_connect("/api/v1/validation/ws", headers={"Authorization": f"Bearer {token}", **headers})
+
+
+def test_scanner_streams_tokens_over_one_connection(client, sessions, scans):
+    with _connect(client) as ws:
+        ws.send_json({"id": 1, "token": "ukey.tok-1"})
+        assert ws.receive_json() == {"id": 1, "status": "ok", "token": "tok-1", "validation": {"status": "validated"}}
+        ws.send_text("ukey.unknown")
+        reply = ws.receive_json()
+        assert reply["status"] == "not_found" and reply["id"] is None
+        ws.send_json({"id": "b", "tokens": ["ukey.tok-2", "ukey.unknown"]})
+        batch = ws.receive_json()
+        assert batch["id"] == "b" and batch["counts"] == {"ok": 1, "not_found": 1}
+
+    assert scans == [("ukey.tok-1", "scanner-1"), ("ukey.unknown", "scanner-1"), ("ukey.tok-2", "scanner-1"), ("ukey.unknown", "scanner-1")]
+
+
+def test_non_scanner_is_rejected(client, sessions, scans):
+    with pytest.raises(WebSocketDisconnect) as exc:
+        with _connect(client, token="user-token") as ws:
+            ws.receive_json()
+    assert exc.value.code == 4403
+
+
+def test_unauthenticated_is_rejected(client, sessions, scans):
+    with pytest.raises(WebSocketDisconnect) as exc:
+        with _connect(client, token="unknown") as ws:
+            ws.receive_json()
+    assert exc.value.code == 4401
+
+
+def test_cross_site_origin_is_rejected(client, sessions, scans):
+    with pytest.raises(WebSocketDisconnect) as exc:
+        with _connect(client, origin="https://evil.example") as ws:
+            ws.receive_json()
+    assert exc.value.code == 4403
+
+
+def test_expired_session_closes_channel(client, sessions, scans):
+    with _connect(client) as ws:
+        sessions.pop("scanner-token")
+        ws.send_json({"id": 7, "token": "ukey.tok-1"})
+        assert ws.receive_json() == {"id": 7, "status": "error", "detail": "Session expirée"}
+        with pytest.raises(WebSocketDisconnect) as exc:
+            ws.receive_json()
+    assert exc.value.code == 4401
+    assert scans == []
@@ -39,22 +39,34 @@ def test_count_table_rows_exception(monkeypatch):
     monkeypatch.setattr("backend.admin.repository.get_service_supabase", lambda: (_ for _ in ()).throw(Exception("boom")))
     assert repo.count_table_rows("users") == 0
 
+def _mk_update_client(data):
+    client = MagicMock()
+    chain = client.table.return_value.update.return_value.eq.return_value
+    chain.execute.return_value = _Resp(data=data)
+    return client
+
 def test_update_user_success(monkeypatch):
-    client, table, select, single = _mk_client()
-    # Première exécution renvoie un objet mis à jour
-    select.execute.return_value = _Resp(data=[{"id": "u1", "email": "a@b"}])
+    # La ligne mise à jour est renvoyée par l'update (return=representation), filtrée par id
+    client = _mk_update_client([{"id": "u1", "email": "a@b"}])
     monkeypatch.setattr("backend.admin.repository.get_service_supabase", lambda: client)
     res = repo.update_user("u1", {"email": "a@b"})
     assert res == {"id": "u1", "email": "a@b"}
+    client.table.return_value.update.return_value.eq.assert_called_once_with("id", "u1")
+    # Aucune relecture de la table
+    client.table.return_value.select.assert_not_called()
+
+def test_update_user_no_match(monkeypatch):
+    client = _mk_update_client([])
+    monkeypatch.setattr("backend.admin.repository.get_service_supabase", lambda: client)
+    assert repo.update_user("u1", {"email": "final@x"}) is None
+    client.table.return_value.select.assert_not_called()
 
-def test_update_user_fallback(monkeypatch):
-    client, table, select, single = _mk_client()
-    # Première exécution vide -> fallback lecture unique
-    select.execute.return_value = _Resp(data=[])
-    single.execute.return_value = _Resp(data={"id": "u1", "email": "final@x"})
+def test_update_commande_single_round_trip(monkeypatch):
+    client = _mk_update_client([{"id": "c1", "price_paid": "12"}])
     monkeypatch.setattr("backend.admin.repository.get_service_supabase", lambda: client)
-    res = repo.update_user("u1", {"email": "final@x"})
-    assert res == {"id": "u1", "email": "final@x"}
+    assert repo.update_commande("c1", {"price_paid": "12"}) == {"id": "c1", "price_paid": "12"}
+    assert client.table.return_value.update.return_value.eq.return_value.execute.call_count == 1
+    client.table.return_value.select.assert_not_called()
 
 def test_delete_user_success(monkeypatch):
     client = MagicMock()
@@ -0,0 +1,91 @@
+import time
+import jwt
+import pytest
+
+from backend.auth import repository as repo
+from backend.auth import service as svc
+
+SECRET = "test-jwt-secret-with-enough-length-000"
+ISSUER = "https://example.supabase.co/auth/v1"
+
+
+def _make_token(**overrides):
+    claims = {
+        "sub": "user-1",
+        "email": "user@example.com",
+        "aud": "authenticated",
+        "iss": ISSUER,
+        "exp": int(time.time()) + 3600,
+        "user_metadata": {"role": "admin"},
+    }
+    claims.update(overrides)
+    return jwt.encode(claims, SECRET, algorithm="HS256")
+
+
+@pytest.fixture
+def local_jwt(monkeypatch):
+    monkeypatch.setattr(repo, "AUTH_LOCAL_JWT", True)
+    monkeypatch.setattr(repo, "SUPABASE_JWT_SECRET", SECRET)
+    monkeypatch.setattr(repo, "SUPABASE_JWT_AUDIENCE", "authenticated")
+    monkeypatch.setattr(repo, "SUPABASE_JWT_ISSUER", ISSUER)
+
+
+def test_decode_locally_valid_token(local_jwt):
+    user = repo.decode_access_token_locally(_make_token())
+    assert user["id"] == "user-1"
+    assert user["email"] == "user@example.com"
+    assert user["user_metadata"] == {"role": "admin"}
+
+
+@pytest.mark.parametrize("overrides", [
+    {"exp": int(time.time()) - 3600},
+    {"aud": "other"},
+    {"iss": "https://evil.example.com/auth/v1"},
+])
+def test_decode_locally_rejects_invalid_claims(local_jwt, overrides):
+    with pytest.raises(jwt.InvalidTokenError):
+        repo.decode_access_token_locally(_make_token(**overrides))
+
+
+def test_decode_locally_rejects_bad_signature(local_jwt):
+    forged = jwt.encode({"sub": "user-1", "aud": "authenticated", "iss": ISSUER, "exp": int(time.time()) + 60},
+                        "another-secret-with-enough-length-0000", algorithm="HS256")
+    with pytest.raises(jwt.InvalidSignatureError):
+        repo.decode_access_token_locally(forged)
+
+
+def test_decode_locally_undecidable_without_secret(local_jwt, monkeypatch):
+    monkeypatch.setattr(repo, "SUPABASE_JWT_SECRET", "")
+    assert repo.decode_access_token_locally(_make_token()) is None
+
+
+def test_get_user_from_token_skips_remote_when_local_ok(local_jwt, monkeypatch):
+    def remote(_token):
+        raise AssertionError("appel distant inattendu")
+
+    monkeypatch.setattr(svc, "_repo_decode_token_locally", repo.decode_access_token_locally)
+    monkeypatch.setattr(svc, "_repo_get_user_from_token", remote)
+    monkeypatch.setattr(svc, "sync_user_profile", lambda *a, **k: True)
+
+    token = _make_token()
+    user = svc.get_user_from_token(token)
+    assert user == {
+        "id": "user-1",
+        "email": "user@example.com",
+        "metadata": {"role": "admin"},
+        "role": "admin",
+        "token": token,
+    }
+
+
+def test_get_user_from_token_falls_back_to_remote(monkeypatch):
+    calls = []
+    monkeypatch.setattr(svc, "_repo_decode_token_locally", lambda token: None)
+    monkeypatch.setattr(svc, "_repo_get_user_from_token",
+                        lambda token: calls.append(token) or {"id": "u2", "email": "b@c", "user_metadata": {}})
+    monkeypatch.setattr(svc, "sync_user_profile", lambda *a, **k: True)
+
+    user = svc.get_user_from_token("opaque-token")
+    assert calls == ["opaque-token"]
+    assert user["id"] == "u2"
+    assert user["role"] == "user"
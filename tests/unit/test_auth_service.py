@@ -138,4 +138,40 @@ def test_update_password_exception(monkeypatch):
 
     res = svc.update_password("utok", "newpwd")
     assert res.success is False
-    assert res.error == "handled"
\ No newline at end of file
+    assert res.error == "handled"
+
+def test_get_user_from_token_syncs_profile_once(monkeypatch):
+    svc._token_cache.clear()
+    svc._synced_profiles.clear()
+    reads, writes = [], []
+    monkeypatch.setattr(svc, "_repo_decode_token_locally", lambda token: None)
+    monkeypatch.setattr(svc, "_repo_get_user_from_token",
+                        lambda token: {"id": "u-sync", "email": "s@x", "user_metadata": {}})
+    monkeypatch.setattr("backend.users.repository.get_user_by_id", lambda uid: reads.append(uid) or {"bio": "k"})
+    monkeypatch.setattr(svc, "_repo_upsert_user_profile", lambda *a, **k: writes.append(a) or True)
+
+    # Deux tokens distincts (pas de cache token) pour le même utilisateur
+    svc.get_user_from_token("token-a")
+    svc.get_user_from_token("token-b")
+    assert reads == ["u-sync"]
+    assert len(writes) == 1
+    assert svc.is_profile_synced("u-sync", "user") is True
+
+def test_sync_user_profile_failure_is_retried(monkeypatch):
+    svc._synced_profiles.clear()
+    monkeypatch.setattr("backend.users.repository.get_user_by_id", lambda uid: None)
+    monkeypatch.setattr(svc, "_repo_upsert_user_profile", lambda *a, **k: False)
+    assert svc.sync_user_profile("u-fail", "f@x", "user") is False
+    assert svc.is_profile_synced("u-fail", "user") is False
+
+def test_get_user_from_token_cache_returns_independent_copies(monkeypatch):
+    svc._token_cache.clear()
+    monkeypatch.setattr(svc, "_repo_decode_token_locally",
+                        lambda token: {"id": "u-copy", "email": "c@x", "user_metadata": {"prefs": {"lang": "fr"}}})
+    monkeypatch.setattr(svc, "is_profile_synced", lambda uid, role: True)
+
+    first = svc.get_user_from_token("token-copy")
+    first["metadata"]["prefs"]["lang"] = "en"
+    second = svc.get_user_from_token("token-copy")
+    second["metadata"]["injected"] = True
+    assert svc.get_user_from_token("token-copy")["metadata"] == {"prefs": {"lang": "fr"}}
@@ -44,4 +44,29 @@ def test_insert_commande_with_token_exception():
         result = insert_commande_with_token(user_id=user_id, offre_id=offre_id, token=token, price_paid=price_paid, user_token=user_token)
 
     # Assert
-    assert result is None
\ No newline at end of file
+    assert result is None
+def test_insert_commande_service_returns_inserted_row():
+    # insert_commande_service est remplacé par conftest: appel de l'implémentation
+    from backend.payments.repository import _insert_commande_service as insert_commande_service
+    mock_client = MagicMock()
+    mock_insert = mock_client.table.return_value.insert.return_value
+    mock_insert.execute.return_value = MagicMock(data=[{"id": "c1", "token": "token-789"}])
+
+    with patch("backend.infra.supabase_client.get_service_supabase", return_value=mock_client):
+        result = insert_commande_service(user_id="user-123", offre_id="offre-456", token="token-789", price_paid="10.00")
+
+    # Ligne renvoyée par l'insert (return=representation): pas de .select() chaîné
+    assert result == {"id": "c1", "token": "token-789"}
+    mock_insert.select.assert_not_called()
+
+def test_create_pending_commande_returns_inserted_row():
+    from backend.commandes import repository as commandes_repository
+    mock_client = MagicMock()
+    mock_insert = mock_client.table.return_value.insert.return_value
+    mock_insert.execute.return_value = MagicMock(data=[{"id": "c2", "token": "tok"}])
+
+    with patch.object(commandes_repository, "get_service_supabase", return_value=mock_client):
+        result = commandes_repository.create_pending_commande("offre-1", "user-1", 10.0)
+
+    assert result == {"id": "c2", "token": "tok"}
+    mock_insert.select.assert_not_called()
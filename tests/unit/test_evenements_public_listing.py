@@ -0,0 +1,69 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from backend.evenements import public_listing
+from backend.evenements import repository as evenements_repository
+
+ROWS = [
+    {"id": "e1", "nom_evenement": "Finale 100m", "type_evenement": "Athlétisme", "date_evenement": "2024-08-04", "lieu": "Stade de France"},
+]
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Client async factice: compte les lectures de la table evenements."""
+    client = MagicMock()
+    execute = AsyncMock(return_value=MagicMock(data=ROWS))
+    client.table.return_value.select.return_value.order.return_value.execute = execute
+    monkeypatch.setattr("backend.infra.supabase_client.get_async_supabase", lambda: client)
+    public_listing.invalidate()
+    yield execute
+    public_listing.invalidate()
+
+
+def test_listing_is_normalized_and_cached(client, db):
+    first = client.get("/api/v1/evenements")
+    second = client.get("/api/v1/evenements")
+
+    assert first.status_code == 200
+    assert first.json() == [{
+        "id": "e1", "title": "Finale 100m", "date": "2024-08-04", "lieu": "Stade de France",
+        "type_evenement": "Athlétisme", "description": "", "image": "",
+    }]
+    assert first.headers["etag"] == second.headers["etag"]
+    assert db.await_count == 1
+
+
+def test_if_none_match_returns_304(client, db):
+    etag = client.get("/api/v1/evenements").headers["etag"]
+    res = client.get("/api/v1/evenements", headers={"If-None-Match": f'W/{etag}, "other"'})
+    assert res.status_code == 304
+    assert res.content == b""
+    assert res.headers["etag"] == etag
+
+
+def test_admin_write_bumps_version(client, db, monkeypatch):
+    monkeypatch.setattr(evenements_repository, "get_service_supabase", lambda: MagicMock())
+    etag = client.get("/api/v1/evenements").headers["etag"]
+    version = public_listing._version
+
+    evenements_repository.update_evenement("e1", {"lieu": "Paris"})
+
+    assert public_listing._version == version + 1
+    res = client.get("/api/v1/evenements", headers={"If-None-Match": etag})
+    assert db.await_count == 2
+    assert res.status_code == 304  # contenu inchangé en base: même ETag
+
+
+def test_supabase_error_returns_500_and_is_not_cached(client, db):
+    db.side_effect = [RuntimeError("down"), MagicMock(data=ROWS)]
+    assert client.get("/api/v1/evenements").status_code == 500
+    assert client.get("/api/v1/evenements").status_code == 200
+
+
+def test_encode_matches_json_response_format():
+    listing = public_listing.encode([{"title": "Épreuve"}], version=3)
+    assert listing.body == '[{"title":"Épreuve"}]'.encode("utf-8")
+    assert json.loads(listing.body) == [{"title": "Épreuve"}]
@@ -0,0 +1,109 @@
+import json
+import weakref
+
+import pytest
+
+from backend.infra import job_queue, redis_client, work_leases
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """fakeredis isolé par test (serveur neuf)."""
+    monkeypatch.setenv("USE_FAKE_REDIS_FOR_TESTS", "1")
+    monkeypatch.setattr(redis_client, "_fake_server", None)
+    monkeypatch.setattr(redis_client, "_async_clients", weakref.WeakKeyDictionary())
+    monkeypatch.setattr(job_queue, "_handlers", {})
+    return redis_client
+
+
+async def test_enqueue_without_redis_returns_false(monkeypatch):
+    monkeypatch.delenv("USE_FAKE_REDIS_FOR_TESTS", raising=False)
+    monkeypatch.setattr(redis_client, "REDIS_URL", "")
+    monkeypatch.setattr(redis_client, "_async_clients", weakref.WeakKeyDictionary())
+    assert await job_queue.enqueue("x", {"a": 1}) is False
+
+
+async def test_job_processed_and_removed(fake_redis):
+    seen = []
+    job_queue.register_handler("demo", seen.append)
+    assert await job_queue.enqueue("demo", {"n": 1}) is True
+
+    client = fake_redis.get_async_redis()
+    assert (await job_queue.queue_stats())["backlog"] == 1
+    assert await job_queue.process_next(client, timeout=0.1) is True
+
+    assert seen == [{"n": 1}]
+    stats = await job_queue.queue_stats()
+    assert stats["backlog"] == 0 and stats["processing"] == 0 and stats["dead"] == 0
+    assert await job_queue.process_next(client, timeout=0.1) is False
+
+
+async def test_failed_job_is_retried_then_dead_lettered(fake_redis, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(job_queue, "JOB_RETRY_BACKOFF", 0)
+    calls = []
+    def _boom(payload):
+        calls.append(payload)
+        raise RuntimeError("db down")
+    job_queue.register_handler("demo", _boom)
+    await job_queue.enqueue("demo", {"n": 1})
+    client = fake_redis.get_async_redis()
+
+    await job_queue.process_next(client, timeout=0.1)
+    assert (await job_queue.queue_stats())["delayed"] == 1
+    # Retry échu: promu puis traité, nouvel échec => dead-letter
+    await job_queue.process_next(client, timeout=0.1)
+
+    stats = await job_queue.queue_stats()
+    assert len(calls) == 2
+    assert stats == {"enabled": True, "backlog": 0, "processing": 0, "delayed": 0, "dead": 1}
+    dead = json.loads(await client.lindex("jobs:webhooks:dead", 0))
+    assert dead["attempts"] == 2 and "db down" in dead["last_error"]
+
+
+async def test_unknown_kind_goes_to_dead_letter(fake_redis):
+    await job_queue.enqueue("unknown", {})
+    client = fake_redis.get_async_redis()
+    await job_queue.process_next(client, timeout=0.1)
+    assert (await job_queue.queue_stats())["dead"] == 1
+
+
+async def test_recover_processing_requeues_interrupted_jobs(fake_redis):
+    client = fake_redis.get_async_redis()
+    await client.lpush("jobs:webhooks:processing", json.dumps({"id": "1", "kind": "demo", "payload": {}}))
+    assert await job_queue.recover_processing(client) == 1
+    assert (await job_queue.queue_stats())["backlog"] == 1
+
+
+async def test_recover_processing_spares_live_workers(fake_redis):
+    client = fake_redis.get_async_redis()
+    base = "jobs:webhooks:processing"
+    for consumer, job_id in [("live", "1"), ("dead", "2")]:
+        await work_leases.renew(client, base, consumer, ttl=60)
+        await client.lpush(work_leases.processing_key(base, consumer), json.dumps({"id": job_id}))
+    await work_leases.release(client, base, "dead")
+    assert (await job_queue.queue_stats())["processing"] == 2
+
+    # Seul le job de l'instance sans bail est remis en file
+    assert await job_queue.recover_processing(client) == 1
+    assert json.loads(await client.lindex("jobs:webhooks", 0))["id"] == "2"
+    assert await client.llen(work_leases.processing_key(base, "live")) == 1
+    assert await client.smembers(f"{base}:consumers") == {"live"}
+
+
+async def test_stop_workers_releases_lease(fake_redis):
+    from types import SimpleNamespace
+    app = SimpleNamespace(state=SimpleNamespace())
+    client = fake_redis.get_async_redis()
+    lease = f"{work_leases.processing_key('jobs:webhooks:processing')}:lease"
+    assert len(await job_queue.start_workers(app, count=1)) == 1
+    assert await client.exists(lease)
+    await job_queue.stop_workers(app)
+    assert not await client.exists(lease)
+    assert app.state.job_workers == [] and app.state.job_lease is None
+
+
+def test_webhook_enqueues_and_acknowledges(fake_redis, client):
+    res = client.post("/api/v1/payments/webhook", json={"dummy": True})
+    assert res.status_code == 200
+    assert res.json() == {"status": "queued"}
@@ -0,0 +1,85 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from backend.offres import catalog
+from backend.offres import repository as offres_repository
+from backend.payments import repository as payments_repository
+
+# Références réelles (conftest patche payments.repository.fetch_offres_by_ids)
+_fetch_offres_by_ids = payments_repository.fetch_offres_by_ids
+
+ROWS = [
+    {"id": "o1", "title": "Solo", "price": 10},
+    {"id": "o2", "title": "Duo", "price": 18},
+]
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Client Supabase factice qui compte les requêtes sur la table offres."""
+    client = MagicMock()
+    query = client.table.return_value.select.return_value
+    query.order.return_value.execute.return_value = MagicMock(data=[dict(r) for r in ROWS])
+    query.in_.return_value.execute.return_value = MagicMock(data=[{"id": "o3", "title": "New", "price": 5}])
+    monkeypatch.setattr("backend.infra.supabase_client.get_supabase", lambda: client)
+    catalog.invalidate()
+    yield query
+    catalog.invalidate()
+
+
+def test_reads_are_served_from_one_load(db):
+    assert [o["id"] for o in offres_repository.list_offres()] == ["o1", "o2"]
+    assert offres_repository.get_offre("o2")["title"] == "Duo"
+    assert [o["id"] for o in _fetch_offres_by_ids(["o1", "o2", "o1"])] == ["o1", "o2"]
+    assert db.order.return_value.execute.call_count == 1
+    db.in_.assert_not_called()
+
+
+def test_returned_offres_are_copies(db):
+    offres_repository.list_offres()[0]["price"] = 0
+    assert offres_repository.get_offre("o1")["price"] == 10
+
+
+def test_unknown_id_falls_back_to_direct_lookup(db):
+    assert offres_repository.get_offre("o3")["title"] == "New"
+    db.in_.assert_called_once_with("id", ["o3"])
+
+
+def test_admin_write_invalidates_catalog(db, monkeypatch):
+    monkeypatch.setattr(offres_repository, "get_service_supabase", lambda: MagicMock())
+    offres_repository.list_offres()
+    offres_repository.update_offre("o1", {"price": 12})
+    offres_repository.list_offres()
+    assert db.order.return_value.execute.call_count == 2
+
+
+def test_failed_load_is_not_cached(db):
+    db.order.return_value.execute.side_effect = [RuntimeError("down"), MagicMock(data=ROWS)]
+    assert offres_repository.list_offres() == []
+    assert len(offres_repository.list_offres()) == 2
+
+
+async def test_async_reads_share_the_catalog(db):
+    offres_repository.list_offres()
+    assert (await offres_repository.get_offre_async("o1"))["title"] == "Solo"
+    assert db.order.return_value.execute.call_count == 1
+
+
+def test_cart_offres_are_compact_shared_rows(db):
+    first = _fetch_offres_by_ids(["o2"])[0]
+    assert first == catalog.CartOffre(id="o2", title="Duo", price=18)
+    assert first.get("price_id") is None and first.get("description", "-") == "-"
+    assert _fetch_offres_by_ids(["o2"])[0] is first
+
+
+def test_cart_fallback_selects_cart_columns(db, monkeypatch):
+    client = MagicMock()
+    client.table.return_value.select.return_value.order.return_value.execute.return_value = MagicMock(data=ROWS)
+    client.table.return_value.select.return_value.in_.return_value.execute.return_value = MagicMock(
+        data=[{"id": "o3", "title": "New", "price": 5}]
+    )
+    monkeypatch.setattr("backend.infra.supabase_client.get_supabase", lambda: client)
+    offres = {o.id: o for o in _fetch_offres_by_ids(["o1", "o3"])}
+    assert offres["o3"]["title"] == "New"
+    client.table.return_value.select.assert_called_with(catalog.CART_COLUMNS)
@@ -0,0 +1,110 @@
+import json
+
+import pytest
+from postgrest import SyncPostgrestClient
+
+from backend.utils.export import stream_rows
+from backend.utils.pagination import iter_keyset_pages, keyset_filter, keyset_page
+
+
+def test_keyset_filter_quotes_values():
+    f = keyset_filter(("2024-07-26T10:00:00+00:00", "c-1"))
+    assert f == 'created_at.gt."2024-07-26T10:00:00+00:00",and(created_at.eq."2024-07-26T10:00:00+00:00",id.gt."c-1")'
+    assert keyset_filter((12.5, 'a"b'), "price", desc=True) == 'price.lt."12.5",and(price.eq."12.5",id.lt."a\\"b")'
+
+
+def test_keyset_page_builds_postgrest_params():
+    query = SyncPostgrestClient("http://db.test").table("commandes").select("id, created_at")
+    params = dict(keyset_page(query, ("2024-01-01", "c-9"), 50).params)
+    assert params["order"] == "created_at.asc,id.asc"
+    assert params["limit"] == "50"
+    assert params["or"] == '(created_at.gt."2024-01-01",and(created_at.eq."2024-01-01",id.gt."c-9"))'
+
+
+def test_iter_keyset_pages_resumes_after_last_key():
+    rows = [{"id": f"id-{i:02d}", "created_at": f"2024-01-{i // 3 + 1:02d}"} for i in range(7)]
+    seen = []
+
+    def fetch_page(after, limit):
+        seen.append(after)
+        remaining = [r for r in rows if after is None or (r["created_at"], r["id"]) > after]
+        return remaining[:limit]
+
+    pages = list(iter_keyset_pages(fetch_page, 3))
+    assert [len(p) for p in pages] == [3, 3, 1]
+    assert [r for p in pages for r in p] == rows
+    assert seen == [None, ("2024-01-01", "id-02"), ("2024-01-02", "id-05")]
+
+
+def test_iter_keyset_pages_propagates_errors():
+    def fetch_page(after, limit):
+        if after is not None:
+            raise RuntimeError("db down")
+        return [{"id": "1", "created_at": "x"}] * limit
+
+    with pytest.raises(RuntimeError):
+        list(iter_keyset_pages(fetch_page, 2))
+
+
+def test_stream_rows_csv_and_ndjson():
+    pages = [[{"id": "1", "email": "a@b", "extra": "ignored"}], [{"id": "2", "email": 'x,"y"'}]]
+    csv_out = b"".join(stream_rows(iter(pages), "csv", ("id", "email")))
+    assert csv_out.decode() == 'id,email\n1,a@b\n2,"x,""y"""\n'
+    ndjson_out = b"".join(stream_rows(iter(pages), "ndjson", ("id", "email")))
+    assert [json.loads(line) for line in ndjson_out.decode().splitlines()] == [{"id": "1", "email": "a@b"}, {"id": "2", "email": 'x,"y"'}]
+    assert b"".join(stream_rows(iter([]), "csv", ("id",))) == b"id\n"
+
+
+def test_stream_rows_csv_neutralizes_formulas():
+    pages = [[{"id": 1, "email": "=HYPERLINK(\"x\")", "nom": "-2+3", "prenom": "@SUM(A1)"}]]
+    out = b"".join(stream_rows(iter(pages), "csv", ("id", "email", "nom", "prenom"))).decode()
+    assert out.splitlines()[1] == '1,"\'=HYPERLINK(""x"")",\'-2+3,\'@SUM(A1)'
+    ndjson_out = b"".join(stream_rows(iter(pages), "ndjson", ("email",)))
+    assert json.loads(ndjson_out) == {"email": "=HYPERLINK(\"x\")"}
+
+
+def test_cursor_roundtrip_and_invalid():
+    from backend.utils.pagination import CursorError, decode_cursor, encode_cursor
+    cursor = encode_cursor(("2024-07-26T10:00:00+00:00", "c-1"))
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == ("2024-07-26T10:00:00+00:00", "c-1")
+    assert decode_cursor(None) is None
+    for bad in ("%%%", encode_cursor(("a", "b"))[:-3] + "xx", "WzFd", encode_cursor(([1], "b")), encode_cursor((True, None))):
+        with pytest.raises(CursorError):
+            decode_cursor(bad)
+
+
+def test_page_size_bounds(monkeypatch):
+    from backend.utils import pagination
+    assert pagination.page_size(None) == pagination.PAGE_SIZE_DEFAULT
+    assert pagination.page_size(10**6) == pagination.PAGE_SIZE_MAX
+    assert pagination.page_size(7) == 7
+
+
+def test_fetch_page_reads_one_extra_row():
+    from unittest.mock import MagicMock
+    from backend.utils.pagination import decode_cursor, fetch_page
+    query = MagicMock()
+    query.or_.return_value = query
+    query.order.return_value = query
+    query.limit.return_value = query
+    rows = [{"id": f"id-{i}", "created_at": f"2024-01-0{9 - i}"} for i in range(3)]
+    query.execute.return_value = MagicMock(data=rows)
+
+    page = fetch_page(query, None, 2, desc=True)
+    query.limit.assert_called_once_with(3)
+    assert page.items == rows[:2]
+    assert decode_cursor(page.next_cursor) == ("2024-01-08", "id-1")
+
+    query.execute.return_value = MagicMock(data=rows[:2])
+    assert fetch_page(query, None, 2).next_cursor is None
+
+
+def test_paginate_rows_in_memory():
+    from backend.utils.pagination import decode_cursor, paginate_rows
+    rows = [{"id": "b", "price": 10}, {"id": "a", "price": 10}, {"id": "c", "price": 5}]
+    key = lambda r: (float(r["price"]), r["id"])
+    first = paginate_rows(rows, None, 2, key)
+    assert [r["id"] for r in first.items] == ["c", "a"]
+    second = paginate_rows(rows, decode_cursor(first.next_cursor), 2, key)
+    assert [r["id"] for r in second.items] == ["b"] and second.next_cursor is None
@@ -0,0 +1,128 @@
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from backend.infra import redis_client
+from backend.payments import idempotency
+from backend.payments import service as payments_service
+from backend.payments.repository import BulkInsertResult
+
+
+@pytest.fixture(params=["memory", "redis"])
+def registry(request, monkeypatch):
+    """Registre vide, en mémoire (sans Redis) ou sur fakeredis."""
+    monkeypatch.setattr(redis_client, "_client", None)
+    if request.param == "redis":
+        monkeypatch.setenv("USE_FAKE_REDIS_FOR_TESTS", "1")
+        monkeypatch.setattr(redis_client, "_fake_server", None)
+    else:
+        monkeypatch.delenv("USE_FAKE_REDIS_FOR_TESTS", raising=False)
+        monkeypatch.setattr(redis_client, "REDIS_URL", "")
+    idempotency._local.clear()
+    yield request.param
+    idempotency._local.clear()
+
+
+def test_run_once_returns_previous_result(registry):
+    calls = []
+    def _fn():
+        calls.append(1)
+        return {"created": 3}
+
+    first, dup1 = idempotency.run_once("cs_1", _fn)
+    second, dup2 = idempotency.run_once("cs_1", _fn)
+
+    assert first == second == {"created": 3}
+    assert (dup1, dup2) == (False, True)
+    assert len(calls) == 1
+    assert idempotency.get_session_result("cs_1") == {"created": 3}
+
+
+def test_run_once_releases_claim_on_failure(registry):
+    def _boom():
+        raise RuntimeError("db down")
+
+    with pytest.raises(RuntimeError):
+        idempotency.run_once("cs_2", _boom)
+    # Le claim est libéré: une nouvelle tentative fait le travail
+    result, dup = idempotency.run_once("cs_2", lambda: {"created": 1})
+    assert result == {"created": 1} and dup is False
+
+
+def test_concurrent_calls_do_work_once(registry):
+    calls = []
+    def _slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"created": 2}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(idempotency.run_once("cs_3", _slow)))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert sorted(dup for _, dup in results) == [False, True, True, True]
+    assert all(res == {"created": 2} for res, _ in results)
+
+
+def test_in_progress_claim_times_out_with_409(registry, monkeypatch):
+    monkeypatch.setattr(idempotency, "PAYMENTS_SESSION_WAIT", 0)
+    assert idempotency.claim_session("cs_4") == (True, None)
+    with pytest.raises(HTTPException) as exc:
+        idempotency.run_once("cs_4", lambda: {"created": 1})
+    assert exc.value.status_code == 409
+
+
+ROWS = [{"offre_id": "A", "token": "t1"}, {"offre_id": "A", "token": "t2"}]
+
+
+def test_process_session_once_webhook_then_confirm(registry, monkeypatch):
+    calls = []
+    def _fake_bulk(rows, user_token=None, use_service=False):
+        calls.append(user_token)
+        return BulkInsertResult(list(rows), [])
+    monkeypatch.setattr(payments_service, "build_ticket_rows", lambda user_id, cart: list(ROWS))
+    monkeypatch.setattr(payments_service.repository, "insert_commandes_bulk", _fake_bulk)
+    cart = [{"id": "A", "quantity": 2}]
+
+    assert payments_service.process_session_once("cs_5", "u1", cart) == 2
+    assert payments_service.process_session_once("cs_5", "u1", cart, user_token="jwt") == 2
+    assert calls == [None]
+
+
+def test_process_session_once_retries_when_nothing_created(registry, monkeypatch):
+    built = iter([[], list(ROWS)])
+    monkeypatch.setattr(payments_service, "build_ticket_rows", lambda user_id, cart: next(built))
+    monkeypatch.setattr(payments_service.repository, "insert_commandes_bulk", lambda rows, **kw: BulkInsertResult(list(rows), []))
+    cart = [{"id": "A", "quantity": 2}]
+
+    assert payments_service.process_session_once("cs_6", "u1", cart) == 0
+    assert payments_service.process_session_once("cs_6", "u1", cart) == 2
+
+
+def test_process_session_once_resumes_partial_insert_with_same_tokens(registry, monkeypatch):
+    inserted = []
+    results = iter([lambda rows: BulkInsertResult(rows[:1], rows[1:]), lambda rows: BulkInsertResult(rows, [])])
+    def _fake_bulk(rows, **kw):
+        inserted.append([r["token"] for r in rows])
+        return next(results)(list(rows))
+    monkeypatch.setattr(payments_service, "build_ticket_rows", lambda user_id, cart: [dict(r) for r in ROWS])
+    monkeypatch.setattr(payments_service.repository, "insert_commandes_bulk", _fake_bulk)
+    cart = [{"id": "A", "quantity": 2}]
+
+    with pytest.raises(RuntimeError):
+        payments_service.process_session_once("cs_7", "u1", cart)
+    assert idempotency.get_session_result("cs_7") is None
+
+    assert payments_service.process_session_once("cs_7", "u1", cart) == 2
+    assert payments_service.process_session_once("cs_7", "u1", cart) == 2
+    assert inserted == [["t1", "t2"], ["t2"]]
+    assert idempotency.get_pending("cs_7") is None
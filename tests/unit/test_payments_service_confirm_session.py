@@ -10,7 +10,7 @@ def test_confirm_session_success(monkeypatch):
     monkeypatch.setattr("backend.payments.service.stripe_client.get_session", lambda sid: {"id": sid, "payment_status": "paid"})
     # meta.extract_metadata_from_session retourne (user_id, cart_list)
     monkeypatch.setattr("backend.payments.service.meta.extract_metadata_from_session", lambda session: ("u1", [{"id": "A", "quantity": 2}]))
-    monkeypatch.setattr("backend.payments.service.process_cart_purchase", lambda *a, **kw: 2)
+    monkeypatch.setattr("backend.payments.service.build_ticket_rows", lambda user_id, cart: [{"token": "t1"}, {"token": "t2"}])
 
     # Act
     created = confirm_session_by_id("sess_123", current_user_id="u1", user_token="jwt")
@@ -1,7 +1,12 @@
 import pytest
 from unittest.mock import MagicMock
+from postgrest.exceptions import APIError
 
-from backend.payments.service import process_cart_purchase as process_cart
+from backend.payments import repository as payments_repository
+from backend.payments.service import process_cart_purchase as process_cart, insert_cart_tickets
+
+# Référence réelle capturée avant le patch autouse de conftest (mock_db_dependency)
+_insert_commandes_bulk = payments_repository.insert_commandes_bulk
 
 def _patch_common(monkeypatch, offers_map, price=10.0):
     # get_offers_map utilisé dans service
@@ -9,6 +14,14 @@ def _patch_common(monkeypatch, offers_map, price=10.0):
     # price_from_offer est référencé via le module cart importé par service
     monkeypatch.setattr("backend.payments.service.cart.price_from_offer", lambda offer: price)
 
+def _patch_bulk(monkeypatch):
+    calls = []
+    def fake_bulk(rows, *, user_token=None, use_service=False, chunk_size=None):
+        calls.append({"rows": list(rows), "user_token": user_token, "use_service": use_service})
+        return payments_repository.BulkInsertResult([dict(r, id=f"c{i}") for i, r in enumerate(rows)], [])
+    monkeypatch.setattr("backend.payments.service.repository.insert_commandes_bulk", fake_bulk)
+    return calls
+
 def test_process_cart_purchase_default_client(monkeypatch):
     # Arrange
     offers_map = {
@@ -16,70 +29,53 @@ def test_process_cart_purchase_default_client(monkeypatch):
         "B": {"id": "B", "price": 20},
     }
     _patch_common(monkeypatch, offers_map, price=15.0)
-
-    inserted = MagicMock(return_value={"ok": True})
-    monkeypatch.setattr("backend.payments.service.repository.insert_commande", lambda **kw: inserted())
-    monkeypatch.setattr("backend.payments.service.repository.insert_commande_with_token", MagicMock())
-    monkeypatch.setattr("backend.payments.service.repository.insert_commande_service", MagicMock())
+    calls = _patch_bulk(monkeypatch)
 
     cart_list = [{"id": "A", "quantity": 2}, {"id": "B", "quantity": 1}]
     # Act
     created = process_cart(user_id="u1", cart_list=cart_list, user_token=None, use_service=False)
-    # Assert
+    # Assert: un seul insert groupé pour les 3 billets
     assert created == 3
+    assert len(calls) == 1
+    assert [r["offre_id"] for r in calls[0]["rows"]] == ["A", "A", "B"]
+    assert calls[0]["user_token"] is None and calls[0]["use_service"] is False
 
 def test_process_cart_purchase_with_user_token(monkeypatch):
     # Arrange
     offers_map = {"A": {"id": "A", "price": 10}}
     _patch_common(monkeypatch, offers_map, price=10.0)
-
-    calls = {"cnt": 0}
-    def inc_with_token(**kw):
-        calls["cnt"] += 1
-        return {"ok": True}
-
-    monkeypatch.setattr("backend.payments.service.repository.insert_commande_with_token", inc_with_token)
-    monkeypatch.setattr("backend.payments.service.repository.insert_commande", MagicMock())
-    monkeypatch.setattr("backend.payments.service.repository.insert_commande_service", MagicMock())
+    calls = _patch_bulk(monkeypatch)
 
     cart_list = [{"id": "A", "quantity": 3}]
     # Act
     created = process_cart(user_id="u1", cart_list=cart_list, user_token="jwt", use_service=False)
     # Assert
     assert created == 3
-    assert calls["cnt"] == 3
+    assert len(calls) == 1
+    assert calls[0]["user_token"] == "jwt"
 
 def test_process_cart_purchase_use_service(monkeypatch):
     # Arrange
     offers_map = {"A": {"id": "A", "price": 10}}
     _patch_common(monkeypatch, offers_map, price=9.99)
-
-    calls = {"cnt": 0}
-    def inc_service(**kw):
-        calls["cnt"] += 1
-        return {"ok": True}
-
-    monkeypatch.setattr("backend.payments.service.repository.insert_commande_service", inc_service)
-    monkeypatch.setattr("backend.payments.service.repository.insert_commande_with_token", MagicMock())
-    monkeypatch.setattr("backend.payments.service.repository.insert_commande", MagicMock())
+    calls = _patch_bulk(monkeypatch)
 
     cart_list = [{"id": "A", "quantity": 2}]
     # Act
     created = process_cart(user_id="u1", cart_list=cart_list, user_token=None, use_service=True)
     # Assert
     assert created == 2
-    assert calls["cnt"] == 2
+    assert calls[0]["use_service"] is True
+    assert {r["price_paid"] for r in calls[0]["rows"]} == {"9.99"}
+    # Un token distinct par billet
+    assert len({r["token"] for r in calls[0]["rows"]}) == 2
 
 def test_process_cart_purchase_skips_invalid_entries(monkeypatch):
     # Arrange: id manquant, qty <= 0, offre introuvable, prix <= 0
     offers_map = {"A": {"id": "A", "price": 10}}
     # prix à 0 pour forcer le skip de l’offre A
     _patch_common(monkeypatch, offers_map, price=0.0)
-
-    repo_calls = {"default": 0, "with_token": 0, "service": 0}
-    monkeypatch.setattr("backend.payments.service.repository.insert_commande", lambda **kw: (repo_calls.__setitem__("default", repo_calls["default"] + 1)))
-    monkeypatch.setattr("backend.payments.service.repository.insert_commande_with_token", lambda **kw: (repo_calls.__setitem__("with_token", repo_calls["with_token"] + 1)))
-    monkeypatch.setattr("backend.payments.service.repository.insert_commande_service", lambda **kw: (repo_calls.__setitem__("service", repo_calls["service"] + 1)))
+    calls = _patch_bulk(monkeypatch)
 
     cart_list = [
         {"id": "", "quantity": 1},          # id manquant
@@ -89,6 +85,59 @@ def test_process_cart_purchase_skips_invalid_entries(monkeypatch):
     ]
     # Act
     created = process_cart(user_id="u1", cart_list=cart_list)
-    # Assert
+    # Assert: aucun aller-retour base si rien à insérer
     assert created == 0
-    assert repo_calls["default"] == 0 and repo_calls["with_token"] == 0 and repo_calls["service"] == 0
\ No newline at end of file
+    assert calls == []
+
+def test_insert_cart_tickets_returns_created_rows(monkeypatch):
+    _patch_common(monkeypatch, {"A": {"id": "A", "price": 10}}, price=10.0)
+    _patch_bulk(monkeypatch)
+    result = insert_cart_tickets("u1", [{"id": "A", "quantity": 2}], use_service=True)
+    assert [r["id"] for r in result.created] == ["c0", "c1"]
+    assert all(r["user_id"] == "u1" for r in result.created)
+    assert result.failed == []
+
+def test_insert_commandes_bulk_chunks_large_orders(monkeypatch):
+    client = MagicMock()
+    client.table.return_value.insert.return_value.execute.side_effect = (
+        lambda: MagicMock(data=[])  # RLS: pas de représentation renvoyée
+    )
+    monkeypatch.setattr("backend.infra.supabase_client.get_service_supabase", lambda: client)
+
+    rows = [{"token": f"t{i}"} for i in range(5)]
+    result = _insert_commandes_bulk(rows, use_service=True, chunk_size=2)
+
+    inserted_chunks = [c.args[0] for c in client.table.return_value.insert.call_args_list]
+    assert [len(c) for c in inserted_chunks] == [2, 2, 1]
+    assert result.created == rows and result.failed == []
+
+def test_insert_commandes_bulk_reports_failed_chunks(monkeypatch):
+    client = MagicMock()
+    results = iter([
+        MagicMock(data=[{"id": 1}, {"id": 2}]),
+        RuntimeError("boom"),
+        APIError({"code": "23505", "message": "duplicate token"}),
+    ])
+    def _execute():
+        r = next(results)
+        if isinstance(r, Exception):
+            raise r
+        return r
+    client.table.return_value.insert.return_value.execute.side_effect = _execute
+    monkeypatch.setattr("backend.infra.supabase_client.get_service_supabase", lambda: client)
+
+    rows = [{"token": f"t{i}"} for i in range(6)]
+    result = _insert_commandes_bulk(rows, use_service=True, chunk_size=2)
+    # Chunk en échec rendu avec ses tokens; chunk déjà écrit (23505) compté comme créé
+    assert result.failed == rows[2:4]
+    assert result.created == [{"id": 1}, {"id": 2}] + rows[4:]
+
+
+def test_process_cart_purchase_raises_on_partial_insert(monkeypatch):
+    _patch_common(monkeypatch, {"A": {"id": "A", "price": 10}})
+    monkeypatch.setattr(
+        "backend.payments.service.repository.insert_commandes_bulk",
+        lambda rows, **kw: payments_repository.BulkInsertResult(rows[:1], rows[1:]),
+    )
+    with pytest.raises(RuntimeError):
+        process_cart(user_id="u1", cart_list=[{"id": "A", "quantity": 2}])
@@ -17,6 +17,9 @@ from backend.payments import (
 
 from fastapi import HTTPException
 
+# Panier de test: 2 billets offre 1 (10.00) + 1 billet offre 2 (5.50)
+EXPECTED_ROWS = [("user-123", "1", "10.00"), ("user-123", "1", "10.00"), ("user-123", "2", "5.50")]
+
 
 def test_aggregate_quantities_ok():
     items = [
@@ -55,7 +58,7 @@ def test_to_line_items_builds_valid_entries():
     assert li_c["quantity"] == 1
 
 
-def test_process_checkout_completed_inserts(monkeypatch):
+def test_process_checkout_completed_inserts(monkeypatch, commandes_bulk):
     # Event simulé Stripe
     event = {
         "type": "checkout.session.completed",
@@ -80,24 +83,14 @@ def test_process_checkout_completed_inserts(monkeypatch):
             "2": {"id": "2", "title": "Offre B", "price": 5.5},
         }
 
-    calls = {"count": 0}
-
-    def fake_insert_commande(user_id, offre_id, token, price_paid):
-        # Valider quelques champs
-        assert user_id == "user-123"
-        assert offre_id in ("1", "2")
-        assert isinstance(token, str) and len(token) > 0
-        assert price_paid in ("10.00", "5.50")
-        calls["count"] += 1
-        return True
-
     # Patch sur les bons symboles utilisés par le service
     import backend.payments as payments_mod
     monkeypatch.setattr("backend.payments.service.get_offers_map", fake_get_offers_map)
-    monkeypatch.setattr("backend.payments.repository.insert_commande", fake_insert_commande)
 
     user_id, cart = payments_mod.extract_metadata(event)
     created = payments_mod.process_cart_purchase(user_id, cart)
     # 2 tickets pour l'offre 1 + 1 ticket pour l'offre 2 = 3 lignes
     assert created == 3
-    assert calls["count"] == 3
\ No newline at end of file
+    assert commandes_bulk["batches"] == 1
+    assert sorted((r["user_id"], r["offre_id"], r["price_paid"]) for r in commandes_bulk["rows"]) == EXPECTED_ROWS
+    assert all(r["token"] for r in commandes_bulk["rows"])
\ No newline at end of file
@@ -0,0 +1,166 @@
+import base64
+
+import pytest
+
+from backend.utils import qrcode_utils
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache(monkeypatch):
+    qrcode_utils._cache.clear()
+    monkeypatch.setattr(qrcode_utils, "QR_CACHE_DIR", "")
+    yield
+    qrcode_utils._cache.clear()
+
+
+def _count_renders(monkeypatch):
+    calls = []
+    real = qrcode_utils._render
+    def _render(*args):
+        calls.append(args)
+        return real(*args)
+    monkeypatch.setattr(qrcode_utils, "_render", _render)
+    return calls
+
+
+def test_png_render_is_cached(monkeypatch):
+    calls = _count_renders(monkeypatch)
+    first = qrcode_utils.render_qr_code("https://example.test/admin/scan?token=a.b")
+    second = qrcode_utils.render_qr_code("https://example.test/admin/scan?token=a.b")
+    assert first == second and first.startswith(b"\x89PNG")
+    assert len(calls) == 1
+
+
+def test_svg_output():
+    svg = qrcode_utils.render_qr_code("payload", "svg")
+    assert b"<svg" in svg
+
+
+def test_unknown_format_rejected():
+    with pytest.raises(ValueError):
+        qrcode_utils.render_qr_code("payload", "gif")
+
+
+def test_disk_cache_shared_between_processes(monkeypatch, tmp_path):
+    monkeypatch.setattr(qrcode_utils, "QR_CACHE_DIR", str(tmp_path))
+    calls = _count_renders(monkeypatch)
+    content = qrcode_utils.render_qr_code("payload", "svg")
+    # Cache mémoire vidé (autre processus): relu depuis le disque, sans nouveau rendu
+    qrcode_utils._cache.clear()
+    assert qrcode_utils.render_qr_code("payload", "svg") == content
+    assert len(calls) == 1
+    assert len(list(tmp_path.rglob("*.svg"))) == 1
+
+
+def test_prune_disk_cache_limits_age_and_size(monkeypatch, tmp_path):
+    import os
+    monkeypatch.setattr(qrcode_utils, "QR_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(qrcode_utils, "QR_CACHE_DIR_MAX_AGE", 100)
+    monkeypatch.setattr(qrcode_utils, "QR_CACHE_DIR_MAX_MB", 2500 / (1024 * 1024))
+    now = 10_000.0
+    for name, age in [("old", 500), ("a", 30), ("b", 20), ("c", 10)]:
+        path = tmp_path / "ab" / f"{name}.png"
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(b"x" * 1000)
+        os.utime(path, (now - age, now - age))
+
+    # "old" expiré, puis "a" (le plus ancien) pour repasser sous 2500 octets
+    assert qrcode_utils.prune_disk_cache(now=now) == 2
+    assert sorted(p.name for p in tmp_path.rglob("*.png")) == ["b.png", "c.png"]
+    assert qrcode_utils.prune_disk_cache(now=now) == 0
+
+
+def test_generate_qr_code_keeps_data_url_format():
+    url = qrcode_utils.generate_qr_code("payload")
+    assert url.startswith("data:image/png;base64,")
+    assert base64.b64decode(url.split(",", 1)[1]) == qrcode_utils.render_qr_code("payload")
+
+
+def test_render_qr_codes_batches_misses_in_pool(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(qrcode_utils, "_get_pool", lambda: pool)
+    calls = _count_renders(monkeypatch)
+    cached = qrcode_utils.render_qr_code("a")
+    calls.clear()
+
+    results = qrcode_utils.render_qr_codes(["a", "b", "c", "b"])
+    pool.shutdown()
+    assert results[0] == cached
+    assert results[1] == results[3] == qrcode_utils.render_qr_code("b")
+    assert results[2].startswith(b"\x89PNG")
+    # "a" servi par le cache, "b" rendu une seule fois
+    assert sorted(c[0] for c in calls) == ["b", "c"]
+
+
+def test_render_qr_codes_respects_time_budget(monkeypatch):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    release = threading.Event()
+    real = qrcode_utils._render
+    def _render(data, *args):
+        if data == "slow":
+            release.wait(5)
+        return real(data, *args)
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(qrcode_utils, "_get_pool", lambda: pool)
+    monkeypatch.setattr(qrcode_utils, "_render", _render)
+
+    results = qrcode_utils.render_qr_codes(["fast", "slow"], timeout=0.5)
+    release.set()
+    pool.shutdown()
+    assert results[0] is not None and results[1] is None
+
+
+def test_late_render_fills_cache_in_background(monkeypatch, tmp_path):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    monkeypatch.setattr(qrcode_utils, "QR_CACHE_DIR", str(tmp_path))
+    release = threading.Event()
+    real = qrcode_utils._render
+    calls = []
+    def _render(data, *args):
+        calls.append(data)
+        if data == "slow":
+            release.wait(5)
+        return real(data, *args)
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(qrcode_utils, "_get_pool", lambda: pool)
+    monkeypatch.setattr(qrcode_utils, "_render", _render)
+
+    assert qrcode_utils.render_qr_codes(["fast", "slow"], timeout=0.2)[1] is None
+    # Rendu toujours en cours: pas de seconde soumission pour la même clé
+    assert qrcode_utils.render_qr_codes(["other", "slow"], timeout=0.2)[1] is None
+    release.set()
+    pool.shutdown(wait=True)
+    assert calls.count("slow") == 1 and not qrcode_utils._inflight
+
+    calls.clear()
+    results = qrcode_utils.render_qr_codes(["fast", "slow"], timeout=0.2)
+    assert results[1] == real("slow", "png", 10, 4) and calls == []
+    assert len(list(tmp_path.rglob("*.png"))) == 3
+
+
+def test_warm_pool_starts_workers(monkeypatch):
+    submitted = []
+    class _Pool:
+        def submit(self, fn, *args):
+            submitted.append(args)
+    monkeypatch.setattr(qrcode_utils, "_get_pool", lambda: _Pool())
+    monkeypatch.setattr(qrcode_utils, "QR_RENDER_WORKERS", 3)
+    monkeypatch.setattr(qrcode_utils, "QR_POOL_WARMUP", True)
+    qrcode_utils.warm_pool()
+    assert len(submitted) == 3
+    monkeypatch.setattr(qrcode_utils, "QR_POOL_WARMUP", False)
+    qrcode_utils.warm_pool()
+    assert len(submitted) == 3
+
+
+def test_process_pool_renders_same_bytes(monkeypatch):
+    monkeypatch.setattr(qrcode_utils, "QR_RENDER_WORKERS", 2)
+    try:
+        results = qrcode_utils.render_qr_codes(["p1", "p2"], "svg", timeout=30)
+    finally:
+        qrcode_utils.shutdown_pool()
+    qrcode_utils._cache.clear()
+    assert results == [qrcode_utils.render_qr_code("p1", "svg"), qrcode_utils.render_qr_code("p2", "svg")]
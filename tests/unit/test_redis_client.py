@@ -0,0 +1,42 @@
+import asyncio
+import threading
+import weakref
+
+from backend.infra import redis_client
+
+
+def test_close_async_redis_closes_clients_of_other_running_loops(monkeypatch):
+    monkeypatch.setenv("USE_FAKE_REDIS_FOR_TESTS", "1")
+    monkeypatch.setattr(redis_client, "_fake_server", None)
+    monkeypatch.setattr(redis_client, "_async_clients", weakref.WeakKeyDictionary())
+    other = asyncio.new_event_loop()
+    thread = threading.Thread(target=other.run_forever, daemon=True)
+    thread.start()
+    closed = []
+
+    async def grab():
+        client = redis_client.get_async_redis()
+        real = client.aclose
+        async def _aclose():
+            closed.append(client)
+            await real()
+        client.aclose = _aclose
+        return client
+
+    async def run():
+        mine = await grab()
+        # La boucle courante ne remplace pas le client de l'autre boucle
+        theirs = asyncio.run_coroutine_threadsafe(grab(), other).result(5)
+        assert redis_client.get_async_redis() is mine and mine is not theirs
+        await redis_client.close_async_redis()
+        return mine, theirs
+
+    try:
+        mine, theirs = asyncio.run(run())
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), other).result(5)
+        assert closed == [mine, theirs] or closed == [theirs, mine]
+        assert len(redis_client._async_clients) == 0
+    finally:
+        other.call_soon_threadsafe(other.stop)
+        thread.join(5)
+        other.close()
@@ -0,0 +1,110 @@
+import asyncio
+import httpx
+import pytest
+
+from backend.infra import supabase_client as sc
+from backend.offres import repository as offres_repository
+
+
+def _mock_pool(seen):
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return httpx.Response(200, json=[{"id": "o1", "title": "Solo"}], request=request)
+    return httpx.AsyncClient(base_url="http://supabase.test/rest/v1", transport=httpx.MockTransport(handler))
+
+
+def test_scoped_clients_share_pool_with_per_request_auth(monkeypatch):
+    seen = []
+
+    async def run():
+        pool = _mock_pool(seen)
+        monkeypatch.setattr(sc, "_get_async_pool", lambda: pool)
+        monkeypatch.setattr(sc, "SUPABASE_SERVICE_KEY", "service-key")
+        await sc.get_async_user_supabase("user-jwt").table("commandes").select("id").execute()
+        await sc.get_async_service_supabase().table("commandes").select("id").execute()
+        await pool.aclose()
+
+    asyncio.run(run())
+    assert [r.headers["authorization"] for r in seen] == ["Bearer user-jwt", "Bearer service-key"]
+    assert seen[0].headers["accept-profile"] == "public"
+    assert seen[0].url.path == "/rest/v1/commandes"
+
+
+def test_async_repository_uses_shared_pool(monkeypatch):
+    seen = []
+
+    async def run():
+        pool = _mock_pool(seen)
+        monkeypatch.setattr(sc, "_get_async_pool", lambda: pool)
+        try:
+            return await offres_repository.list_offres_async()
+        finally:
+            await pool.aclose()
+
+    assert asyncio.run(run()) == [{"id": "o1", "title": "Solo"}]
+    assert len(seen) == 1
+
+
+def test_async_pool_is_recreated_per_event_loop():
+    async def grab():
+        return sc._get_async_pool()
+
+    first = asyncio.run(grab())
+    second = asyncio.run(grab())
+    assert first is not second
+    asyncio.run(sc.close_async_pool())
+
+
+def test_close_async_pool_closes_pools_of_other_running_loops():
+    import threading
+    other = asyncio.new_event_loop()
+    thread = threading.Thread(target=other.run_forever, daemon=True)
+    thread.start()
+
+    async def grab():
+        return sc._get_async_pool()
+
+    async def run():
+        mine = sc._get_async_pool()
+        # La boucle courante ne remplace pas le pool de l'autre boucle
+        theirs = asyncio.run_coroutine_threadsafe(grab(), other).result(5)
+        assert sc._get_async_pool() is mine and mine is not theirs
+        await sc.close_async_pool()
+        return mine, theirs
+
+    try:
+        mine, theirs = asyncio.run(run())
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), other).result(5)
+        assert mine.is_closed and theirs.is_closed
+    finally:
+        other.call_soon_threadsafe(other.stop)
+        thread.join(5)
+        other.close()
+
+
+def test_user_clients_reuse_sync_pool_with_their_own_bearer(monkeypatch):
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return httpx.Response(201, json=[{"id": "c1"}], request=request)
+
+    pool = httpx.Client(base_url="http://supabase.test/rest/v1", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(sc, "_get_sync_pool", lambda: pool)
+
+    a = sc.get_user_supabase("jwt-a")
+    b = sc.get_user_supabase("jwt-b")
+    a.table("commandes").insert({"token": "t1"}).execute()
+    b.table("commandes").insert({"token": "t2"}).execute()
+    a.table("commandes").insert({"token": "t3"}).execute()
+
+    assert [r.headers["authorization"] for r in seen] == ["Bearer jwt-a", "Bearer jwt-b", "Bearer jwt-a"]
+    # Le pool partagé n'est jamais muté par un client utilisateur
+    assert "authorization" not in pool.headers
+    assert a.session._client is b.session._client is pool
+    pool.close()
+
+
+def test_get_user_supabase_requires_token():
+    with pytest.raises(ValueError):
+        sc.get_user_supabase("")
@@ -0,0 +1,110 @@
+import threading
+import time
+import weakref
+
+import pytest
+
+from backend.admin import service as admin_service
+from backend.infra import redis_client, table_counters
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """fakeredis isolé par test (serveur neuf)."""
+    monkeypatch.setenv("USE_FAKE_REDIS_FOR_TESTS", "1")
+    monkeypatch.setattr(redis_client, "_client", None)
+    monkeypatch.setattr(redis_client, "_fake_server", None)
+    monkeypatch.setattr(redis_client, "_async_clients", weakref.WeakKeyDictionary())
+    table_counters.invalidate()
+    return redis_client.get_redis()
+
+
+def _counting(monkeypatch, values, delay=0.0):
+    calls = []
+    def fake_count(table_name):
+        calls.append((table_name, threading.current_thread().name))
+        time.sleep(delay)
+        return values[table_name]
+    monkeypatch.setattr("backend.admin.repository.count_table_rows", fake_count)
+    return calls
+
+
+def test_dashboard_counts_fetched_concurrently_and_cached(monkeypatch):
+    calls = _counting(monkeypatch, {"users": 7, "commandes": 4, "offres": 5, "evenements": 2}, delay=0.2)
+    start = time.monotonic()
+    counts = admin_service.get_table_counts()
+    assert counts == {"users": 7, "commandes": 4, "offres": 5, "evenements": 2}
+    # 4 comptages de 0,2 s en parallèle, pas en série
+    assert time.monotonic() - start < 0.6
+    assert admin_service.get_table_counts() == counts
+    assert len(calls) == 4
+
+
+def test_redis_counter_adjusted_by_writes(fake_redis, monkeypatch):
+    calls = _counting(monkeypatch, {"commandes": 10})
+    assert admin_service.get_table_counts(("commandes",)) == {"commandes": 10}
+    assert fake_redis.get("admin:count:commandes") == "10"
+
+    table_counters.adjust("commandes", 3)
+    table_counters.adjust("commandes", -1)
+    # Cache mémoire invalidé: valeur relue depuis Redis, sans recomptage base
+    assert admin_service.get_table_counts(("commandes",)) == {"commandes": 12}
+    assert len(calls) == 1
+
+
+def test_adjust_without_counter_is_noop(fake_redis):
+    table_counters.adjust("users", 1)
+    assert fake_redis.get("admin:count:users") is None
+
+
+def test_store_does_not_override_maintained_counter(fake_redis):
+    table_counters.store("offres", 5)
+    table_counters.adjust("offres", 1)
+    table_counters.store("offres", 5)
+    table_counters._cache.clear()
+    assert table_counters.get_counts(["offres"]) == {"offres": 6}
+
+
+def test_zero_count_not_seeded_in_redis(fake_redis):
+    table_counters.store("evenements", 0)
+    assert fake_redis.get("admin:count:evenements") is None
+
+
+def test_payments_insert_adjusts_commandes_counter(fake_redis, monkeypatch):
+    from unittest.mock import MagicMock
+    from backend.payments import repository as payments_repo
+    table_counters.store("commandes", 2)
+    monkeypatch.setattr(payments_repo.supabase_client, "get_service_supabase", lambda: MagicMock())
+    payments_repo._insert_commande_service(user_id="u1", offre_id="o1", token="t1", price_paid="10")
+    assert fake_redis.get("admin:count:commandes") == "3"
+
+
+def test_adjust_keeps_ttl_and_never_recreates_expired_counter(fake_redis):
+    table_counters.store("offres", 5)
+    table_counters.adjust("offres", 2)
+    assert fake_redis.get("admin:count:offres") == "7"
+    assert fake_redis.ttl("admin:count:offres") > 0
+
+    fake_redis.delete("admin:count:offres")  # expiration
+    table_counters.adjust("offres", 1)
+    assert fake_redis.get("admin:count:offres") is None
+
+
+def test_admin_deletes_adjust_by_deleted_rows(fake_redis, monkeypatch):
+    from unittest.mock import MagicMock
+    from backend.admin import repository as admin_repo
+    client = MagicMock()
+    deleted = client.table.return_value.delete.return_value.eq.return_value.execute
+    monkeypatch.setattr(admin_repo, "get_service_supabase", lambda: client)
+    table_counters.store("users", 4)
+    table_counters.store("commandes", 9)
+
+    deleted.return_value = MagicMock(data=[])
+    assert admin_repo.delete_commande("absent") is True
+    assert fake_redis.get("admin:count:commandes") == "9"
+
+    deleted.return_value = MagicMock(data=[{"id": "u1"}])
+    assert admin_repo.delete_user("u1") is True
+    assert fake_redis.get("admin:count:users") == "3"
+    # Commandes supprimées en cascade: compteur à recompter
+    assert fake_redis.get("admin:count:commandes") is None
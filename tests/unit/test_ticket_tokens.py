@@ -0,0 +1,61 @@
+import pytest
+from backend.utils import ticket_tokens as tt
+
+SECRET = "test-ticket-secret"
+
+@pytest.fixture(autouse=True)
+def _secret(monkeypatch):
+    monkeypatch.setattr(tt, "TICKET_SIGNING_SECRET", SECRET)
+    monkeypatch.setattr(tt, "TICKET_SIGNING_PREVIOUS_SECRETS", "")
+    monkeypatch.setattr(tt, "TICKET_LEGACY_TOKENS", True)
+
+def test_signed_token_roundtrip():
+    token = tt.sign_ticket_token("tok-123", "offre-1", "ukey")
+    assert token.startswith("t1.") and token.count(".") == 2
+    scanned = tt.parse_scan_token(token)
+    assert scanned == tt.ScannedToken(ticket_token="tok-123", user_key="ukey", offre_id="offre-1", signed=True)
+
+def test_tampered_payload_rejected():
+    token = tt.sign_ticket_token("tok-123", "offre-1", "ukey")
+    version, _, sig = token.split(".")
+    forged_payload = tt.sign_ticket_token("tok-999", "offre-1", "ukey").split(".")[1]
+    with pytest.raises(tt.TicketTokenError) as exc:
+        tt.parse_scan_token(f"{version}.{forged_payload}.{sig}")
+    assert exc.value.reason == "invalid_signature"
+
+def test_token_signed_with_unknown_secret_rejected(monkeypatch):
+    token = tt.sign_ticket_token("tok-123", "offre-1", "ukey")
+    monkeypatch.setattr(tt, "TICKET_SIGNING_SECRET", "other-secret")
+    with pytest.raises(tt.TicketTokenError) as exc:
+        tt.parse_scan_token(token)
+    assert exc.value.reason == "invalid_signature"
+
+def test_previous_secret_still_accepted(monkeypatch):
+    token = tt.sign_ticket_token("tok-123", "offre-1", "ukey")
+    monkeypatch.setattr(tt, "TICKET_SIGNING_SECRET", "new-secret")
+    monkeypatch.setattr(tt, "TICKET_SIGNING_PREVIOUS_SECRETS", f"older, {SECRET}")
+    assert tt.parse_scan_token(token).ticket_token == "tok-123"
+
+@pytest.mark.parametrize("raw", ["t1.", "t1.abc", "t1..sig", "t1.a.b.c"])
+def test_malformed_signed_token(raw):
+    with pytest.raises(tt.TicketTokenError) as exc:
+        tt.parse_scan_token(raw)
+    assert exc.value.reason in ("malformed_token", "invalid_signature")
+
+def test_legacy_composite_token():
+    scanned = tt.parse_scan_token('"ukey.tok-123"')
+    assert scanned == tt.ScannedToken(ticket_token="tok-123", user_key="ukey", offre_id=None, signed=False)
+
+def test_legacy_composite_token_rejected_when_disabled(monkeypatch):
+    monkeypatch.setattr(tt, "TICKET_LEGACY_TOKENS", False)
+    with pytest.raises(tt.TicketTokenError) as exc:
+        tt.parse_scan_token("ukey.tok-123")
+    assert exc.value.reason == "legacy_token_rejected"
+
+def test_build_scan_token_falls_back_to_composite_without_secret(monkeypatch):
+    signed = tt.sign_ticket_token("tok-123", "offre-1", "ukey")
+    monkeypatch.setattr(tt, "TICKET_SIGNING_SECRET", "")
+    assert tt.build_scan_token("tok-123", "offre-1", "ukey") == "ukey.tok-123"
+    # Sans secret, aucun jeton signé ne peut être vérifié
+    with pytest.raises(tt.TicketTokenError):
+        tt.parse_scan_token(signed)
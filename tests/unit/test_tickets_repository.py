@@ -0,0 +1,82 @@
+import pytest
+from unittest.mock import MagicMock
+
+import backend.tickets.repository as repo
+
+
+class _Resp:
+    def __init__(self, data=None, count=None):
+        self.data = data
+        self.count = count
+
+
+@pytest.fixture(autouse=True)
+def _fresh_counts():
+    repo.invalidate_user_tickets_count()
+    yield
+    repo.invalidate_user_tickets_count()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = MagicMock()
+    monkeypatch.setattr(repo, "get_supabase", lambda: client)
+    return client
+
+
+def _query(client):
+    # Chaîne PostgREST: table().select(...).eq(...)... => même mock à chaque maillon
+    q = MagicMock()
+    client.table.return_value.select.return_value = q
+    q.eq.return_value = q
+    q.limit.return_value = q
+    return q
+
+
+def test_get_user_ticket_filters_on_user_and_token(client):
+    q = _query(client)
+    q.execute.return_value = _Resp(data=[{"token": "t1", "offre_id": "o1"}])
+    assert repo.get_user_ticket("u1", "t1") == {"token": "t1", "offre_id": "o1"}
+    q.eq.assert_any_call("user_id", "u1")
+    q.eq.assert_any_call("token", "t1")
+    q.limit.assert_called_once_with(1)
+
+
+def test_get_user_ticket_absent_or_error(client):
+    q = _query(client)
+    q.execute.return_value = _Resp(data=[])
+    assert repo.get_user_ticket("u1", "t1") is None
+    q.execute.side_effect = Exception("boom")
+    assert repo.get_user_ticket("u1", "t1") is None
+
+
+def test_count_user_tickets_uses_head_count_and_cache(client):
+    q = _query(client)
+    q.execute.return_value = _Resp(data=[], count=1200)
+    assert repo.count_user_tickets("u1") == 1200
+    assert repo.count_user_tickets("u1") == 1200
+    client.table.return_value.select.assert_called_once_with("id", count="exact", head=True)
+    assert q.execute.call_count == 1
+
+
+def test_count_invalidated_on_insert(client, monkeypatch):
+    q = _query(client)
+    q.execute.return_value = _Resp(count=1)
+    assert repo.count_user_tickets("u1") == 1
+
+    from backend.payments import repository as payments_repo
+    svc = MagicMock()
+    monkeypatch.setattr(payments_repo.supabase_client, "get_service_supabase", lambda: svc)
+    payments_repo._insert_commande_service(user_id="u1", offre_id="o1", token="t2", price_paid="10")
+
+    q.execute.return_value = _Resp(count=2)
+    assert repo.count_user_tickets("u1") == 2
+
+
+def test_count_error_not_cached(client):
+    q = _query(client)
+    q.execute.side_effect = Exception("boom")
+    assert repo.count_user_tickets("u1") == 0
+    q.execute.side_effect = None
+    q.execute.return_value = _Resp(count=3)
+    assert repo.count_user_tickets("u1") == 3
@@ -0,0 +1,91 @@
+import time
+import jwt
+import pytest
+
+from backend.utils.cache import TTLCache, named_cache, cache_stats
+from backend.auth import service as svc
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_expiry_and_counters():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=30, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=5)  # TTL propre plus court que le TTL par défaut
+    assert cache.get("a") == 1
+    clock.now += 10
+    assert cache.get("b") is None  # expiré
+    assert cache.get("a") == 1
+    clock.now += 25
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+
+
+def test_ttl_cache_ttl_is_capped_and_non_positive_ignored():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=30, clock=clock)
+    cache.set("long", "x", ttl=3600)
+    cache.set("dead", "y", ttl=-1)
+    clock.now += 31
+    assert cache.get("long") is None
+    assert "dead" not in cache
+
+
+def test_ttl_cache_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # a devient le plus récent
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_named_cache_registry():
+    c = named_cache("test_registry", maxsize=5, ttl=10)
+    assert named_cache("test_registry") is c
+    assert "test_registry" in cache_stats()
+
+
+@pytest.fixture
+def token_cache(monkeypatch):
+    svc._token_cache.clear()
+    monkeypatch.setattr(svc, "sync_user_profile", lambda *a, **k: True)
+    monkeypatch.setattr(svc, "_repo_decode_token_locally", lambda token: None)
+    yield svc._token_cache
+    svc._token_cache.clear()
+
+
+def test_get_user_from_token_uses_cache(token_cache, monkeypatch):
+    calls = []
+    token = jwt.encode({"sub": "u1", "exp": int(time.time()) + 3600}, "k" * 32, algorithm="HS256")
+    monkeypatch.setattr(svc, "_repo_get_user_from_token",
+                        lambda t: calls.append(t) or {"id": "u1", "email": "a@b", "user_metadata": {}})
+
+    first = svc.get_user_from_token(token)
+    second = svc.get_user_from_token(token)
+    assert first == second
+    assert len(calls) == 1
+    # La clé du cache est un hash: le token brut n'y figure pas
+    assert token not in token_cache
+
+
+def test_get_user_from_token_does_not_cache_expired_token(token_cache, monkeypatch):
+    calls = []
+    token = jwt.encode({"sub": "u1", "exp": int(time.time()) - 10}, "k" * 32, algorithm="HS256")
+    monkeypatch.setattr(svc, "_repo_get_user_from_token",
+                        lambda t: calls.append(t) or {"id": "u1", "email": "a@b", "user_metadata": {}})
+
+    svc.get_user_from_token(token)
+    svc.get_user_from_token(token)
+    assert len(calls) == 2
@@ -0,0 +1,99 @@
+import base64
+import bisect
+import hashlib
+from unittest.mock import MagicMock
+
+import pytest
+
+from backend.validation import manifest
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    manifest.invalidate()
+    yield
+    manifest.invalidate()
+
+
+def _rows(n, day="2024-08-01"):
+    return [{"token": f"tok-{i}", "created_at": f"{day}T10:00:{i:02d}+00:00"} for i in range(n)]
+
+
+def _hashes(payload):
+    blob = base64.b64decode(payload["hashes"])
+    size = payload["hash"]["bytes"]
+    return [blob[i:i + size] for i in range(0, len(blob), size)]
+
+
+def test_full_manifest_is_sorted_and_searchable():
+    snapshot = manifest.build_snapshot("o1", _rows(5))
+    payload = manifest.render(snapshot)
+
+    hashes = _hashes(payload)
+    assert payload["full"] is True and payload["count"] == 5
+    assert hashes == sorted(hashes)
+    # Recherche dichotomique côté scanner
+    probe = manifest.token_hash("tok-3")
+    assert hashes[bisect.bisect_left(hashes, probe)] == probe
+    assert manifest.token_hash("forged") not in hashes
+    assert payload["version"] == snapshot.entries[-1][0]
+
+
+def test_delta_since_version_with_overlap(monkeypatch):
+    monkeypatch.setattr(manifest, "MANIFEST_DELTA_OVERLAP", 0)
+    old = manifest.build_snapshot("o1", _rows(3))
+    rows = _rows(3) + [{"token": "new-1", "created_at": "2024-08-02T09:00:00+00:00"}]
+    payload = manifest.render(manifest.build_snapshot("o1", rows), since=old.version + 1)
+
+    assert payload["full"] is False
+    assert _hashes(payload) == [manifest.token_hash("new-1")]
+
+    monkeypatch.setattr(manifest, "MANIFEST_DELTA_OVERLAP", 3600)
+    assert manifest.render(manifest.build_snapshot("o1", rows), since=old.version + 1)["count"] == 4
+
+
+def test_snapshot_loaded_by_pages_and_cached(monkeypatch):
+    monkeypatch.setattr(manifest, "_PAGE_SIZE", 2)
+    pages = iter([_rows(2), _rows(1, day="2024-08-03")])
+    client = MagicMock()
+    query = client.table.return_value.select.return_value.eq.return_value.order.return_value.order.return_value
+    query.range.return_value.execute.side_effect = lambda: MagicMock(data=next(pages))
+    monkeypatch.setattr(manifest, "get_service_supabase", lambda: client)
+
+    first = manifest.get_snapshot("o1")
+    second = manifest.get_snapshot("o1")
+
+    assert len(first.entries) == 3
+    assert second is first
+    assert [c.args for c in query.range.call_args_list] == [(0, 1), (2, 3)]
+
+
+def test_load_error_is_not_cached(monkeypatch):
+    client = MagicMock()
+    client.table.side_effect = RuntimeError("down")
+    monkeypatch.setattr(manifest, "get_service_supabase", lambda: client)
+    assert manifest.get_snapshot("o1") is None
+    assert manifest._cache.get("o1") is None
+
+
+def test_delta_carries_full_set_digest_to_detect_deletions(monkeypatch):
+    monkeypatch.setattr(manifest, "MANIFEST_DELTA_OVERLAP", 0)
+    before = manifest.build_snapshot("o1", _rows(3))
+    scanner = set(_hashes(manifest.render(before)))
+
+    # tok-1 remboursé (supprimé), new-1 créé
+    rows = [r for r in _rows(3) if r["token"] != "tok-1"] + [{"token": "new-1", "created_at": "2024-08-02T09:00:00+00:00"}]
+    delta = manifest.render(manifest.build_snapshot("o1", rows), since=before.version + 1)
+    scanner |= set(_hashes(delta))
+
+    merged = b"".join(sorted(scanner))
+    assert delta["total"] == 3 and len(scanner) == 4
+    assert hashlib.sha256(merged).hexdigest() != delta["digest"]
+    full = manifest.render(manifest.build_snapshot("o1", rows))
+    assert hashlib.sha256(base64.b64decode(full["hashes"])).hexdigest() == full["digest"] == delta["digest"]
+
+
+def test_load_locks_are_bounded():
+    locks = {id(manifest._lock_for(f"offre-{i}")) for i in range(1000)}
+    assert len(locks) <= manifest._LOCK_STRIPES
+    assert manifest._lock_for("o1") is manifest._lock_for("o1")
@@ -0,0 +1,126 @@
+from unittest.mock import MagicMock
+
+import pytest
+from postgrest.exceptions import APIError
+
+from backend.validation import repository as repo
+
+ROW = {
+    "id": "c1", "token": "tok", "user_id": "u1", "created_at": "2024-08-01", "offre_id": "o1",
+    "offres": {"id": "o1", "title": "Solo", "description": ""},
+    "users": {"id": "u1", "full_name": "A", "email": "a@x", "bio": "ukey"},
+    "ticket_validations": [{"id": "v1", "status": "validated", "scanned_at": "2024-08-02"}],
+}
+
+
+@pytest.fixture(autouse=True)
+def _reset_embed_level(monkeypatch):
+    monkeypatch.setattr(repo, "_embed_level", 2)
+
+
+def _client(*results):
+    """Client dont chaque requête commandes renvoie (ou lève) le résultat suivant."""
+    client = MagicMock()
+    it = iter(results)
+    def _execute():
+        r = next(it)
+        if isinstance(r, Exception):
+            raise r
+        return MagicMock(data=r)
+    query = client.table.return_value.select.return_value.eq.return_value
+    query.order.return_value.limit.return_value.limit.return_value.execute.side_effect = _execute
+    query.limit.return_value.execute.side_effect = _execute
+    return client
+
+
+def test_ticket_offer_user_and_last_validation_in_one_query(monkeypatch):
+    client = _client([ROW])
+    monkeypatch.setattr(repo, "get_service_supabase", lambda: client)
+    monkeypatch.setattr(repo, "get_last_validation", lambda t: pytest.fail("requête supplémentaire"))
+
+    ticket = repo.get_ticket_by_token("ukey.tok")
+
+    assert client.table.call_count == 1
+    columns = client.table.return_value.select.call_args.args[0]
+    assert "offres(" in columns and "users(" in columns and "ticket_validations(" in columns
+    assert ticket["users"]["bio"] == "ukey"
+    assert ticket["last_validation"]["id"] == "v1"
+
+
+def test_missing_relationship_falls_back_and_is_remembered(monkeypatch):
+    no_rel = APIError({"code": "PGRST200", "message": "Could not find a relationship"})
+    row = {k: v for k, v in ROW.items() if k != "ticket_validations"}
+    client = _client(no_rel, [row], [row])
+    monkeypatch.setattr(repo, "get_service_supabase", lambda: client)
+    monkeypatch.setattr(repo, "get_last_validation", lambda t: {"id": "v9"})
+
+    first = repo.get_ticket_by_token("tok")
+    second = repo.get_ticket_by_token("tok")
+
+    assert repo._embed_level == 1
+    assert first["last_validation"] == second["last_validation"] == {"id": "v9"}
+    assert first["users"]["bio"] == "ukey"
+
+
+def test_other_api_errors_do_not_downgrade(monkeypatch):
+    bad_uuid = APIError({"code": "22P02", "message": "invalid input syntax for type uuid"})
+    monkeypatch.setattr(repo, "get_service_supabase", lambda: _client(bad_uuid))
+    assert repo.get_ticket_by_token("garbage") is None
+    assert repo._embed_level == 2
+
+
+def test_unknown_token_returns_none(monkeypatch):
+    monkeypatch.setattr(repo, "get_service_supabase", lambda: _client([]))
+    assert repo.get_ticket_by_token("tok") is None
+
+
+def test_tickets_by_tokens_grouped_in_one_query(monkeypatch):
+    client = MagicMock()
+    query = client.table.return_value.select.return_value.in_.return_value
+    query.order.return_value.limit.return_value.execute.return_value = MagicMock(data=[ROW])
+    monkeypatch.setattr(repo, "get_service_supabase", lambda: client)
+
+    tickets = repo.get_tickets_by_tokens(["ukey.tok", "tok", "other"])
+
+    assert client.table.call_count == 1
+    assert client.table.return_value.select.return_value.in_.call_args.args == ("token", ["tok", "other"])
+    assert list(tickets) == ["tok"]
+    assert tickets["tok"]["last_validation"]["id"] == "v1"
+
+
+def test_tickets_by_tokens_falls_back_per_token_on_error(monkeypatch):
+    client = MagicMock()
+    query = client.table.return_value.select.return_value.in_.return_value
+    query.order.return_value.limit.return_value.execute.side_effect = APIError({"code": "22P02", "message": "bad uuid"})
+    monkeypatch.setattr(repo, "get_service_supabase", lambda: client)
+    monkeypatch.setattr(repo, "get_ticket_by_token", lambda t: {"id": "c1", "token": t} if t == "tok" else None)
+
+    assert repo.get_tickets_by_tokens(["tok", "garbage"]) == {"tok": {"id": "c1", "token": "tok"}}
+
+
+async def test_bulk_validations_isolate_bad_rows(monkeypatch):
+    rows = [{"token": t} for t in ("ok", "dup", "fk", "down")]
+    outcomes = {
+        "dup": APIError({"code": "23505", "message": "duplicate"}),
+        "fk": APIError({"code": "23503", "message": "fk"}),
+        "down": APIError({"code": "503", "message": "unavailable"}),
+    }
+    client = MagicMock()
+    def _insert(payload):
+        query = MagicMock()
+        async def _execute():
+            if isinstance(payload, list):
+                raise APIError({"code": "23503", "message": "fk"})
+            if payload["token"] in outcomes:
+                raise outcomes[payload["token"]]
+            return MagicMock(data=[payload])
+        query.execute = _execute
+        return query
+    client.table.return_value.insert.side_effect = _insert
+    monkeypatch.setattr(repo, "get_async_service_supabase", lambda: client)
+
+    result = await repo.insert_validations_bulk_async(rows)
+
+    assert result.written == 2
+    assert [i for i, _ in result.dead] == [2]
+    assert result.retry == [3]
@@ -0,0 +1,165 @@
+import json
+import weakref
+
+import pytest
+
+from backend.infra import redis_client, work_leases
+from backend.utils import ticket_tokens as tt
+from backend.validation import scan_guard
+from backend.validation import service as svc
+from backend.validation.repository import BulkWriteResult
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """fakeredis isolé par test (serveur neuf), garde active."""
+    monkeypatch.setenv("USE_FAKE_REDIS_FOR_TESTS", "1")
+    monkeypatch.setattr(redis_client, "_client", None)
+    monkeypatch.setattr(redis_client, "_fake_server", None)
+    monkeypatch.setattr(redis_client, "_async_clients", weakref.WeakKeyDictionary())
+    monkeypatch.setattr(scan_guard, "SCAN_GUARD_ENABLED", True)
+    return redis_client
+
+
+def _ticket(ticket_id="tid-1", last_validation=None):
+    return {
+        "id": ticket_id,
+        "offre_id": "offre-1",
+        "offres": {"id": "offre-1", "title": "Solo"},
+        "users": {"id": "user-1", "bio": "ukey", "email": "u@example.com"},
+        "last_validation": last_validation,
+    }
+
+
+def _no_insert(**kw):
+    raise AssertionError("insert_validation ne doit pas être appelé avec la garde Redis")
+
+
+def test_second_scan_rejected_from_redis(fake_redis, monkeypatch):
+    monkeypatch.setattr(svc, "get_ticket_by_token", lambda rt: _ticket())
+    monkeypatch.setattr(svc, "insert_validation", _no_insert)
+
+    status1, first = svc.validate_ticket_token("ukey.tok-1", admin_id="admin-1")
+    status2, second = svc.validate_ticket_token("ukey.tok-1", admin_id="admin-2")
+
+    assert status1 == "validated"
+    assert first["validation"]["scanned_by"] == "admin-1"
+    assert status2 == "already_validated"
+    assert second["validation"] == first["validation"]
+    # Une seule ligne à écrire (le scan gagnant), sans la clé utilisateur dans l'enregistrement Redis
+    client = fake_redis.get_redis()
+    pending = client.lrange(scan_guard.PENDING_KEY, 0, -1)
+    assert [json.loads(p)["token"] for p in pending] == ["tok-1"]
+    assert "ukey" not in client.get("scan:validated:tok-1")
+
+
+def test_signed_token_duplicate_answers_without_db(fake_redis, monkeypatch):
+    monkeypatch.setattr(tt, "TICKET_SIGNING_SECRET", "secret")
+    reads = []
+    def _read(rt):
+        reads.append(rt)
+        return _ticket()
+    monkeypatch.setattr(svc, "get_ticket_by_token", _read)
+    monkeypatch.setattr(svc, "insert_validation", _no_insert)
+    token = tt.sign_ticket_token("tok-2", "offre-1", "ukey")
+
+    assert svc.validate_ticket_token(token, admin_id="admin")[0] == "validated"
+    status, payload = svc.validate_ticket_token(token, admin_id="admin")
+
+    assert status == "already_validated"
+    assert payload["commande_id"] == "tid-1" and payload["offre"]["title"] == "Solo"
+    assert reads == ["tok-2"]
+
+
+def test_validation_already_in_db_is_remembered_without_write(fake_redis, monkeypatch):
+    last = {"status": "validated", "scanned_at": "2024-08-01T10:00:00Z"}
+    monkeypatch.setattr(svc, "get_ticket_by_token", lambda rt: _ticket(last_validation=last))
+    monkeypatch.setattr(svc, "insert_validation", _no_insert)
+
+    status, payload = svc.validate_ticket_token("ukey.tok-3", admin_id="admin")
+
+    assert status == "already_validated" and payload["validation"] == last
+    assert scan_guard.get_claim("tok-3")["validation"] == last
+    assert fake_redis.get_redis().llen(scan_guard.PENDING_KEY) == 0
+
+
+def test_without_redis_falls_back_to_db_insert(monkeypatch):
+    monkeypatch.setattr(scan_guard, "SCAN_GUARD_ENABLED", False)
+    monkeypatch.setattr(svc, "get_ticket_by_token", lambda rt: _ticket())
+    monkeypatch.setattr(svc, "insert_validation", lambda **kw: {"id": "val-1", **kw})
+
+    status, payload = svc.validate_ticket_token("ukey.tok-4", admin_id="admin")
+
+    assert status == "validated" and payload["validation"]["id"] == "val-1"
+
+
+def test_latest_validation_prefers_pending_claim(fake_redis):
+    validation = scan_guard.new_validation("tok-5", "tid-5", "admin")
+    assert scan_guard.claim("tok-5", {"commande_id": "tid-5", "validation": validation}) is None
+    assert scan_guard.latest_validation("tok-5", None) == validation
+    assert scan_guard.latest_validation("tok-x", None) is None
+
+
+async def test_flush_pending_writes_batch(fake_redis, monkeypatch):
+    written = []
+    async def _bulk(rows):
+        written.append(rows)
+        return BulkWriteResult(len(rows), [], [])
+    monkeypatch.setattr(scan_guard.repository, "insert_validations_bulk_async", _bulk)
+    for i in range(3):
+        scan_guard.claim(f"tok-{i}", {"validation": scan_guard.new_validation(f"tok-{i}", i, "admin")})
+
+    client = fake_redis.get_async_redis()
+    assert await scan_guard.flush_pending(client, size=2) == 2
+    assert await scan_guard.flush_pending(client, size=2) == 1
+    assert await scan_guard.flush_pending(client, size=2) == 0
+
+    assert [[r["token"] for r in rows] for rows in written] == [["tok-0", "tok-1"], ["tok-2"]]
+    stats = await scan_guard.writer_stats()
+    assert stats["pending"] == 0 and stats["processing"] == 0
+
+
+async def test_flush_pending_requeues_on_failure(fake_redis, monkeypatch):
+    async def _fail(rows):
+        return BulkWriteResult(0, [], list(range(len(rows))))
+    monkeypatch.setattr(scan_guard.repository, "insert_validations_bulk_async", _fail)
+    scan_guard.claim("tok-a", {"validation": scan_guard.new_validation("tok-a", 1, "admin")})
+    scan_guard.claim("tok-b", {"validation": scan_guard.new_validation("tok-b", 2, "admin")})
+
+    client = fake_redis.get_async_redis()
+    with pytest.raises(RuntimeError):
+        await scan_guard.flush_pending(client)
+
+    pending = await client.lrange(scan_guard.PENDING_KEY, 0, -1)
+    assert [json.loads(p)["token"] for p in pending] == ["tok-a", "tok-b"]
+    assert await work_leases.processing_count(client, scan_guard.PROCESSING_KEY) == 0
+
+
+async def test_flush_pending_dead_letters_rejected_rows(fake_redis, monkeypatch):
+    async def _bulk(rows):
+        return BulkWriteResult(1, [(1, "23503 fk")], [])
+    monkeypatch.setattr(scan_guard.repository, "insert_validations_bulk_async", _bulk)
+    scan_guard.claim("tok-a", {"validation": scan_guard.new_validation("tok-a", 1, "admin")})
+    scan_guard.claim("tok-b", {"validation": scan_guard.new_validation("tok-b", 2, "admin")})
+
+    client = fake_redis.get_async_redis()
+    assert await scan_guard.flush_pending(client) == 2
+
+    dead = [json.loads(d) for d in await client.lrange(scan_guard.DEAD_KEY, 0, -1)]
+    assert [json.loads(d["raw"])["token"] for d in dead] == ["tok-b"]
+    assert dead[0]["error"] == "23503 fk"
+    stats = await scan_guard.writer_stats()
+    assert (stats["pending"], stats["processing"], stats["dead"]) == (0, 0, 1)
+
+
+async def test_recover_processing_leaves_live_writer_batch(fake_redis):
+    client = fake_redis.get_async_redis()
+    base = scan_guard.PROCESSING_KEY
+    for consumer, token in [("live", "tok-live"), ("gone", "tok-gone")]:
+        await work_leases.renew(client, base, consumer, ttl=60)
+        await client.rpush(work_leases.processing_key(base, consumer), json.dumps({"token": token}))
+    await work_leases.release(client, base, "gone")
+
+    assert await scan_guard.recover_processing(client) == 1
+    assert [json.loads(p)["token"] for p in await client.lrange(scan_guard.PENDING_KEY, 0, -1)] == ["tok-gone"]
+    assert (await scan_guard.writer_stats())["processing"] == 1
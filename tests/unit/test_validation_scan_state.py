@@ -0,0 +1,49 @@
+import pytest
+
+from backend.utils import ticket_tokens as tt
+from backend.validation import scan_guard
+from backend.validation import scan_state
+
+
+@pytest.fixture(autouse=True)
+def _without_scan_guard(monkeypatch):
+    monkeypatch.setattr(scan_guard, "SCAN_GUARD_ENABLED", False)
+
+
+@pytest.mark.parametrize("payload, expected", [
+    (None, "Invalid"),
+    ({"status": "validated"}, "Validated"),
+    ({"status": "already_validated"}, "AlreadyValidated"),
+    ({"ticket": {"id": "c1"}, "validation": None}, "Scanned"),
+    ({"ticket": {"id": "c1"}, "validation": {"status": "validated"}}, "AlreadyValidated"),
+    ({"ticket": None}, "Invalid"),
+])
+def test_normalize_status_from_payload(payload, expected):
+    assert scan_state.normalize_status_from_payload(payload) == expected
+
+
+def test_scanned_ticket_without_validation(monkeypatch):
+    monkeypatch.setattr(scan_state, "get_ticket_by_token", lambda t: {"id": "c1", "token": t, "last_validation": None})
+    state = scan_state.get_scan_state("ukey.tok-1")
+    assert state["status"] == "Scanned" and state["ticket_token"] == "tok-1"
+    assert state["ticket"] == {"id": "c1", "token": "tok-1"} and state["message"] is None
+
+
+def test_already_validated_ticket(monkeypatch):
+    last = {"status": "validated"}
+    monkeypatch.setattr(scan_state, "get_ticket_by_token", lambda t: {"id": "c1", "last_validation": last})
+    state = scan_state.get_scan_state("tok-1")
+    assert state["status"] == "AlreadyValidated" and state["validation"] == last
+
+
+def test_unknown_ticket(monkeypatch):
+    monkeypatch.setattr(scan_state, "get_ticket_by_token", lambda t: None)
+    state = scan_state.get_scan_state("ukey.tok-1")
+    assert state["status"] == "Invalid" and state["reason"] == "ticket_not_found"
+
+
+def test_forged_signed_token_rejected_without_lookup(monkeypatch):
+    monkeypatch.setattr(tt, "TICKET_SIGNING_SECRET", "secret")
+    monkeypatch.setattr(scan_state, "get_ticket_by_token", lambda t: pytest.fail("lecture base"))
+    state = scan_state.get_scan_state("t1.AAAA.BBBB")
+    assert state["status"] == "Invalid" and state["reason"] == "invalid_token"
@@ -1,12 +1,19 @@
 import types
 import pytest
 from backend.validation import service as svc
+from backend.validation import scan_guard
 
-def _make_ticket(user_key="ukey", ticket_id="tid", offre=None, user=None):
+@pytest.fixture(autouse=True)
+def _without_scan_guard(monkeypatch):
+    # Chemin base (sans Redis): la garde SET NX est couverte par test_validation_scan_guard
+    monkeypatch.setattr(scan_guard, "SCAN_GUARD_ENABLED", False)
+
+def _make_ticket(user_key="ukey", ticket_id="tid", offre=None, user=None, last_validation=None):
     return {
         "id": ticket_id,
         "offres": offre or {"id": "offre-1"},
         "users": user or {"id": "user-1", "bio": user_key},
+        "last_validation": last_validation,
     }
 
 def test_invalid_when_no_dot_in_token(monkeypatch):
@@ -35,12 +42,13 @@ def test_user_key_mismatch(monkeypatch):
     assert payload["reason"] == "user_key_mismatch"
 
 def test_already_validated(monkeypatch):
-    # insert_validation renvoie None => déjà validé
-    ticket = _make_ticket(user_key="ukey", ticket_id="tid-1")
-    monkeypatch.setattr(svc, "get_ticket_by_token", lambda rt: ticket)
-    monkeypatch.setattr(svc, "insert_validation", lambda **kw: None)
+    # Dernière validation 'validated' lue avec le ticket => aucune écriture
     last_val = {"status": "validated", "ts": 123}
-    monkeypatch.setattr(svc, "get_last_validation", lambda rt: last_val)
+    ticket = _make_ticket(user_key="ukey", ticket_id="tid-1", last_validation=last_val)
+    monkeypatch.setattr(svc, "get_ticket_by_token", lambda rt: ticket)
+    def _no_insert(**kw):
+        raise AssertionError("insert_validation ne doit pas être appelé")
+    monkeypatch.setattr(svc, "insert_validation", _no_insert)
 
     status, payload = svc.validate_ticket_token("ukey.token123", admin_id="admin", admin_token="adm_tok")
     assert status == "already_validated"
@@ -48,27 +56,71 @@ def test_already_validated(monkeypatch):
     assert payload["commande_id"] == "tid-1"
     assert payload["validation"] == last_val
 
-def test_validated_with_last(monkeypatch):
-    # insert_validation renvoie un objet => validé, last non vide
+def test_already_validated_on_concurrent_duplicate(monkeypatch):
+    # insert_validation renvoie None (doublon 23505 concurrent) => déjà validé
+    ticket = _make_ticket(user_key="ukey", ticket_id="tid-1")
+    monkeypatch.setattr(svc, "get_ticket_by_token", lambda rt: ticket)
+    monkeypatch.setattr(svc, "insert_validation", lambda **kw: None)
+
+    status, payload = svc.validate_ticket_token("ukey.token123", admin_id="admin")
+    assert status == "already_validated"
+    assert payload["commande_id"] == "tid-1"
+    assert payload["validation"] is None
+
+def test_validated_returns_inserted_row(monkeypatch):
+    # insert_validation renvoie la ligne créée => validé, sans relecture
     ticket = _make_ticket(user_key="ukey", ticket_id="tid-2")
     monkeypatch.setattr(svc, "get_ticket_by_token", lambda rt: ticket)
-    monkeypatch.setattr(svc, "insert_validation", lambda **kw: {"id": "val-1"})
-    last_val = {"status": "validated", "ts": 456}
-    monkeypatch.setattr(svc, "get_last_validation", lambda rt: last_val)
+    inserted = {"id": "val-1", "status": "validated", "scanned_at": "2024-08-01T10:00:00Z"}
+    calls = []
+    def _insert(**kw):
+        calls.append(kw)
+        return inserted
+    monkeypatch.setattr(svc, "insert_validation", _insert)
 
     status, payload = svc.validate_ticket_token("ukey.tokenABC", admin_id="admin")
     assert status == "validated"
     assert payload["token"] == "tokenABC"
     assert payload["commande_id"] == "tid-2"
-    assert payload["validation"] == last_val
+    assert payload["validation"] == inserted
+    assert calls[0]["token"] == "tokenABC" and calls[0]["commande_id"] == "tid-2"
 
-def test_scanned_without_last(monkeypatch):
-    # insert ok mais aucun last => retourne "Scanned"
-    ticket = _make_ticket(user_key="ukey", ticket_id="tid-3")
+def test_previous_non_validated_scan_is_validated(monkeypatch):
+    # Une validation antérieure d'un autre statut n'empêche pas la validation
+    ticket = _make_ticket(user_key="ukey", ticket_id="tid-3", last_validation={"status": "rejected"})
     monkeypatch.setattr(svc, "get_ticket_by_token", lambda rt: ticket)
-    monkeypatch.setattr(svc, "insert_validation", lambda **kw: {"id": "val-2"})
-    monkeypatch.setattr(svc, "get_last_validation", lambda rt: None)
+    monkeypatch.setattr(svc, "insert_validation", lambda **kw: {"id": "val-2", "status": "validated"})
 
     status, payload = svc.validate_ticket_token("ukey.tokenDEF", admin_id="admin")
-    assert status == "Scanned"
-    assert payload["token"] == "tokenDEF"
\ No newline at end of file
+    assert status == "validated"
+    assert payload["validation"]["id"] == "val-2"
+
+def test_forged_signed_token_rejected_without_io(monkeypatch):
+    from backend.utils import ticket_tokens as tt
+    monkeypatch.setattr(tt, "TICKET_SIGNING_SECRET", "secret")
+    def _no_read(rt):
+        raise AssertionError("get_ticket_by_token ne doit pas être appelé")
+    monkeypatch.setattr(svc, "get_ticket_by_token", _no_read)
+    genuine = tt.sign_ticket_token("token123", "offre-1", "ukey")
+    forged = genuine[:-2] + ("AA" if not genuine.endswith("AA") else "BB")
+    status, payload = svc.validate_ticket_token(forged, admin_id="admin")
+    assert status == "invalid"
+    assert payload["reason"] == "invalid_signature"
+
+def test_signed_token_validated(monkeypatch):
+    from backend.utils import ticket_tokens as tt
+    monkeypatch.setattr(tt, "TICKET_SIGNING_SECRET", "secret")
+    ticket = _make_ticket(user_key="ukey", ticket_id="tid-4")
+    monkeypatch.setattr(svc, "get_ticket_by_token", lambda rt: ticket if rt == "token123" else None)
+    monkeypatch.setattr(svc, "insert_validation", lambda **kw: {"id": "val-4", "status": "validated"})
+    status, payload = svc.validate_ticket_token(tt.sign_ticket_token("token123", "offre-1", "ukey"), admin_id="admin")
+    assert status == "validated"
+    assert payload["token"] == "token123"
+
+def test_signed_token_offre_mismatch(monkeypatch):
+    from backend.utils import ticket_tokens as tt
+    monkeypatch.setattr(tt, "TICKET_SIGNING_SECRET", "secret")
+    monkeypatch.setattr(svc, "get_ticket_by_token", lambda rt: _make_ticket(user_key="ukey"))
+    status, payload = svc.validate_ticket_token(tt.sign_ticket_token("token123", "offre-2", "ukey"), admin_id="admin")
+    assert status == "invalid"
+    assert payload["reason"] == "offre_mismatch"